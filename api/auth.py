@@ -13,19 +13,24 @@ from datetime import timedelta, datetime, timezone
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
-from sqlalchemy import delete
+from sqlalchemy import delete, update
+from jose import jwt, JWTError
 
 from core.deps import get_current_user
 from core.database import get_async_session
+from core.config import settings
 from core.security import (
-    verify_password,
+    verify_password_async,
     create_access_token,
-    get_password_hash,
+    get_password_hash_async,
     create_refresh_token,
+    access_token_claims,
+    token_digest,
 )
+from core.revocation import revoke_access_tokens
 
 from models.user import User
+from schemas.user import UserSnapshot
 from models.refresh_session import RefreshSession
 
 from schemas.auth import *
@@ -34,6 +39,37 @@ from schemas.auth import *
 
 router = APIRouter(prefix='/auth', tags=['Authentication'])
 
+# Поля пользователя, нужные для claims access-токена (см. access_token_claims)
+_TOKEN_USER_COLUMNS = (
+    User.id,
+    User.username,
+    User.role,
+    User.is_items_corrector,
+    User.display_name,
+    User.telegram_id,
+    User.token_generation,
+)
+
+
+def _set_access_cookie(response: Response, token: str) -> None:
+    response.set_cookie(
+        key='access_token',
+        value=token,
+        httponly=True,
+        samesite='lax',
+        path='/',
+    )
+
+
+def _set_refresh_cookie(response: Response, token: str) -> None:
+    response.set_cookie(
+        key='refresh_token',
+        value=token,
+        httponly=True,
+        samesite='lax',
+        path='/',
+    )
+
 
 # ======================================================
 # REGISTER
@@ -56,7 +92,7 @@ async def register(
 
     new_user = User(
         username=user_data.username,
-        password_hash=get_password_hash(user_data.password),
+        password_hash=await get_password_hash_async(user_data.password),
         role=GlobalRole.USER
     )
 
@@ -86,14 +122,14 @@ async def login(
     )
     user = result.scalar_one_or_none()
 
-    if not user or not verify_password(form_data.password, user.password_hash):
+    if not user or not await verify_password_async(form_data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail='Неверное имя пользователя или пароль',
         )
 
     access_token = create_access_token(
-        data={'sub': user.username},
+        data=access_token_claims(user),
         expires_delta=timedelta(minutes=60),
     )
 
@@ -104,7 +140,7 @@ async def login(
     # --- CREATE REFRESH SESSION ---
     session = RefreshSession(
         user_id=user.id,
-        refresh_token=refresh_token,
+        token_hash=token_digest(refresh_token),
         user_agent=request.headers.get('user-agent'),
         ip_address=request.client.host if request.client else None,
         expires_at=datetime.now(timezone.utc) + timedelta(days=30),
@@ -114,21 +150,8 @@ async def login(
     await db.commit()
 
     # --- COOKIES ---
-    response.set_cookie(
-        key='access_token',
-        value=access_token,
-        httponly=True,
-        samesite='lax',
-        path='/',
-    )
-
-    response.set_cookie(
-        key='refresh_token',
-        value=refresh_token,
-        httponly=True,
-        samesite='lax',
-        path='/',
-    )
+    _set_access_cookie(response, access_token)
+    _set_refresh_cookie(response, refresh_token)
 
     return {'ok': True}
 
@@ -149,56 +172,75 @@ async def refresh_session(
             detail='Missing refresh token',
         )
 
-    result = await db.execute(
-        select(RefreshSession)
-        .options(selectinload(RefreshSession.user))  # 🔥 ВАЖНО
-        .where(RefreshSession.refresh_token == refresh_token)
-    )
-    session = result.scalar_one_or_none()
-
-    # Обработка возможного отсутствия часового пояса уexpires_at из БД
-    expires_at = session.expires_at
-    if expires_at.tzinfo is None:
-        expires_at = expires_at.replace(tzinfo=timezone.utc)
-
-    if not session or expires_at < datetime.now(timezone.utc):
+    try:
+        payload = jwt.decode(
+            refresh_token,
+            settings.SECRET_KEY,
+            algorithms=[settings.ALGORITHM],
+        )
+    except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail='Invalid refresh token',
         )
 
-    user = session.user
-
-    new_access = create_access_token(
-        data={'sub': user.username}
-    )
-
+    now = datetime.now(timezone.utc)
+    old_hash = token_digest(refresh_token)
     new_refresh = create_refresh_token(
-        data={'sub': user.username}
+        data={'sub': payload.get('sub')}
     )
 
-    session.refresh_token = new_refresh
-    session.expires_at = datetime.now(timezone.utc) + timedelta(days=30)
+    # Ротация одним UPDATE ... FROM users ... RETURNING: параллельные запросы
+    # с тем же токеном сериализуются на блокировке строки, и выигрывает только первый
+    result = await db.execute(
+        update(RefreshSession)
+        .where(
+            RefreshSession.token_hash == old_hash,
+            RefreshSession.expires_at > now,
+            RefreshSession.user_id == User.id,
+        )
+        .values(
+            token_hash=token_digest(new_refresh),
+            previous_token_hash=old_hash,
+            rotated_at=now,
+            expires_at=now + timedelta(days=30),
+        )
+        .returning(*_TOKEN_USER_COLUMNS)
+        .execution_options(synchronize_session=False)
+    )
+    user = result.one_or_none()
 
-    await db.commit()
+    if user:
+        await db.commit()
+        _set_access_cookie(response, create_access_token(data=access_token_claims(user)))
+        _set_refresh_cookie(response, new_refresh)
+        return {'ok': True}
 
-    response.set_cookie(
-        key='access_token',
-        value=new_access,
-        httponly=True,
-        samesite='lax',
-        path='/',
+    # Токен уже ротирован. Если недавно — это соседняя вкладка опередила нас:
+    # новый refresh уже у клиента в cookie, отдаём только свежий access.
+    # Если давно — старый токен используют повторно, закрываем сессию целиком.
+    result = await db.execute(
+        select(RefreshSession.id, RefreshSession.rotated_at, RefreshSession.expires_at, *_TOKEN_USER_COLUMNS)
+        .join(User, User.id == RefreshSession.user_id)
+        .where(RefreshSession.previous_token_hash == old_hash)
     )
+    reused = result.one_or_none()
 
-    response.set_cookie(
-        key='refresh_token',
-        value=new_refresh,
-        httponly=True,
-        samesite='lax',
-        path='/',
-    )
+    if reused and reused.expires_at > now and reused.rotated_at > now - timedelta(seconds=settings.REFRESH_REUSE_GRACE_SECONDS):
+        _set_access_cookie(response, create_access_token(data=access_token_claims(reused)))
+        return {'ok': True}
 
-    return {'ok': True}
+    if reused:
+        await db.execute(
+            delete(RefreshSession)
+            .where(RefreshSession.id == reused.id)
+        )
+        await db.commit()
+
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail='Invalid refresh token',
+    )
 
 
 # ======================================================
@@ -214,7 +256,7 @@ async def logout(
     if refresh_token:
         await db.execute(
             delete(RefreshSession)
-            .where(RefreshSession.refresh_token == refresh_token)
+            .where(RefreshSession.token_hash == token_digest(refresh_token))
         )
         await db.commit()
 
@@ -230,13 +272,14 @@ async def logout(
 
 @router.post('/logout/all')
 async def logout_all(
-    user: User = Depends(get_current_user),
+    user: UserSnapshot = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session),
 ):
     await db.execute(
         delete(RefreshSession)
         .where(RefreshSession.user_id == user.id)
     )
+    await revoke_access_tokens(db, user.id)
     await db.commit()
 
     return {'ok': True}
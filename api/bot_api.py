@@ -3,6 +3,8 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from core.database import get_async_session
 from core.config import settings
+from core.deps import invalidate_user
+from core.revocation import revoke_access_tokens
 from models.user import User
 from pydantic import BaseModel
 from datetime import datetime, timezone
@@ -66,6 +68,8 @@ async def bot_connect(
     user.telegram_connect_token_expires_at = None
 
     username = user.username
+    await revoke_access_tokens(db, user.id)
+    await invalidate_user(db, user.id)
     await db.commit()
 
     return {"ok": True, "username": username}
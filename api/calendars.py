@@ -1,13 +1,23 @@
-from fastapi import APIRouter, Depends, status, HTTPException
+from fastapi import APIRouter, Depends, status, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, delete, update
 from sqlalchemy.orm import selectinload
 
 from core.database import get_async_session
-from core.deps import get_current_user
+from core.acl import invalidate_membership
+from core.change_feed import tombstone_events
+from core.histogram import invalidate_histograms
+from core import realtime
+from core.calendar_versions import (
+    touch_calendar, get_user_calendar_versions,
+    make_etag, etag_matches, etag_headers, not_modified, versions_key,
+)
+from core.deps import get_current_user, require_viewer, CalendarAccess, CalendarPrincipal
 
 from schemas.auth import LocalRole
 from models.user import User
+from schemas.user import UserSnapshot
 from models.calendar import Calendar
 from models.calendar_user import CalendarUser
 from models.event import Event
@@ -22,9 +32,18 @@ router = APIRouter(prefix='/calendars', tags=['Calendars'])
 
 @router.get('/my', response_model=list[CalendarPublic])
 async def get_my_calendars(
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_async_session),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
+    # Список зависит только от набора календарей пользователя и их версий
+    versions = await get_user_calendar_versions(db, current_user.id)
+    etag = make_etag('calendars', current_user.id, versions_key(versions))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers.update(etag_headers(etag))
+
     # Get all calendars user is part of
     query = (
         select(Calendar)
@@ -36,7 +55,7 @@ async def get_my_calendars(
     result = await db.execute(query)
     calendars = result.scalars().all()
     
-    response = []
+    calendars_out = []
     for cal in calendars:
         cal_data = CalendarPublic.model_validate(cal)
         # Find current user's role
@@ -52,16 +71,16 @@ async def get_my_calendars(
                 role=LocalRole(link.role)
             ) for link in cal.user_links
         ]
-        response.append(cal_data)
+        calendars_out.append(cal_data)
         
-    return response
+    return calendars_out
 
 
 @router.post('/', status_code=status.HTTP_201_CREATED, response_model=CalendarPublic)
 async def create_calendar(
     data: CalendarCreate,
     db: AsyncSession = Depends(get_async_session),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     if await db.scalar(select(Calendar).where(Calendar.name == data.name)):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Календарь с таким названием уже есть')
@@ -80,6 +99,7 @@ async def create_calendar(
         role=LocalRole.OWNER
     )
     db.add(calendar_link)
+    await invalidate_membership(db, new_calendar.id)
     
     await db.commit()
     await db.refresh(new_calendar)
@@ -110,19 +130,8 @@ async def update_calendar(
     calendar_id: int,
     data: CalendarUpdate,
     db: AsyncSession = Depends(get_async_session),
-    current_user: User = Depends(get_current_user)
+    _: CalendarPrincipal = Depends(CalendarAccess([LocalRole.OWNER], "Только владелец может изменять настройки календаря"))
 ):
-    # Check if user is owner
-    role_link = await db.scalar(
-        select(CalendarUser).where(
-            CalendarUser.calendar_id == calendar_id,
-            CalendarUser.user_id == current_user.id
-        )
-    )
-    
-    if not role_link or role_link.role != LocalRole.OWNER:
-        raise HTTPException(status_code=403, detail="Только владелец может изменять настройки календаря")
-
     update_data = data.model_dump(exclude_unset=True)
     if not update_data:
         raise HTTPException(status_code=400, detail="Нет данных для обновления")
@@ -130,8 +139,9 @@ async def update_calendar(
     await db.execute(
         update(Calendar)
         .where(Calendar.id == calendar_id)
-        .values(**update_data)
+        .values(**update_data, version=Calendar.version + 1)
     )
+    await realtime.notify_change(db, calendar_id, "calendar", "updated")
     await db.commit()
     
     # Return updated calendar
@@ -159,21 +169,15 @@ async def update_calendar(
 async def delete_calendar(
     calendar_id: int,
     db: AsyncSession = Depends(get_async_session),
-    current_user: User = Depends(get_current_user)
+    _: CalendarPrincipal = Depends(CalendarAccess([LocalRole.OWNER], "Только владелец может удалить календарь"))
 ):
-    role_link = await db.scalar(
-        select(CalendarUser).where(
-            CalendarUser.calendar_id == calendar_id,
-            CalendarUser.user_id == current_user.id
-        )
-    )
-    
-    if not role_link or role_link.role != LocalRole.OWNER:
-        raise HTTPException(status_code=403, detail="Только владелец может удалить календарь")
-
     # Manually delete related records because DB schema might not have ON DELETE CASCADE
-    # 1. Delete EventContents for all events in this calendar
+    # 0. Lock the calendar and record tombstones for the change feed
     events_subquery = select(Event.id).where(Event.calendar_id == calendar_id)
+    await touch_calendar(db, calendar_id)
+    await tombstone_events(db, calendar_id, events_subquery)
+
+    # 1. Delete EventContents for all events in this calendar
     await db.execute(delete(EventContent).where(EventContent.event_id.in_(events_subquery)))
     
     # 2. Delete Events
@@ -184,6 +188,9 @@ async def delete_calendar(
 
     # 4. Finally delete the Calendar itself
     await db.execute(delete(Calendar).where(Calendar.id == calendar_id))
+    await invalidate_membership(db, calendar_id)
+    await invalidate_histograms(db, calendar_id)
+    await realtime.notify_change(db, calendar_id, "calendar", "deleted")
     
     await db.commit()
     return None
@@ -194,23 +201,19 @@ async def add_user_to_calendar(
     calendar_id: int,
     data: AddUserToCalendar,
     db: AsyncSession = Depends(get_async_session),
-    current_user: User = Depends(get_current_user)
+    principal: CalendarPrincipal = Depends(CalendarAccess([LocalRole.OWNER], "Только владелец может управлять доступом"))
 ):
-    # Check if current_user is owner
-    role_link = await db.scalar(
-        select(CalendarUser).where(
-            CalendarUser.calendar_id == calendar_id,
-            CalendarUser.user_id == current_user.id
-        )
-    )
-    
-    if not role_link or role_link.role != LocalRole.OWNER:
-        raise HTTPException(status_code=403, detail="Только владелец может управлять доступом")
-
     # If role is OWNER, downgrade current owner to editor
     if data.role == LocalRole.OWNER:
-        # role_link is our link (current owner)
-        role_link.role = LocalRole.EDITOR
+        await db.execute(
+            update(CalendarUser)
+            .where(
+                CalendarUser.calendar_id == calendar_id,
+                CalendarUser.user_id == principal.user.id
+            )
+            .values(role=LocalRole.EDITOR)
+        )
+        await realtime.notify_change(db, calendar_id, "member", "updated", principal.user.id)
 
     # Get target user
     target_user = await db.scalar(select(User).where(User.username == data.username))
@@ -227,6 +230,7 @@ async def add_user_to_calendar(
 
     if existing_link:
         existing_link.role = data.role
+        await realtime.notify_change(db, calendar_id, "member", "updated", target_user.id)
     else:
         new_link = CalendarUser(
             user_id=target_user.id,
@@ -234,7 +238,10 @@ async def add_user_to_calendar(
             role=data.role
         )
         db.add(new_link)
+        await realtime.notify_change(db, calendar_id, "member", "added", target_user.id)
 
+    await invalidate_membership(db, calendar_id)
+    await touch_calendar(db, calendar_id)
     await db.commit()
     return {"status": "ok"}
 
@@ -244,8 +251,12 @@ async def remove_user_from_calendar(
     calendar_id: int,
     user_id: str,
     db: AsyncSession = Depends(get_async_session),
-    current_user: User = Depends(get_current_user)
+    principal: CalendarPrincipal = Depends(CalendarAccess(
+        [LocalRole.OWNER, LocalRole.EDITOR, LocalRole.VIEWER], "Доступ запрещен"
+    ))
 ):
+    current_user = principal.user
+
     # Determine target user ID
     if user_id == "me":
         target_user_id = current_user.id
@@ -256,17 +267,7 @@ async def remove_user_from_calendar(
             raise HTTPException(status_code=400, detail="Некорректный ID пользователя")
 
     # Owner can remove anyone, others can only remove themselves
-    role_link = await db.scalar(
-        select(CalendarUser).where(
-            CalendarUser.calendar_id == calendar_id,
-            CalendarUser.user_id == current_user.id
-        )
-    )
-    
-    if not role_link:
-        raise HTTPException(status_code=403, detail="Доступ запрещен")
-
-    if role_link.role != LocalRole.OWNER and current_user.id != target_user_id:
+    if principal.role != LocalRole.OWNER and current_user.id != target_user_id:
         raise HTTPException(status_code=403, detail="Только владелец может удалять других участников")
 
     await db.execute(
@@ -276,5 +277,34 @@ async def remove_user_from_calendar(
             CalendarUser.user_id == target_user_id
         )
     )
+    await invalidate_membership(db, calendar_id, target_user_id)
+    await touch_calendar(db, calendar_id)
+    await realtime.notify_change(db, calendar_id, "member", "removed", target_user_id)
     await db.commit()
     return None
+
+
+@router.get('/{calendar_id}/stream')
+async def stream_calendar_changes(
+    calendar_id: int,
+    db: AsyncSession = Depends(get_async_session),
+    principal: CalendarPrincipal = Depends(require_viewer)
+):
+    """
+    Server-Sent Events с изменениями календаря: event, content, member, calendar, resync.
+    Права проверяются один раз при подписке; поток закрывается, если пользователя
+    удалили из календаря или календарь удалён.
+    """
+    # Соединение с БД потоку не нужно — возвращаем его в пул сразу
+    await db.close()
+
+    async def events():
+        with realtime.subscribe(calendar_id, principal.user.id) as subscription:
+            async for chunk in realtime.stream_events(subscription):
+                yield chunk
+
+    return StreamingResponse(
+        events(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
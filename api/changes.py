@@ -0,0 +1,107 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import literal, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.change_feed import get_horizon
+from core.config import settings
+from core.database import get_async_session
+from core.deps import require_viewer, CalendarPrincipal
+from models.change_feed import Tombstone
+from models.event import Event
+from models.event_content import EventContent
+from schemas.changes import CalendarChanges, TombstoneOut
+from schemas.event import EventOut
+from schemas.event_content import EventContentOut
+
+router = APIRouter(prefix="/calendars/{calendar_id}/changes", tags=["Changes"])
+
+
+# ── GET /changes ──────────────────────────────────────────────────────────────
+@router.get("", response_model=CalendarChanges)
+async def get_calendar_changes(
+    calendar_id: int,
+    since: int = Query(0, ge=0, description="Курсор из предыдущего ответа; 0 — с начала"),
+    limit: int = Query(settings.CHANGES_PAGE_LIMIT, ge=1, le=settings.CHANGES_PAGE_LIMIT),
+    db: AsyncSession = Depends(get_async_session),
+    _: CalendarPrincipal = Depends(require_viewer),
+):
+    """
+    Созданные, изменённые и удалённые события и блоки контента после курсора since,
+    по возрастанию номера изменения. Пока has_more — запрашивать дальше с новым cursor.
+    """
+    # Записи об удалениях старше горизонта уже вычищены: ответ был бы неполным
+    if since and since < await get_horizon(db):
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Курсор устарел, требуется полная синхронизация",
+        )
+
+    # Одна выборка ключей страницы — один снимок данных, иначе между запросами
+    # к разным таблицам мог бы закоммититься кусок транзакции и курсор его перескочил бы
+    events = (
+        select(literal("event").label("kind"), Event.id.label("id"), Event.change_seq.label("seq"))
+        .where(Event.calendar_id == calendar_id, Event.change_seq > since)
+        .order_by(Event.change_seq)
+        .limit(limit + 1)
+    )
+    contents = (
+        select(literal("content"), EventContent.id, EventContent.change_seq)
+        .join(Event, Event.id == EventContent.event_id)
+        .where(Event.calendar_id == calendar_id, EventContent.change_seq > since)
+        .order_by(EventContent.change_seq)
+        .limit(limit + 1)
+    )
+    deleted = (
+        select(literal("deleted"), Tombstone.id, Tombstone.change_seq)
+        .where(Tombstone.calendar_id == calendar_id, Tombstone.change_seq > since)
+        .order_by(Tombstone.change_seq)
+        .limit(limit + 1)
+    )
+    page = union_all(
+        *(select(part.subquery()) for part in (events, contents, deleted))
+    ).subquery()
+
+    result = await db.execute(select(page).order_by(page.c.seq).limit(limit + 1))
+    keys = result.all()
+
+    has_more = len(keys) > limit
+    keys = keys[:limit]
+
+    ids: dict[str, list[int]] = {"event": [], "content": [], "deleted": []}
+    for kind, row_id, _seq in keys:
+        ids[kind].append(row_id)
+
+    # Сами строки читаем уже по первичным ключам. Если строку успели изменить,
+    # придёт более новая версия (и ещё раз в следующей странице); если удалить —
+    # её заменит запись об удалении дальше по ленте.
+    changes = CalendarChanges(
+        cursor=keys[-1].seq if keys else since,
+        has_more=has_more,
+    )
+    if ids["event"]:
+        rows = await db.scalars(
+            select(Event).where(Event.id.in_(ids["event"])).order_by(Event.change_seq)
+        )
+        changes.events = [EventOut.model_validate(event) for event in rows]
+    if ids["content"]:
+        rows = await db.scalars(
+            select(EventContent)
+            .where(EventContent.id.in_(ids["content"]))
+            .order_by(EventContent.change_seq)
+        )
+        changes.contents = [EventContentOut.model_validate(block) for block in rows]
+    if ids["deleted"]:
+        rows = await db.scalars(
+            select(Tombstone).where(Tombstone.id.in_(ids["deleted"])).order_by(Tombstone.change_seq)
+        )
+        changes.deleted = [
+            TombstoneOut(
+                kind=tombstone.kind,
+                id=tombstone.entity_id,
+                event_id=tombstone.event_id,
+                deleted_at=tombstone.deleted_at,
+            )
+            for tombstone in rows
+        ]
+
+    return changes
@@ -10,9 +10,12 @@ from sqlalchemy import select, func
 from core.database import get_async_session
 from core.config import settings
 from core.deps import get_current_user, require_items_corrector
+from core.streaming import ndjson_requested, ndjson_response
+from core.writes import update_returning, check_version
 from models.correction_order import CorrectionOrder
 from models.user import User
-from schemas.correction_order import CorrectionOrderOut, CorrectionOrderStatusUpdate
+from schemas.user import UserSnapshot
+from schemas.correction_order import CorrectionOrderOut, CorrectionOrderPage, CorrectionOrderStatusUpdate
 from core.notifications import notify_order_confirmed, notify_order_rejected, notify_info_requested
 
 router = APIRouter(prefix="/correction-orders", tags=["Correction Orders"])
@@ -109,15 +112,16 @@ async def create_correction_order(
 
 
 # ── GET /correction-orders/ ───────────────────────────────────────────────────
-@router.get("/")
+@router.get("/", response_model=CorrectionOrderPage)
 async def list_correction_orders(
-    skip: int = 0,
-    limit: int = 10,
+    skip: int | None = None,
+    limit: int | None = None,
     status_filter: str = "all",
     status: str | None = None, # Алиас для фронтенда
     sort: str = "newest",
+    stream: bool = Depends(ndjson_requested),
     db: AsyncSession = Depends(get_async_session),
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
 ):
     # Базовые запросы
     count_stmt = select(func.count()).select_from(CorrectionOrder)
@@ -150,10 +154,23 @@ async def list_correction_orders(
     else:
         stmt = stmt.order_by(CorrectionOrder.created_at.desc())
 
-    # Применяем пагинацию
-    stmt = stmt.offset(skip).limit(limit)
+    # Потоковый режим: только строки, общее количество — в заголовке.
+    # Выгрузка целиком, если skip/limit не переданы явно
+    if stream:
+        if skip is not None:
+            stmt = stmt.offset(skip)
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        return ndjson_response(
+            await db.stream_scalars(stmt),
+            CorrectionOrderOut,
+            headers={"X-Total-Count": str(total)},
+        )
     
-    result = await db.execute(stmt)
+    # Применяем пагинацию
+    skip = 0 if skip is None else skip
+    limit = 10 if limit is None else limit
+    result = await db.execute(stmt.offset(skip).limit(limit))
     orders = result.scalars().all()
 
     return {
@@ -177,12 +194,14 @@ async def update_correction_order(
     bot_message_ids: list[int] | None = Form(None),
     reply_text: str | None = Form(None),
     reply_photos: List[UploadFile] = File(default=[]),
+    version: int | None = Form(None),
     db: AsyncSession = Depends(get_async_session),
-    corrector: User = Depends(require_items_corrector),
+    corrector: UserSnapshot = Depends(require_items_corrector),
 ):
     order = await db.get(CorrectionOrder, order_id)
     if not order:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Заявка не найдена")
+    check_version(order.version, version)
 
     # Сохраняем старые статусы для сравнения
     prev_corrected = order.is_corrected
@@ -197,14 +216,15 @@ async def update_correction_order(
         )
 
     # Применяем изменения
-    if is_corrected is not None: order.is_corrected = is_corrected
-    if is_reported is not None: order.is_reported = is_reported
-    if report_text is not None: order.report_text = report_text
-    if is_rejected is not None: order.is_rejected = is_rejected
-    if is_user_confirmed is not None: order.is_user_confirmed = is_user_confirmed
-    if is_updated is not None: order.is_updated = is_updated
-    if bot_message_ids is not None: order.bot_message_ids = bot_message_ids
-    if reply_text is not None: order.reply_text = reply_text
+    changes = {}
+    if is_corrected is not None: changes["is_corrected"] = is_corrected
+    if is_reported is not None: changes["is_reported"] = is_reported
+    if report_text is not None: changes["report_text"] = report_text
+    if is_rejected is not None: changes["is_rejected"] = is_rejected
+    if is_user_confirmed is not None: changes["is_user_confirmed"] = is_user_confirmed
+    if is_updated is not None: changes["is_updated"] = is_updated
+    if bot_message_ids is not None: changes["bot_message_ids"] = bot_message_ids
+    if reply_text is not None: changes["reply_text"] = reply_text
 
     # Обработка новых фото для ответа
     if reply_photos:
@@ -218,10 +238,14 @@ async def update_correction_order(
             with open(filepath, "wb") as f:
                 shutil.copyfileobj(photo.file, f)
             new_reply_urls.append(f"/uploads/{filename}")
-        order.reply_photo_urls = new_reply_urls
+        changes["reply_photo_urls"] = new_reply_urls
 
+    # Версия — та, по которой проверяли статусы выше: параллельное изменение даст 409
+    order = await update_returning(
+        db, CorrectionOrder, [CorrectionOrder.id == order_id], changes,
+        expected_version=order.version, not_found="Заявка не найдена",
+    )
     await db.commit()
-    await db.refresh(order)
 
     if not prev_corrected and order.is_corrected:
         # Уведомление о подтверждении (с возможным текстом и фото ответа)
@@ -237,7 +261,6 @@ async def update_correction_order(
         if msg_ids:
             order.bot_message_ids = msg_ids
             await db.commit()
-            await db.refresh(order)
             
     elif prev_corrected and not order.is_corrected:
         # Если админ отменил "Готово", удаляем ВСЕ старые сообщения с кнопкой и фото у пользователя
@@ -258,7 +281,6 @@ async def update_correction_order(
                 except: pass
         order.reply_photo_urls = []
         await db.commit()
-        await db.refresh(order)
 
     elif not prev_rejected and order.is_rejected:
         await notify_order_rejected(order.telegram_chat_id, order.id, reply_to_message_id=order.user_message_id)
@@ -286,9 +308,11 @@ async def user_confirm_order(
             detail="Вы не можете подтвердить наличие, пока администратор не проверил заявку"
         )
     
-    order.is_user_confirmed = True
+    order = await update_returning(
+        db, CorrectionOrder, [CorrectionOrder.id == order_id], {"is_user_confirmed": True},
+        expected_version=order.version, not_found="Заявка не найдена",
+    )
     await db.commit()
-    await db.refresh(order)
     return order
 
 
@@ -297,7 +321,7 @@ async def user_confirm_order(
 async def delete_correction_order(
     order_id: int,
     db: AsyncSession = Depends(get_async_session),
-    corrector: User = Depends(require_items_corrector),
+    corrector: UserSnapshot = Depends(require_items_corrector),
 ):
     order = await db.get(CorrectionOrder, order_id)
     if not order:
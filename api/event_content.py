@@ -8,10 +8,13 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from core.database import get_async_session
-from core.deps import get_current_user, require_editor
+from core.deps import require_editor, require_viewer, CalendarPrincipal
+from core.calendar_versions import touch_calendar
+from core.change_feed import tombstone_content
+from core.realtime import notify_change
+from core.writes import insert_returning, update_returning
 from models.event import Event
 from models.event_content import EventContent
-from models.user import User
 from schemas.event_content import EventContentOut, EventContentCreateText, EventContentPatch
 
 router = APIRouter(
@@ -44,7 +47,7 @@ async def get_event_content(
     calendar_id: int,
     event_id: int,
     db: AsyncSession = Depends(get_async_session),
-    _: User = Depends(get_current_user),
+    _: CalendarPrincipal = Depends(require_viewer),
 ):
     await _get_event_or_404(calendar_id, event_id, db)
 
@@ -64,19 +67,20 @@ async def add_text_block(
     event_id: int,
     data: EventContentCreateText,
     db: AsyncSession = Depends(get_async_session),
-    _: User = Depends(require_editor),
+    _: CalendarPrincipal = Depends(require_editor),
 ):
     await _get_event_or_404(calendar_id, event_id, db)
 
-    block = EventContent(
+    await touch_calendar(db, calendar_id)
+    block = await insert_returning(
+        db, EventContent,
         event_id=event_id,
         order=data.order,
         type="text",
         text=data.text,
     )
-    db.add(block)
+    await notify_change(db, calendar_id, "content", "created", block.id, event_id)
     await db.commit()
-    await db.refresh(block)
     return block
 
 
@@ -91,7 +95,7 @@ async def add_file_block(
     order: int,
     file: UploadFile = File(...),
     db: AsyncSession = Depends(get_async_session),
-    _: User = Depends(require_editor),
+    _: CalendarPrincipal = Depends(require_editor),
 ):
     await _get_event_or_404(calendar_id, event_id, db)
 
@@ -115,6 +119,7 @@ async def add_file_block(
     with open(filepath, "wb") as f:
         shutil.copyfileobj(file.file, f)
 
+    await touch_calendar(db, calendar_id)
     block = EventContent(
         event_id=event_id,
         order=order,
@@ -123,6 +128,8 @@ async def add_file_block(
         text=file.filename if block_type == "file" else None,
     )
     db.add(block)
+    await db.flush()
+    await notify_change(db, calendar_id, "content", "created", block.id, event_id)
     await db.commit()
     await db.refresh(block)
     return block
@@ -136,9 +143,9 @@ async def add_image_block_legacy(
     order: int,
     file: UploadFile = File(...),
     db: AsyncSession = Depends(get_async_session),
-    user: User = Depends(require_editor),
+    principal: CalendarPrincipal = Depends(require_editor),
 ):
-    return await add_file_block(calendar_id, event_id, order, file, db, user)
+    return await add_file_block(calendar_id, event_id, order, file, db, principal)
 
 
 # ── PATCH /content/{block_id} ─────────────────────────────────────────────────
@@ -149,19 +156,23 @@ async def update_block(
     block_id: int,
     data: EventContentPatch,
     db: AsyncSession = Depends(get_async_session),
-    _: User = Depends(require_editor),
+    _: CalendarPrincipal = Depends(require_editor),
 ):
-    await _get_event_or_404(calendar_id, event_id, db)
-
-    block = await db.get(EventContent, block_id)
-    if not block or block.event_id != event_id:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Блок не найден")
-
-    for field, value in data.model_dump(exclude_unset=True).items():
-        setattr(block, field, value)
+    await touch_calendar(db, calendar_id)
+    block = await update_returning(
+        db, EventContent,
+        [
+            EventContent.id == block_id,
+            EventContent.event_id == event_id,
+            EventContent.event.has(Event.calendar_id == calendar_id),
+        ],
+        data.model_dump(exclude_unset=True, exclude={"version"}),
+        expected_version=data.version,
+        not_found="Блок не найден",
+    )
 
+    await notify_change(db, calendar_id, "content", "updated", block_id, event_id)
     await db.commit()
-    await db.refresh(block)
     return block
 
 
@@ -172,7 +183,7 @@ async def delete_block(
     event_id: int,
     block_id: int,
     db: AsyncSession = Depends(get_async_session),
-    _: User = Depends(require_editor),
+    _: CalendarPrincipal = Depends(require_editor),
 ):
     await _get_event_or_404(calendar_id, event_id, db)
 
@@ -190,5 +201,8 @@ async def delete_block(
             except Exception:
                 pass
 
+    await touch_calendar(db, calendar_id)
+    await tombstone_content(db, calendar_id, event_id, block_id)
     await db.delete(block)
+    await notify_change(db, calendar_id, "content", "deleted", block_id, event_id)
     await db.commit()
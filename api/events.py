@@ -1,67 +1,202 @@
-from fastapi import APIRouter, Depends, status, HTTPException
+from fastapi import APIRouter, Depends, status, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 
-from schemas.event import EventCreate, EventUpdate, EventsRangeQuery
+from schemas.event import (
+    EventCreate, EventUpdate, OccurrenceUpdate, EventsRangeQuery, EventOut, EventWithCalendarOut,
+    EventBatchRequest, EventBatchResult, EventDetailOut, EventSearchPage, HistogramBucket,
+    EventAgendaPage,
+)
+from schemas.event_content import EventContentOut
 
-from sqlalchemy import select, and_
+from sqlalchemy import select, delete, or_
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import joinedload, selectinload
 
-from models.event import Event
-from models.user import User
+from models.event import Event, events_overlapping
+from models.event_content import EventContent
+from schemas.user import UserSnapshot
 from models.calendar_user import CalendarUser
 
 
-from core.deps import require_editor, require_viewer, get_current_user
+from core.deps import require_editor, require_viewer, get_current_user, events_range, CalendarPrincipal
 from core.database import get_async_session
+from core.acl import get_calendar_role
+from core.change_feed import tombstone_events
+from core.realtime import notify_change
+from core.streaming import stream_grouped_json, ndjson_requested, ndjson_response, merge_sorted
+from core.recurrence import parse_rrule, series_end, is_occurrence, as_aware, get_zone
+from core.occurrences import expand_series, occurrence_key
+from core.event_batch import apply_event_batch, RECURRENCE_FIELDS
+from core.writes import insert_returning, update_returning
+from core.search import search_events
+from core.agenda import get_agenda
+from core.projection import Projection, event_projection
+from core.histogram import HISTOGRAM_FIELDS, event_span, get_histogram, invalidate_histograms
+from core.config import settings
+from core.conflicts import ConflictMode, ConflictPolicy, check_conflicts, check_batch_conflicts
+from core.calendar_versions import (
+    touch_calendar, lock_calendars, get_calendar_version, get_user_calendar_versions,
+    make_etag, etag_matches, etag_headers, not_modified, versions_key,
+)
 
 import datetime
+import heapq
+from typing import Literal
 
 # --- API EVENTS ---
 
 router = APIRouter(prefix='/calendars/{calendar_id}/events', tags=['Events'])
 
 
-@router.get('/range')
+def _recurrence_until(rrule, start, end, timezone, recurrence_id=None):
+    """Проверяет правило повторения и считает конец серии (None — бесконечная или не серия)."""
+    if rrule and recurrence_id is not None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Изменённый экземпляр серии не может сам повторяться'
+        )
+    if not rrule:
+        return None
+    try:
+        return series_end(parse_rrule(rrule), start, end, timezone)
+    except ValueError as exc:
+        # Правило проверено схемой, но конец серии зависит и от полей, взятых из строки
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)) from None
+
+
+def _span(event):
+    return event_span(event.start, event.end, event.rrule, event.recurrence_until)
+
+
+async def _conflict_policy(
+    calendar_id: int,
+    conflicts: ConflictMode | None = Query(
+        None, description='Проверка пересечений по времени: warn — сообщить, reject — отклонить (409)'
+    ),
+    linked_calendars: list[int] = Query(
+        [], description='Дополнительные календари, пересечения с которыми тоже считаются'
+    ),
+    principal: CalendarPrincipal = Depends(require_editor),
+    db: AsyncSession = Depends(get_async_session),
+) -> ConflictPolicy | None:
+    if conflicts is None:
+        return None
+
+    calendar_ids = tuple(dict.fromkeys([calendar_id, *linked_calendars]))
+    for linked_id in calendar_ids[1:]:
+        if not await get_calendar_role(db, principal.user.id, linked_id):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f'У вас нет прав на доступ к календарю {linked_id}'
+            )
+    # Без блокировки связанных календарей две записи в A и B (связанные) прошли бы
+    # проверку одновременно. Берётся до touch_calendar в обработчике, все — в порядке id
+    await lock_calendars(db, calendar_ids)
+    return ConflictPolicy(conflicts, calendar_ids)
+
+
+@router.get('/range', response_model=list[EventOut])
 async def get_events_range(
     calendar_id: int,
-    query: EventsRangeQuery = Depends(),
+    request: Request,
+    response: Response,
+    query: EventsRangeQuery = Depends(events_range),
+    stream: bool = Depends(ndjson_requested),
+    projection: Projection | None = Depends(event_projection),
     db: AsyncSession = Depends(get_async_session),
-    current_user: User = Depends(get_current_user),
-    _ = Depends(require_viewer)
+    _: CalendarPrincipal = Depends(require_viewer)
 ):
+    # Условный GET: пока версия календаря не изменилась, ответ тот же
+    version = await get_calendar_version(db, calendar_id)
+    etag = make_etag(
+        'events', calendar_id, version,
+        query.from_date.isoformat(), query.to_date.isoformat(),
+        'ndjson' if stream else 'json',
+        projection.etag_part() if projection else '',
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
     # Логика пересечения:
     # 1. Событие началось ДО того, как закончился наш range (Event.start < query.to_date)
     # 2. Событие закончилось ПОСЛЕ того, как начался наш range (Event.end > query.from_date)
+    # Кандидатов отбирает GiST-индекс по tstzrange (см. events_overlapping)
+    # С fields — только нужные колонки (и ключ сортировки), строками без ORM-объектов
     stmt = (
-        select(Event)
+        select(*projection.columns('calendar_id', 'start') if projection else (Event,))
         .where(
-            and_(
-                Event.calendar_id == calendar_id,
-                Event.start < query.to_date,
-                Event.end > query.from_date
-            )
+            Event.calendar_id == calendar_id,
+            events_overlapping(query.from_date, query.to_date),
         )
         .order_by(Event.start)
     )
 
+    # Экземпляры серий разворачиваются только внутри окна и вливаются по порядку
+    instances = await expand_series(
+        db, Event.calendar_id == calendar_id, query.from_date, query.to_date
+    )
+
+    if stream:
+        rows = await db.stream(stmt) if projection else await db.stream_scalars(stmt)
+        rows = merge_sorted(rows, instances, occurrence_key)
+        return ndjson_response(rows, projection or EventOut, headers=etag_headers(etag))
+
+    if projection:
+        rows = (await db.execute(stmt)).all()
+        return projection.response(
+            [projection.to_dict(row) for row in heapq.merge(rows, instances, key=occurrence_key)],
+            headers=etag_headers(etag),
+        )
+
     result = await db.execute(stmt)
     events = result.scalars().all()
 
-    return events
+    response.headers.update(etag_headers(etag))
+    return list(heapq.merge(events, instances, key=occurrence_key))
+
+
+@router.get('/histogram', response_model=list[HistogramBucket])
+async def get_events_histogram(
+    calendar_id: int,
+    query: EventsRangeQuery = Depends(events_range),
+    bucket: Literal['day', 'week', 'month'] = Query('day'),
+    tz: str = Query('UTC', max_length=64, description='IANA-пояс, в котором режутся корзины'),
+    db: AsyncSession = Depends(get_async_session),
+    _: CalendarPrincipal = Depends(require_viewer)
+):
+    """Число событий и занятые минуты по дням, неделям или месяцам периода (для тепловой карты)."""
+    try:
+        get_zone(tz)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return await get_histogram(db, calendar_id, query.from_date, query.to_date, bucket, tz)
+
+
+@router.get('/search', response_model=EventSearchPage)
+async def search_calendar_events(
+    calendar_id: int,
+    q: str = Query(..., min_length=1, max_length=256),
+    limit: int = Query(20, ge=1, le=settings.SEARCH_PAGE_LIMIT),
+    cursor: str | None = Query(None, description='next_cursor предыдущей страницы'),
+    db: AsyncSession = Depends(get_async_session),
+    _: CalendarPrincipal = Depends(require_viewer)
+):
+    """Поиск по названию, описанию и текстовым блокам событий календаря, по убыванию релевантности."""
+    return await search_events(db, Event.calendar_id == calendar_id, q, limit, cursor)
 
 
-@router.get('/{event_id}')
+@router.get('/{event_id}', response_model=EventWithCalendarOut)
 async def get_event(
     calendar_id: int,
     event_id: int,
     db: AsyncSession = Depends(get_async_session),
-    current_user: User = Depends(get_current_user),
-    _ = Depends(require_viewer)
+    _: CalendarPrincipal = Depends(require_viewer)
 ):
     query = (
         select(Event)
         .options(joinedload(Event.calendar))
-        .where(Event.id == event_id)
+        .where(Event.id == event_id, Event.calendar_id == calendar_id)
     )
     
     result = await db.execute(query)
@@ -73,56 +208,110 @@ async def get_event(
     return event
  
 
-@router.post('/', status_code=status.HTTP_201_CREATED)
+@router.post('/', status_code=status.HTTP_201_CREATED, response_model=EventOut)
 async def create_event(
     calendar_id: int,
     event_data: EventCreate,
-    user: User = Depends(get_current_user),
-    _ = Depends(require_editor), 
+    response: Response,
+    conflicts: ConflictPolicy | None = Depends(_conflict_policy),
+    principal: CalendarPrincipal = Depends(require_editor),
     db: AsyncSession = Depends(get_async_session)
 ):
-    new_event = Event(
+    await touch_calendar(db, calendar_id)
+
+    new_event = await insert_returning(
+        db, Event,
         title=event_data.title,
         description=event_data.description,
         start=event_data.start,
         end=event_data.end,
         calendar_id=calendar_id,
-        created_by=user.id,
-        created_at=datetime.datetime.now()
+        created_by=principal.user.id,
+        created_at=datetime.datetime.now(datetime.timezone.utc),
+        rrule=event_data.rrule,
+        exdates=event_data.exdates,
+        timezone=event_data.timezone,
+        recurrence_until=_recurrence_until(
+            event_data.rrule, event_data.start, event_data.end, event_data.timezone
+        ),
     )
-    
-    db.add(new_event)
+    await check_conflicts(db, conflicts, new_event, response)
+    await invalidate_histograms(db, calendar_id, [_span(new_event)])
+    await notify_change(db, calendar_id, 'event', 'created', new_event.id)
     await db.commit()
-    await db.refresh(new_event)
-    
+
     return new_event
 
 
-@router.patch('/{event_id}')
-async def update_event(
+@router.post('/batch', response_model=EventBatchResult)
+async def batch_events(
     calendar_id: int,
-    event_id: int,
-    data: EventUpdate,
-    _ = Depends(require_editor),
+    batch: EventBatchRequest,
+    conflicts: ConflictPolicy | None = Depends(_conflict_policy),
+    principal: CalendarPrincipal = Depends(require_editor),
     db: AsyncSession = Depends(get_async_session),
 ):
-    stmt = select(Event).where(
-        Event.id == event_id,
-        Event.calendar_id == calendar_id
-    )
+    """
+    Создание, изменение и удаление многих событий одним запросом и одной транзакцией.
+    Результат — по каждой операции в исходном порядке, с кодом одиночного запроса.
+    С conflicts=reject любое пересечение (в том числе между событиями пакета)
+    отклоняет весь пакет: 409, ничего не записано.
+    """
+    await touch_calendar(db, calendar_id)
+    spans = []
+    results = await apply_event_batch(db, calendar_id, principal.user.id, batch.operations, spans)
+    if conflicts is not None:
+        await check_batch_conflicts(db, conflicts, results)
+    await invalidate_histograms(db, calendar_id, spans)
+
+    # Одно сообщение на пакет: подписчики дочитают изменения через /changes
+    await notify_change(db, calendar_id, 'event', 'batch')
+    await db.commit()
 
-    event = await db.scalar(stmt)
+    return EventBatchResult(results=results)
 
-    if not event:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Событие не найдено')
-
-    update_data = data.model_dump(exclude_unset=True)
 
-    for field, value in update_data.items():
-        setattr(event, field, value)
+@router.patch('/{event_id}', response_model=EventOut)
+async def update_event(
+    calendar_id: int,
+    event_id: int,
+    data: EventUpdate,
+    response: Response,
+    conflicts: ConflictPolicy | None = Depends(_conflict_policy),
+    _: CalendarPrincipal = Depends(require_editor),
+    db: AsyncSession = Depends(get_async_session),
+):
+    update_data = data.model_dump(exclude_unset=True, exclude={'version'})
+    where = [Event.id == event_id, Event.calendar_id == calendar_id]
+
+    await touch_calendar(db, calendar_id)
+    # Время, занятое событием до изменения, — для сброса кэша гистограмм
+    spans = []
+    if update_data.keys() & RECURRENCE_FIELDS:
+        # Конец серии зависит и от неизменённых полей — берём их из текущей строки
+        current = (await db.execute(
+            select(
+                Event.start, Event.end, Event.rrule, Event.timezone,
+                Event.recurrence_id, Event.recurrence_until,
+            ).where(*where)
+        )).one_or_none()
+        if current is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Событие не найдено')
+        spans.append(_span(current))
+        merged = {**current._asdict(), **update_data}
+        update_data['recurrence_until'] = _recurrence_until(
+            merged['rrule'], merged['start'], merged['end'], merged['timezone'], merged['recurrence_id']
+        )
 
+    event = await update_returning(
+        db, Event, where, update_data,
+        expected_version=data.version, not_found='Событие не найдено',
+    )
+    await check_conflicts(db, conflicts, event, response)
+    if update_data.keys() & HISTOGRAM_FIELDS:
+        await invalidate_histograms(db, calendar_id, [*spans, _span(event)])
+    await notify_change(db, calendar_id, 'event', 'updated', event_id)
     await db.commit()
-    await db.refresh(event)
 
     return event
 
@@ -131,77 +320,308 @@ async def update_event(
 async def delete_event(
     calendar_id: int,
     event_id: int,
-    _ = Depends(require_editor),
+    _: CalendarPrincipal = Depends(require_editor),
     db: AsyncSession = Depends(get_async_session)
 ):  
-    stmt = select(Event).where(
-        Event.id == event_id, 
-        Event.calendar_id == calendar_id
+    await touch_calendar(db, calendar_id)
+    # Вместе с изменёнными экземплярами серии
+    series_rows = or_(Event.id == event_id, Event.recurrence_id == event_id)
+    event_ids = select(Event.id).where(Event.calendar_id == calendar_id, series_rows)
+    await tombstone_events(db, calendar_id, event_ids)
+    await db.execute(
+        delete(EventContent).where(EventContent.event_id.in_(event_ids)),
+        execution_options={'synchronize_session': False},
     )
-    event_to_delete = await db.scalar(stmt)
-    
-    if not event_to_delete:
+    deleted = (await db.execute(
+        delete(Event)
+        .where(Event.calendar_id == calendar_id, series_rows)
+        .returning(Event.id, Event.start, Event.end, Event.rrule, Event.recurrence_until),
+        execution_options={'synchronize_session': False},
+    )).all()
+    if not any(row.id == event_id for row in deleted):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Событие не найдено')
 
-    await db.delete(event_to_delete)
+    await invalidate_histograms(db, calendar_id, [
+        event_span(row.start, row.end, row.rrule, row.recurrence_until) for row in deleted
+    ])
+    await notify_change(db, calendar_id, 'event', 'deleted', event_id)
     await db.commit()
 
-
     return { 'detail': 'Событие успешно удалено' }
 
 
+async def _get_series_occurrence(
+    db: AsyncSession,
+    calendar_id: int,
+    event_id: int,
+    occurrence_start: datetime.datetime,
+) -> Event:
+    series = await db.scalar(
+        select(Event).where(Event.id == event_id, Event.calendar_id == calendar_id)
+    )
+    if not series:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Событие не найдено')
+    if not series.rrule:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Событие не повторяется')
+
+    if (
+        occurrence_start in (series.exdates or ())
+        or not is_occurrence(parse_rrule(series.rrule), series.start, occurrence_start, series.timezone)
+    ):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Экземпляр серии не найден')
+    return series
+
+
+@router.put('/{event_id}/occurrences/{occurrence_start}', response_model=EventOut)
+async def update_occurrence(
+    calendar_id: int,
+    event_id: int,
+    occurrence_start: datetime.datetime,
+    data: OccurrenceUpdate,
+    principal: CalendarPrincipal = Depends(require_editor),
+    db: AsyncSession = Depends(get_async_session),
+):
+    """Изменяет один экземпляр серии: он сохраняется отдельной строкой-исключением."""
+    occurrence_start = as_aware(occurrence_start)
+    series = await _get_series_occurrence(db, calendar_id, event_id, occurrence_start)
+    await touch_calendar(db, calendar_id)
+
+    override = await db.scalar(
+        select(Event).where(
+            Event.recurrence_id == event_id,
+            Event.recurrence_start == occurrence_start,
+        )
+    )
+    # Время экземпляра по серии и изменённой строки до и после
+    slot = (occurrence_start, occurrence_start + (series.end - series.start))
+    spans = [slot]
+    action = 'updated'
+    if override is not None:
+        spans.append(_span(override))
+    else:
+        override = Event(
+            title=series.title,
+            description=series.description,
+            start=occurrence_start,
+            end=occurrence_start + (series.end - series.start),
+            calendar_id=calendar_id,
+            created_by=principal.user.id,
+            created_at=datetime.datetime.now(datetime.timezone.utc),
+            recurrence_id=event_id,
+            recurrence_start=occurrence_start,
+        )
+        db.add(override)
+        action = 'created'
+
+    for field, value in data.model_dump(exclude_unset=True).items():
+        setattr(override, field, value)
+
+    await db.flush()
+    await invalidate_histograms(db, calendar_id, [*spans, _span(override)])
+    await notify_change(db, calendar_id, 'event', action, override.id)
+    await db.commit()
+    await db.refresh(override)
+
+    return override
+
+
+@router.delete('/{event_id}/occurrences/{occurrence_start}')
+async def delete_occurrence(
+    calendar_id: int,
+    event_id: int,
+    occurrence_start: datetime.datetime,
+    _: CalendarPrincipal = Depends(require_editor),
+    db: AsyncSession = Depends(get_async_session),
+):
+    """Удаляет один экземпляр серии (EXDATE) вместе с его изменённой строкой, если она есть."""
+    occurrence_start = as_aware(occurrence_start)
+    series = await _get_series_occurrence(db, calendar_id, event_id, occurrence_start)
+    await touch_calendar(db, calendar_id)
+
+    override = await db.scalar(
+        select(Event).where(
+            Event.recurrence_id == event_id,
+            Event.recurrence_start == occurrence_start,
+        )
+    )
+    spans = [(occurrence_start, occurrence_start + (series.end - series.start))]
+    if override is not None:
+        spans.append(_span(override))
+        await tombstone_events(db, calendar_id, [override.id])
+        await db.delete(override)
+        await notify_change(db, calendar_id, 'event', 'deleted', override.id)
+
+    series.exdates = [*(series.exdates or ()), occurrence_start]
+    await invalidate_histograms(db, calendar_id, spans)
+    await notify_change(db, calendar_id, 'event', 'updated', event_id)
+    await db.commit()
+
+    return { 'detail': 'Экземпляр серии удалён' }
+
+
 # --- STANDALONE EVENTS ---
 
 standalone_router = APIRouter(prefix='/events', tags=['Standalone Events'])
 
 
-@standalone_router.get('/{event_id}')
-async def get_standalone_event(
-    event_id: int,
+@standalone_router.get('/range')
+async def get_events_range_multi(
+    request: Request,
+    query: EventsRangeQuery = Depends(events_range),
+    calendar_ids: list[int] | None = Query(None),
+    projection: Projection | None = Depends(event_projection),
     db: AsyncSession = Depends(get_async_session),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
-    stmt = select(Event).options(joinedload(Event.calendar)).where(Event.id == event_id)
-    event = await db.scalar(stmt)
-    if not event:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Событие не найдено')
+    """
+    События всех (или перечисленных) календарей пользователя за период одним запросом,
+    сгруппированные по calendar_id: {"<calendar_id>": [event, ...]}.
+    Членство проверяется JOIN на calendar_users прямо в запросе событий.
+    """
+    if calendar_ids:
+        calendar_ids = list(dict.fromkeys(calendar_ids))
+        for calendar_id in calendar_ids:
+            if not await get_calendar_role(db, current_user.id, calendar_id):
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail=f'У вас нет прав на доступ к календарю {calendar_id}'
+                )
+
+    # ETag по версиям всех календарей пользователя: запрос дешевле выборки событий
+    versions = await get_user_calendar_versions(db, current_user.id)
+    etag = make_etag(
+        'events-multi', current_user.id, versions_key(versions),
+        query.from_date.isoformat(), query.to_date.isoformat(),
+        ','.join(map(str, calendar_ids or ())),
+        projection.etag_part() if projection else '',
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
 
-    # Проверка прав (viewer или выше)
-    perm_stmt = select(CalendarUser).where(
-        CalendarUser.calendar_id == event.calendar_id,
-        CalendarUser.user_id == current_user.id
+    stmt = (
+        select(*projection.columns('calendar_id', 'start') if projection else (Event,))
+        .join(
+            CalendarUser,
+            (CalendarUser.calendar_id == Event.calendar_id)
+            & (CalendarUser.user_id == current_user.id)
+        )
+        .where(events_overlapping(query.from_date, query.to_date))
+        .order_by(Event.calendar_id, Event.start)
+    )
+    scope = Event.calendar_id.in_(
+        select(CalendarUser.calendar_id).where(CalendarUser.user_id == current_user.id)
+    )
+    if calendar_ids:
+        stmt = stmt.where(Event.calendar_id.in_(calendar_ids))
+        scope = Event.calendar_id.in_(calendar_ids)
+
+    instances = await expand_series(db, scope, query.from_date, query.to_date)
+    rows = await db.stream(stmt) if projection else await db.stream_scalars(stmt)
+    rows = merge_sorted(rows, instances, occurrence_key)
+    return StreamingResponse(
+        stream_grouped_json(rows, lambda event: event.calendar_id, projection or EventOut, calendar_ids or ()),
+        media_type='application/json',
+        headers=etag_headers(etag),
     )
-    perm = await db.scalar(perm_stmt)
-    if not perm:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='У вас нет прав на просмотр этого события')
 
-    return event
 
+@standalone_router.get('/agenda', response_model=EventAgendaPage)
+async def get_my_agenda(
+    after: str | None = Query(None, description='next_cursor предыдущей страницы'),
+    limit: int = Query(20, ge=1, le=settings.AGENDA_PAGE_LIMIT),
+    calendar_ids: list[int] | None = Query(None),
+    projection: Projection | None = Depends(event_projection),
+    db: AsyncSession = Depends(get_async_session),
+    current_user: UserSnapshot = Depends(get_current_user)
+):
+    """
+    Ближайшие события по всем (или перечисленным) календарям пользователя:
+    идущие сейчас и будущие, включая экземпляры серий, по времени начала.
+    """
+    if calendar_ids:
+        calendar_ids = list(dict.fromkeys(calendar_ids))
+        for calendar_id in calendar_ids:
+            if not await get_calendar_role(db, current_user.id, calendar_id):
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail=f'У вас нет прав на доступ к календарю {calendar_id}'
+                )
+
+    return await get_agenda(db, current_user.id, calendar_ids, limit, after, projection)
+
+
+@standalone_router.get('/search', response_model=EventSearchPage)
+async def search_events_multi(
+    q: str = Query(..., min_length=1, max_length=256),
+    calendar_ids: list[int] | None = Query(None),
+    limit: int = Query(20, ge=1, le=settings.SEARCH_PAGE_LIMIT),
+    cursor: str | None = Query(None, description='next_cursor предыдущей страницы'),
+    db: AsyncSession = Depends(get_async_session),
+    current_user: UserSnapshot = Depends(get_current_user)
+):
+    """Поиск по всем (или перечисленным) календарям пользователя."""
+    scope = Event.calendar_id.in_(
+        select(CalendarUser.calendar_id).where(CalendarUser.user_id == current_user.id)
+    )
+    if calendar_ids:
+        for calendar_id in dict.fromkeys(calendar_ids):
+            if not await get_calendar_role(db, current_user.id, calendar_id):
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail=f'У вас нет прав на доступ к календарю {calendar_id}'
+                )
+        scope = Event.calendar_id.in_(calendar_ids)
+
+    return await search_events(db, scope, q, limit, cursor)
+
+
+async def _get_visible_event(db: AsyncSession, user_id: int, event_id: int, *options) -> Event:
+    """
+    Событие из календаря, где пользователь — участник: права проверяются JOIN в том же запросе.
+    Второй запрос — только при отказе, чтобы отличить 404 от 403.
+    """
+    event = await db.scalar(
+        select(Event)
+        .join(
+            CalendarUser,
+            (CalendarUser.calendar_id == Event.calendar_id)
+            & (CalendarUser.user_id == user_id)
+        )
+        .where(Event.id == event_id)
+        .options(*options)
+    )
+    if event is not None:
+        return event
+
+    if await db.scalar(select(Event.id).where(Event.id == event_id)) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Событие не найдено')
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='У вас нет прав на просмотр этого события')
 
-@standalone_router.get('/{event_id}/content')
-async def get_standalone_event_content(
+
+@standalone_router.get('/{event_id}', response_model=EventDetailOut | EventWithCalendarOut)
+async def get_standalone_event(
     event_id: int,
+    include: Literal['content'] | None = Query(None),
     db: AsyncSession = Depends(get_async_session),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
-    # 1. Получаем событие, чтобы узнать calendar_id
-    stmt = select(Event).where(Event.id == event_id)
-    event = await db.scalar(stmt)
-    if not event:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Событие не найдено')
+    """Событие с кратким описанием календаря; include=content — сразу с блоками контента."""
+    if include == 'content':
+        event = await _get_visible_event(
+            db, current_user.id, event_id,
+            joinedload(Event.calendar), selectinload(Event.contents),
+        )
+        return EventDetailOut.model_validate(event)
 
-    # 2. Проверка прав
-    perm_stmt = select(CalendarUser).where(
-        CalendarUser.calendar_id == event.calendar_id,
-        CalendarUser.user_id == current_user.id
-    )
-    perm = await db.scalar(perm_stmt)
-    if not perm:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='У вас нет прав на просмотр этого события')
+    event = await _get_visible_event(db, current_user.id, event_id, joinedload(Event.calendar))
+    return EventWithCalendarOut.model_validate(event)
 
-    # 3. Получаем контент
-    from models.event_content import EventContent
-    content_stmt = select(EventContent).where(EventContent.event_id == event_id).order_by(EventContent.order)
-    result = await db.execute(content_stmt)
-    return result.scalars().all()
 
+@standalone_router.get('/{event_id}/content', response_model=list[EventContentOut])
+async def get_standalone_event_content(
+    event_id: int,
+    db: AsyncSession = Depends(get_async_session),
+    current_user: UserSnapshot = Depends(get_current_user)
+):
+    event = await _get_visible_event(db, current_user.id, event_id, selectinload(Event.contents))
+    return event.contents
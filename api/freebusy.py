@@ -0,0 +1,139 @@
+from collections import defaultdict
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.cache import TTLCache
+from core.calendar_versions import make_etag, etag_matches, etag_headers, not_modified, versions_key
+from core.config import settings
+from core.database import get_async_session
+from core.deps import get_current_user, events_range
+from core.intervals import clip, merge_intervals
+from core.occurrences import expand_series
+from core.recurrence import as_aware
+from models.calendar import Calendar
+from models.calendar_user import CalendarUser
+from models.event import Event, events_overlapping
+from schemas.event import EventsRangeQuery
+from schemas.freebusy import BusyBlock, FreeBusyOut
+from schemas.user import UserSnapshot
+
+router = APIRouter(prefix="/freebusy", tags=["Free/Busy"])
+
+# Занятость пользователя за окно — уже слитые промежутки. Ключ включает версии всех
+# его календарей, поэтому любая запись в них (или смена состава календарей) даёт
+# новый ключ, а старая запись просто вытесняется
+busy_cache = TTLCache(
+    maxsize=settings.FREEBUSY_CACHE_SIZE,
+    ttl=settings.FREEBUSY_CACHE_TTL_SECONDS,
+)
+
+
+async def _user_calendars(db: AsyncSession, user_ids: list[int]) -> dict[int, list[tuple[int, int]]]:
+    """user_id -> [(calendar_id, version), ...] по возрастанию calendar_id."""
+    result = await db.execute(
+        select(CalendarUser.user_id, Calendar.id, Calendar.version)
+        .join(Calendar, Calendar.id == CalendarUser.calendar_id)
+        .where(CalendarUser.user_id.in_(user_ids))
+        .order_by(CalendarUser.user_id, Calendar.id)
+    )
+    calendars: dict[int, list[tuple[int, int]]] = defaultdict(list)
+    for user_id, calendar_id, version in result.all():
+        calendars[user_id].append((calendar_id, version))
+    return calendars
+
+
+async def _load_busy(
+    db: AsyncSession,
+    calendars: dict[int, list[tuple[int, int]]],
+    query: EventsRangeQuery,
+) -> dict[int, list[tuple]]:
+    """Слитые занятые промежутки пользователей по событиям и экземплярам серий их календарей."""
+    owners: dict[int, list[int]] = defaultdict(list)
+    for user_id, user_calendars in calendars.items():
+        for calendar_id, _ in user_calendars:
+            owners[calendar_id].append(user_id)
+    if not owners:
+        return {user_id: [] for user_id in calendars}
+
+    scope = Event.calendar_id.in_(list(owners))
+    # Только границы событий; кандидатов отбирает GiST-индекс по периоду
+    singles = await db.execute(
+        select(Event.calendar_id, Event.start, Event.end)
+        .where(scope, events_overlapping(query.from_date, query.to_date))
+    )
+    instances = await expand_series(db, scope, query.from_date, query.to_date)
+
+    intervals: dict[int, list[tuple]] = {user_id: [] for user_id in calendars}
+    for calendar_id, start, end in (
+        *singles.all(),
+        *((event.calendar_id, event.start, event.end) for event in instances),
+    ):
+        for user_id in owners[calendar_id]:
+            intervals[user_id].append((start, end))
+
+    window_start, window_end = as_aware(query.from_date), as_aware(query.to_date)
+    return {
+        user_id: merge_intervals(sorted(clip(items, window_start, window_end)))
+        for user_id, items in intervals.items()
+    }
+
+
+# ── GET /freebusy ─────────────────────────────────────────────────────────────
+@router.get("", response_model=FreeBusyOut)
+async def get_freebusy(
+    request: Request,
+    response: Response,
+    query: EventsRangeQuery = Depends(events_range),
+    users: list[int] = Query(..., description="id пользователей"),
+    db: AsyncSession = Depends(get_async_session),
+    current_user: UserSnapshot = Depends(get_current_user),
+):
+    """
+    Занятость пользователей за период по всем их календарям — только промежутки,
+    без содержимого событий. Доступна для себя и для тех, с кем есть общий календарь.
+    """
+    user_ids = list(dict.fromkeys(users))
+    if len(user_ids) > settings.FREEBUSY_MAX_USERS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Не больше {settings.FREEBUSY_MAX_USERS} пользователей за запрос",
+        )
+
+    calendars = await _user_calendars(db, [current_user.id, *user_ids])
+    own = {calendar_id for calendar_id, _ in calendars.get(current_user.id, ())}
+    for user_id in user_ids:
+        if user_id != current_user.id and not own.intersection(
+            calendar_id for calendar_id, _ in calendars.get(user_id, ())
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Нет общих календарей с пользователем {user_id}",
+            )
+
+    window = (query.from_date.isoformat(), query.to_date.isoformat())
+    keys = {
+        user_id: (user_id, *window, versions_key(calendars.get(user_id, ())))
+        for user_id in user_ids
+    }
+    etag = make_etag("freebusy", *window, *(keys[user_id] for user_id in user_ids))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    busy = {user_id: busy_cache.get(keys[user_id]) for user_id in user_ids}
+    missing = {user_id: calendars.get(user_id, []) for user_id, blocks in busy.items() if blocks is None}
+    if missing:
+        for user_id, blocks in (await _load_busy(db, missing, query)).items():
+            busy_cache.set(keys[user_id], blocks)
+            busy[user_id] = blocks
+
+    response.headers.update(etag_headers(etag))
+    return FreeBusyOut(
+        from_date=query.from_date,
+        to_date=query.to_date,
+        busy={
+            user_id: [BusyBlock(start=start, end=end) for start, end in blocks]
+            for user_id, blocks in busy.items()
+        },
+    )
@@ -0,0 +1,92 @@
+import time
+from urllib.parse import urlsplit
+
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.calendar_versions import touch_calendar
+from core.config import settings
+from core.database import get_async_session
+from core.deps import require_editor, require_viewer, CalendarPrincipal
+from core.histogram import invalidate_histograms
+from core.ical import CONTENT_TYPE, import_events, stream_calendar
+from core.realtime import notify_change
+from models.calendar import Calendar
+from models.event import Event
+from schemas.event import EventImportResult
+
+router = APIRouter(prefix="/calendars/{calendar_id}", tags=["iCalendar"])
+
+# Домен в UID экспортируемых событий: event-<id>@<домен>
+UID_DOMAIN = urlsplit(settings.FRONTEND_URL).hostname or "localhost"
+
+# Строк за одно чтение из серверного курсора
+EXPORT_FETCH_SIZE = 500
+
+
+# ── GET /export.ics ───────────────────────────────────────────────────────────
+@router.get("/export.ics")
+async def export_calendar(
+    calendar_id: int,
+    db: AsyncSession = Depends(get_async_session),
+    _: CalendarPrincipal = Depends(require_viewer),
+):
+    """
+    Календарь целиком в формате iCalendar: серии с RRULE/EXDATE, изменённые
+    экземпляры — с RECURRENCE-ID. Отдаётся потоком, по мере чтения из БД.
+    """
+    name = await db.scalar(select(Calendar.name).where(Calendar.id == calendar_id))
+    if name is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Календарь не найден")
+
+    # Серия раньше своих изменённых экземпляров: они всегда создаются позже
+    rows = await db.stream_scalars(
+        select(Event)
+        .where(Event.calendar_id == calendar_id)
+        .order_by(Event.id)
+        .execution_options(yield_per=EXPORT_FETCH_SIZE)
+    )
+    return StreamingResponse(
+        stream_calendar(rows, name, UID_DOMAIN),
+        media_type=CONTENT_TYPE,
+        headers={"Content-Disposition": f'attachment; filename="calendar-{calendar_id}.ics"'},
+    )
+
+
+# ── POST /import ──────────────────────────────────────────────────────────────
+@router.post("/import", response_model=EventImportResult)
+async def import_calendar(
+    calendar_id: int,
+    file: UploadFile = File(..., description="Файл .ics"),
+    principal: CalendarPrincipal = Depends(require_editor),
+    db: AsyncSession = Depends(get_async_session),
+):
+    """
+    Добавляет в календарь события из файла iCalendar одной транзакцией.
+    Ошибочные события пропускаются и перечисляются в errors (с номером строки и UID),
+    остальные импортируются.
+    """
+    started = time.perf_counter()
+    await touch_calendar(db, calendar_id)
+
+    spans = []
+    try:
+        result = await import_events(db, calendar_id, principal.user.id, file, spans)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from None
+
+    await invalidate_histograms(db, calendar_id, spans)
+    if result.imported:
+        # Одно сообщение на импорт: подписчики дочитают изменения через /changes
+        await notify_change(db, calendar_id, "event", "batch")
+    await db.commit()
+
+    elapsed = time.perf_counter() - started
+    processed = result.imported + result.skipped + result.failed
+    print(f"[~] ICS import into calendar {calendar_id}: {processed} events in {elapsed * 1000:.0f} ms")
+    return result.model_copy(update={
+        "elapsed_ms": round(elapsed * 1000, 1),
+        "events_per_second": round(processed / elapsed, 1) if elapsed else 0,
+    })
@@ -1,11 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 import secrets
 from datetime import datetime, timedelta, timezone
-from schemas.user import UserPublic, ChangeUserRole, ChangePassword, ChangeUserPermissions, ProfileUpdate
+from schemas.user import UserPublic, UserSnapshot, ChangeUserRole, ChangePassword, ChangeUserPermissions, ProfileUpdate
 
-from core.deps import get_current_user, allow_admin
-from core.security import verify_password, get_password_hash
+from core.deps import get_current_user, allow_admin, invalidate_user
+from core.security import verify_password_async, get_password_hash_async
 from core.database import get_async_session
+from core.streaming import ndjson_requested, ndjson_response
+from core.revocation import revoke_access_tokens
+from core.calendar_versions import touch_user_calendars
+from core.writes import update_returning
 
 from models.user import User
 
@@ -18,39 +22,45 @@ router = APIRouter(prefix='/user', tags=['Users'])
 
 
 @router.get('/me', response_model=UserPublic)
-async def get_me(current_user: User = Depends(get_current_user)):
+async def get_me(current_user: UserSnapshot = Depends(get_current_user)):
     return current_user
 
 
 @router.patch('/me', response_model=UserPublic)
 async def update_profile(
     data: ProfileUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session),
 ):
-    if data.username:
+    values = data.model_dump(exclude_unset=True, exclude_none=True)
+    if not values:
+        return current_user
+
+    if 'username' in values:
         # Check if username is already taken
         existing_user = await db.scalar(
-            select(User).where(User.username == data.username, User.id != current_user.id)
+            select(User.id).where(User.username == data.username, User.id != current_user.id)
         )
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail='Пользователь с таким логином уже существует'
             )
-        current_user.username = data.username
-    
-    if data.display_name is not None:
-        current_user.display_name = data.display_name
-        
+
+    # Имя пользователя входит в списки участников его календарей
+    await touch_user_calendars(db, current_user.id)
+    await revoke_access_tokens(db, current_user.id)
+    user = await update_returning(
+        db, User, [User.id == current_user.id], values, not_found='Пользователь не найден'
+    )
+    await invalidate_user(db, user.id)
     await db.commit()
-    await db.refresh(current_user)
-    return current_user
+    return user
 
 
 @router.post('/telegram/generate-token')
 async def generate_telegram_token(
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session),
 ):
     if current_user.telegram_id:
@@ -60,8 +70,9 @@ async def generate_telegram_token(
         )
 
     token = secrets.token_urlsafe(16)
-    current_user.telegram_connect_token = token
-    current_user.telegram_connect_token_expires_at = datetime.now(timezone.utc) + timedelta(minutes=10)
+    user = await db.get(User, current_user.id)
+    user.telegram_connect_token = token
+    user.telegram_connect_token_expires_at = datetime.now(timezone.utc) + timedelta(minutes=10)
     
     await db.commit()
     
@@ -70,7 +81,7 @@ async def generate_telegram_token(
 
 @router.delete('/telegram')
 async def unlink_telegram(
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session),
 ):
     if not current_user.telegram_id:
@@ -79,17 +90,24 @@ async def unlink_telegram(
             detail='Telegram не привязан'
         )
     
-    current_user.telegram_id = None
+    user = await db.get(User, current_user.id)
+    user.telegram_id = None
+    await revoke_access_tokens(db, user.id)
+    await invalidate_user(db, user.id)
     await db.commit()
     
     return {'detail': 'Telegram успешно отвязан'}
 
 
-@router.get('/all-list')
+@router.get('/all-list', response_model=list[UserPublic])
 async def get_all_users(
-    admin: User = Depends(allow_admin),
+    stream: bool = Depends(ndjson_requested),
+    admin: UserSnapshot = Depends(allow_admin),
     db: AsyncSession = Depends(get_async_session),
 ):
+    if stream:
+        return ndjson_response(await db.stream_scalars(select(User).order_by(User.id)), UserPublic)
+
     result = await db.execute(select(User))
     users = result.scalars().all()
 
@@ -99,7 +117,7 @@ async def get_all_users(
 @router.delete('/{user_id}')
 async def delete_user(
     user_id: int,
-    admin: User = Depends(allow_admin), 
+    admin: UserSnapshot = Depends(allow_admin), 
     db: AsyncSession = Depends(get_async_session),
 ):
     user_to_delete = await db.scalar(
@@ -115,7 +133,10 @@ async def delete_user(
             detail='Вы не можете удалить свою собственную учетную запись'
         )
     
+    await touch_user_calendars(db, user_id)
     await db.delete(user_to_delete)
+    await revoke_access_tokens(db, user_id, deleted=True)
+    await invalidate_user(db, user_id)
     await db.commit()
 
     return { 'detail': f'Пользователь {user_to_delete.username} успешно удален' }
@@ -124,20 +145,24 @@ async def delete_user(
 @router.patch('/change_password')
 async def change_password(
     data: ChangePassword,
-    user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session),
 ):
-    if not verify_password(data.old_password, user.password_hash):
+    user = await db.get(User, current_user.id)
+
+    if not await verify_password_async(data.old_password, user.password_hash):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Текущий пароль не верный')
     
-    if verify_password(data.new_password, user.password_hash):
+    if await verify_password_async(data.new_password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail='Новый пароль не должен совпадать с текущим'
         )
 
     
-    user.password_hash = get_password_hash(data.new_password)
+    user.password_hash = await get_password_hash_async(data.new_password)
+    await revoke_access_tokens(db, user.id)
+    await invalidate_user(db, user.id)
     await db.commit()
 
     return { 'detail': 'Пароль успешно изменен' }
@@ -147,7 +172,7 @@ async def change_password(
 async def change_user_role(
     user_id: int,
     data: ChangeUserRole,
-    admin: User = Depends(allow_admin),
+    admin: UserSnapshot = Depends(allow_admin),
     db: AsyncSession = Depends(get_async_session),
 ):
     
@@ -163,6 +188,8 @@ async def change_user_role(
     
     username = user_to_change_role.username
     user_to_change_role.role = data.role
+    await revoke_access_tokens(db, user_id)
+    await invalidate_user(db, user_id)
     await db.commit()
 
     return { 'detail': f'Роль {data.role} выбрана для {username}' }
@@ -172,7 +199,7 @@ async def change_user_role(
 async def change_user_permissions(
     user_id: int,
     data: ChangeUserPermissions,
-    admin: User = Depends(allow_admin),
+    admin: UserSnapshot = Depends(allow_admin),
     db: AsyncSession = Depends(get_async_session),
 ):
     user_to_change = await db.scalar(
@@ -184,6 +211,8 @@ async def change_user_permissions(
     
     username = user_to_change.username
     user_to_change.is_items_corrector = data.is_items_corrector
+    await revoke_access_tokens(db, user_id)
+    await invalidate_user(db, user_id)
     await db.commit()
 
     status_str = "назначен корректором" if data.is_items_corrector else "снят с должности корректора"
@@ -194,7 +223,7 @@ async def change_user_permissions(
 async def search_users(
     q: str = "",
     db: AsyncSession = Depends(get_async_session),
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
 ):
     if not q:
         # Return some initial candidates (excluding current user)
@@ -0,0 +1,122 @@
+"""
+Пакетная запись событий против поштучной, через HTTP на работающем сервере.
+
+    BENCH_USERNAME=... BENCH_PASSWORD=... python -m benchmarks.batch_writes [events]
+
+BENCH_BASE_URL — адрес сервера (по умолчанию http://localhost:8000).
+Создаёт временный календарь, по очереди прогоняет оба пути
+(создание, сдвиг на час, удаление) и удаляет календарь.
+"""
+import asyncio
+import datetime
+import os
+import sys
+import time
+import uuid
+
+import httpx
+
+BASE_URL = os.environ.get("BENCH_BASE_URL", "http://localhost:8000")
+
+
+def _event(i: int) -> dict:
+    start = datetime.datetime(2030, 1, 1, tzinfo=datetime.timezone.utc) + datetime.timedelta(hours=i)
+    return {
+        "title": f"Событие {i}",
+        "start": start.isoformat(),
+        "end": (start + datetime.timedelta(minutes=45)).isoformat(),
+    }
+
+
+def _shift(event: dict) -> dict:
+    return {
+        field: (datetime.datetime.fromisoformat(event[field]) + datetime.timedelta(hours=1)).isoformat()
+        for field in ("start", "end")
+    }
+
+
+async def per_item(client: httpx.AsyncClient, prefix: str, count: int) -> dict[str, float]:
+    timings = {}
+
+    started = time.perf_counter()
+    ids = []
+    for i in range(count):
+        response = await client.post(f"{prefix}/", json=_event(i))
+        response.raise_for_status()
+        ids.append(response.json()["id"])
+    timings["create"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for i, event_id in enumerate(ids):
+        response = await client.patch(f"{prefix}/{event_id}", json=_shift(_event(i)))
+        response.raise_for_status()
+    timings["update"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for event_id in ids:
+        response = await client.delete(f"{prefix}/{event_id}")
+        response.raise_for_status()
+    timings["delete"] = time.perf_counter() - started
+
+    return timings
+
+
+async def batch(client: httpx.AsyncClient, prefix: str, count: int) -> dict[str, float]:
+    async def send(operations):
+        response = await client.post(f"{prefix}/batch", json={"operations": operations})
+        response.raise_for_status()
+        results = response.json()["results"]
+        assert all(result["status"] < 400 for result in results), results
+        return results
+
+    timings = {}
+
+    started = time.perf_counter()
+    results = await send([{"op": "create", "data": _event(i)} for i in range(count)])
+    ids = [result["id"] for result in results]
+    timings["create"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    await send([
+        {"op": "update", "id": event_id, "data": _shift(_event(i))}
+        for i, event_id in enumerate(ids)
+    ])
+    timings["update"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    await send([{"op": "delete", "id": event_id} for event_id in ids])
+    timings["delete"] = time.perf_counter() - started
+
+    return timings
+
+
+async def main(count: int) -> None:
+    async with httpx.AsyncClient(base_url=BASE_URL, timeout=60) as client:
+        response = await client.post("/auth/login", data={
+            "username": os.environ["BENCH_USERNAME"],
+            "password": os.environ["BENCH_PASSWORD"],
+        })
+        response.raise_for_status()
+
+        response = await client.post("/calendars/", json={"name": f"bench-{uuid.uuid4().hex[:8]}"})
+        response.raise_for_status()
+        calendar_id = response.json()["id"]
+        prefix = f"/calendars/{calendar_id}/events"
+
+        try:
+            results = {
+                "per-item": await per_item(client, prefix, count),
+                "batch": await batch(client, prefix, count),
+            }
+        finally:
+            await client.delete(f"/calendars/{calendar_id}")
+
+    for name, timings in results.items():
+        print(f"{name:>8}: " + ", ".join(
+            f"{op} {elapsed * 1000:7.1f} ms ({elapsed / count * 1000:.2f} ms/событие)"
+            for op, elapsed in timings.items()
+        ))
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200))
@@ -0,0 +1,119 @@
+"""
+Стоимость сериализации ответа /events/range на одну строку.
+
+    python -m benchmarks.serialization [rows] [repeats]
+
+before — как было без response_model: jsonable_encoder обходит ORM-объекты
+           и JSONResponse делает json.dumps;
+after  — response_model=list[EventOut] (валидация from_attributes + dump в pydantic-core)
+           и ORJSONResponse;
+ndjson — потоковый режим, по одной строке через model_dump_json.
+
+База не нужна: события создаются в памяти, без связей (как их отдаёт выборка диапазона).
+"""
+import datetime
+import json
+import sys
+import time
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+import main as app_module  # noqa: F401  — регистрирует все модели для мапперов
+from models.event import Event
+from schemas.event import EventOut
+
+
+def make_events(count: int) -> list[Event]:
+    base = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+    return [
+        Event(
+            id=i,
+            calendar_id=1,
+            title=f"Событие {i}",
+            description="Описание события " * 4,
+            start=base + datetime.timedelta(hours=i),
+            end=base + datetime.timedelta(hours=i, minutes=45),
+            created_by=1,
+            created_at=base,
+            updated_at=base,
+            version=1,
+        )
+        for i in range(count)
+    ]
+
+
+def serialize_before(events: list[Event]) -> bytes:
+    return json.dumps(
+        jsonable_encoder(events),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+_events_adapter = TypeAdapter(list[EventOut])
+
+
+def serialize_after(events: list[Event]) -> bytes:
+    validated = _events_adapter.validate_python(events, from_attributes=True)
+    return orjson.dumps(_events_adapter.dump_python(validated, mode="json"))
+
+
+def serialize_ndjson(events: list[Event]) -> bytes:
+    return b"".join(
+        EventOut.model_validate(event).model_dump_json().encode() + b"\n"
+        for event in events
+    )
+
+
+def same_rows(before: bytes, after: bytes) -> bool:
+    """
+    Строки совпадают по общим полям: before отдаёт только загруженные атрибуты,
+    EventOut — все свои поля (незаданные как null). UTC pydantic пишет как "Z".
+    """
+    before_rows = orjson.loads(before)
+    after_rows = orjson.loads(after.replace(b'Z"', b'+00:00"'))
+    if len(before_rows) != len(after_rows):
+        return False
+    for old, new in zip(before_rows, after_rows):
+        shared = old.keys() & new.keys()
+        if not shared >= {"id", "start", "end"} or any(old[name] != new[name] for name in shared):
+            return False
+    return True
+
+
+def measure(func, events: list[Event], repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func(events)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    events = make_events(rows)
+
+    assert same_rows(serialize_before(events), serialize_after(events))
+
+    baseline = None
+    for name, func in (
+        ("before", serialize_before),
+        ("after", serialize_after),
+        ("ndjson", serialize_ndjson),
+    ):
+        elapsed = measure(func, events, repeats)
+        baseline = baseline or elapsed
+        print(
+            f"{name:>7}: {elapsed * 1000:8.1f} ms на {rows} строк, "
+            f"{elapsed / rows * 1e6:6.2f} мкс/строка, x{baseline / elapsed:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
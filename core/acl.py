@@ -0,0 +1,81 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core import pubsub
+from core.cache import TTLCache
+from core.config import settings
+from models.calendar_user import CalendarUser
+from schemas.auth import LocalRole
+
+# Кэш членства в календарях: (user_id, calendar_id) -> LocalRole | None.
+# None тоже кэшируется (нет доступа), поэтому любые изменения calendar_users
+# обязаны вызывать invalidate_membership() до commit.
+membership_cache = TTLCache(
+    maxsize=settings.ACL_CACHE_SIZE,
+    ttl=settings.ACL_CACHE_TTL_SECONDS,
+)
+
+MEMBERSHIP_CHANNEL = "calendar_membership"
+
+_MISSING = object()
+
+
+def remember_role(user_id: int, calendar_id: int, role: LocalRole | None) -> None:
+    membership_cache.set((user_id, calendar_id), role)
+
+
+async def get_calendar_role(
+    db: AsyncSession,
+    user_id: int,
+    calendar_id: int,
+) -> LocalRole | None:
+    role = membership_cache.get((user_id, calendar_id), _MISSING)
+    if role is not _MISSING:
+        return role
+
+    raw_role = await db.scalar(
+        select(CalendarUser.role).where(
+            CalendarUser.calendar_id == calendar_id,
+            CalendarUser.user_id == user_id,
+        )
+    )
+    role = LocalRole(raw_role) if raw_role else None
+    remember_role(user_id, calendar_id, role)
+    return role
+
+
+def _drop(calendar_id: int, user_id: int | None = None) -> None:
+    if user_id is not None:
+        membership_cache.pop((user_id, calendar_id))
+    else:
+        membership_cache.pop_where(lambda key, _: key[1] == calendar_id)
+
+
+async def invalidate_membership(
+    db: AsyncSession,
+    calendar_id: int,
+    user_id: int | None = None,
+) -> None:
+    """
+    Сбрасывает кэш членства (для одного пользователя или всего календаря) в этом процессе
+    и рассылает NOTIFY остальным воркерам. Вызывать в той же транзакции, что и изменение:
+    уведомление уйдёт после commit и заодно перекроет гонку с параллельными чтениями.
+    """
+    _drop(calendar_id, user_id)
+    await pubsub.publish(
+        db,
+        MEMBERSHIP_CHANNEL,
+        f"{calendar_id}:{'*' if user_id is None else user_id}",
+    )
+
+
+def _on_membership_notify(payload: str | None) -> None:
+    if payload is None:
+        membership_cache.clear()
+        return
+
+    calendar_id, user_id = payload.split(":")
+    _drop(int(calendar_id), None if user_id == "*" else int(user_id))
+
+
+pubsub.subscribe(MEMBERSHIP_CHANNEL, _on_membership_notify)
@@ -0,0 +1,138 @@
+import datetime
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import select, true, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.occurrences import expand_series
+from core.projection import Projection
+from models.calendar_user import CalendarUser
+from models.event import Event, events_overlapping
+from schemas.event import EventAgendaPage, EventOut
+
+# Ближайшие события пользователя по всем его календарям — идущие сейчас и будущие,
+# по (start, id). Страницы — keyset: курсор "<start в микросекундах>:<id>" последней
+# строки, без OFFSET.
+#
+# Будущие одиночные события берутся LATERAL-подзапросом по каждому календарю:
+# в каждом — диапазон индекса ix_events_calendar_start_id от курсора и не больше
+# limit + 1 строк, поэтому страница стоит одинаково на любой глубине. Идущие сейчас
+# (начались раньше now) — отдельным запросом по GiST-индексу, только пока курсор до now.
+# Экземпляры серий разворачиваются до начала (limit + 1)-й одиночной строки —
+# дальше них на страницу ничего не попадёт, — а если одиночных меньше,
+# то на AGENDA_SERIES_HORIZON_DAYS вперёд от начала страницы.
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+_MICROSECOND = datetime.timedelta(microseconds=1)
+
+
+def make_cursor(event) -> str:
+    return f"{(event.start - _EPOCH) // _MICROSECOND}:{event.id}"
+
+
+def parse_cursor(cursor: str | None) -> tuple[datetime.datetime, int] | None:
+    if not cursor:
+        return None
+    try:
+        start, event_id = cursor.split(":")
+        return _EPOCH + int(start) * _MICROSECOND, int(event_id)
+    except (ValueError, OverflowError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Некорректный курсор агенды") from None
+
+
+def _agenda_key(event) -> tuple:
+    return event.start, event.id
+
+
+async def get_agenda(
+    db: AsyncSession,
+    user_id: int,
+    calendar_ids: list[int] | None,
+    limit: int,
+    cursor: str | None = None,
+    projection: Projection | None = None,
+) -> EventAgendaPage | Response:
+    """
+    Страница агенды после курсора; calendar_ids — только эти календари (права проверены).
+    С projection — готовый ответ только с выбранными полями событий.
+    """
+    now = datetime.datetime.now(datetime.timezone.utc)
+    after = parse_cursor(cursor)
+
+    calendars = select(CalendarUser.calendar_id).where(CalendarUser.user_id == user_id)
+    if calendar_ids:
+        calendars = calendars.where(CalendarUser.calendar_id.in_(calendar_ids))
+
+    def keyset(stmt, model):
+        if after is None:
+            return stmt
+        # Простая граница по start — для индекса, сравнение кортежей — точное
+        return stmt.where(model.start >= after[0], tuple_(model.start, model.id) > tuple_(*after))
+
+    # С projection — строки Row только с нужными колонками, без ORM-объектов
+    columns = projection.columns("start") if projection else (Event,)
+    fetch = db.execute if projection else db.scalars
+
+    singles = []
+    if after is None or after[0] < now:
+        ongoing = await fetch(
+            keyset(select(*columns), Event)
+            .where(Event.calendar_id.in_(calendars), events_overlapping(now, now))
+            .order_by(Event.start, Event.id)
+            .limit(limit + 1)
+        )
+        singles.extend(ongoing.all())
+
+    my_calendars = calendars.subquery("my_calendars")
+    # Только ключи: строки целиком читаются уже для итоговых limit + 1
+    upcoming = (
+        keyset(select(Event.id, Event.start), Event)
+        .where(
+            Event.calendar_id == my_calendars.c.calendar_id,
+            Event.rrule.is_(None),
+            Event.start >= now,
+        )
+        .order_by(Event.start, Event.id)
+        .limit(limit + 1)
+        .correlate(my_calendars)
+        .lateral("upcoming")
+    )
+    result = await fetch(
+        select(*columns)
+        .select_from(my_calendars)
+        .join(upcoming, true())
+        .join(Event, Event.id == upcoming.c.id)
+        .order_by(upcoming.c.start, upcoming.c.id)
+        .limit(limit + 1)
+    )
+    singles.extend(result.all())
+    singles.sort(key=_agenda_key)
+    singles = singles[:limit + 1]
+
+    window_start = max(now, after[0]) if after else now
+    if len(singles) > limit:
+        # Не раньше чем через микросекунду после начала окна: экземпляры, идущие сейчас, нужны всегда
+        window_end = max(singles[limit].start, window_start) + _MICROSECOND
+    else:
+        window_end = window_start + datetime.timedelta(days=settings.AGENDA_SERIES_HORIZON_DAYS)
+    instances = [
+        instance
+        for instance in await expand_series(db, Event.calendar_id.in_(calendars), window_start, window_end)
+        if instance.end > now and (after is None or _agenda_key(instance) > after)
+    ]
+
+    if not projection:
+        singles = [EventOut.model_validate(event) for event in singles]
+    items = sorted([*singles, *instances], key=_agenda_key)
+    has_more = len(items) > limit
+    items = items[:limit]
+    if projection:
+        return projection.response({
+            "items": [projection.to_dict(item) for item in items],
+            "next_cursor": make_cursor(items[-1]) if has_more else None,
+        })
+    return EventAgendaPage(
+        items=items,
+        next_cursor=make_cursor(items[-1]) if has_more else None,
+    )
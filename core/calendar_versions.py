@@ -0,0 +1,107 @@
+import hashlib
+from typing import Iterable
+
+from fastapi import Request, Response, status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.calendar import Calendar
+from models.calendar_user import CalendarUser
+
+# Версия календаря — счётчик, который растёт при любой записи в календарь: события,
+# блоки контента, участники и их имена, настройки. По версии строится ETag ответов
+# чтения, и на If-None-Match сервер отвечает 304, не выполняя сам запрос выборки.
+#
+# Любой обработчик, меняющий данные календаря, обязан вызвать touch_calendar()
+# в той же транзакции, до самих изменений. UPDATE заодно берёт блокировку строки
+# календаря, так что параллельные записи в один календарь выстраиваются в очередь,
+# а номера ленты изменений (models/change_feed.py) идут в порядке commit.
+#
+# Версию читаем до выборки данных: если запись успеет закоммититься между ними,
+# клиент получит новые данные со старым ETag и просто перезапросит их ещё раз.
+# Обратного (старые данные с новым ETag) быть не может.
+
+
+async def touch_calendar(db: AsyncSession, calendar_id: int) -> int | None:
+    """Увеличивает версию календаря. Возвращает новую версию или None, если календаря нет."""
+    return await db.scalar(
+        update(Calendar)
+        .where(Calendar.id == calendar_id)
+        .values(version=Calendar.version + 1)
+        .returning(Calendar.version)
+    )
+
+
+async def lock_calendars(db: AsyncSession, calendar_ids) -> None:
+    """
+    Блокирует строки календарей до конца транзакции — по возрастанию id, чтобы две
+    записи с пересекающимися наборами календарей не заблокировали друг друга.
+    Вызывать до touch_calendar: он тогда берёт уже свою блокировку.
+    """
+    await db.execute(
+        select(Calendar.id)
+        .where(Calendar.id.in_(sorted(calendar_ids)))
+        .order_by(Calendar.id)
+        .with_for_update()
+    )
+
+
+async def touch_user_calendars(db: AsyncSession, user_id: int) -> None:
+    """Увеличивает версии всех календарей пользователя (его имя есть в списках участников)."""
+    await db.execute(
+        update(Calendar)
+        .where(Calendar.id.in_(
+            select(CalendarUser.calendar_id).where(CalendarUser.user_id == user_id)
+        ))
+        .values(version=Calendar.version + 1)
+    )
+
+
+async def get_calendar_version(db: AsyncSession, calendar_id: int) -> int | None:
+    return await db.scalar(select(Calendar.version).where(Calendar.id == calendar_id))
+
+
+async def get_user_calendar_versions(db: AsyncSession, user_id: int) -> list[tuple[int, int]]:
+    """(calendar_id, version) всех календарей пользователя, по возрастанию id."""
+    result = await db.execute(
+        select(Calendar.id, Calendar.version)
+        .join(CalendarUser, CalendarUser.calendar_id == Calendar.id)
+        .where(CalendarUser.user_id == user_id)
+        .order_by(Calendar.id)
+    )
+    return [tuple(row) for row in result.all()]
+
+
+def make_etag(*parts) -> str:
+    """Слабый ETag из произвольных частей ключа (версии, параметры запроса, формат ответа)."""
+    key = "|".join(str(part) for part in parts)
+    return 'W/"%s"' % hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def _strip_weak(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Сравнение If-None-Match по слабым правилам (RFC 9110, 13.1.2)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    expected = _strip_weak(etag)
+    return any(_strip_weak(tag) == expected for tag in header.split(","))
+
+
+def etag_headers(etag: str) -> dict[str, str]:
+    # no-cache: кэшировать можно, но перед использованием — перепроверить по ETag
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=etag_headers(etag))
+
+
+def versions_key(versions: Iterable[tuple[int, int]]) -> str:
+    return ",".join(f"{calendar_id}:{version}" for calendar_id, version in versions)
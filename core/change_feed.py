@@ -0,0 +1,56 @@
+from sqlalchemy import func, literal, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.change_feed import ChangeFeedHorizon, Tombstone
+from models.event import Event
+from models.event_content import EventContent
+
+# Записи об удалениях для ленты изменений. Вызывать в транзакции удаления до самого
+# DELETE (строки ещё нужны для INSERT ... SELECT) и после touch_calendar(): блокировка
+# календаря гарантирует, что номера изменений одного календаря идут в порядке commit,
+# и клиент, сдвинувший курсор, не пропустит запись, закоммиченную позже.
+
+_HORIZON_ID = 1
+
+
+async def tombstone_events(db: AsyncSession, calendar_id: int, event_ids) -> None:
+    """Удаление событий (select id) вместе со всеми их блоками контента."""
+    await db.execute(
+        insert(Tombstone).from_select(
+            ["calendar_id", "kind", "entity_id", "event_id"],
+            select(literal(calendar_id), literal("content"), EventContent.id, EventContent.event_id)
+            .where(EventContent.event_id.in_(event_ids)),
+        )
+    )
+    await db.execute(
+        insert(Tombstone).from_select(
+            ["calendar_id", "kind", "entity_id", "event_id"],
+            select(literal(calendar_id), literal("event"), Event.id, Event.id)
+            .where(Event.id.in_(event_ids)),
+        )
+    )
+
+
+async def tombstone_content(db: AsyncSession, calendar_id: int, event_id: int, block_id: int) -> None:
+    await db.execute(
+        insert(Tombstone).values(
+            calendar_id=calendar_id, kind="content", entity_id=block_id, event_id=event_id
+        )
+    )
+
+
+async def get_horizon(db: AsyncSession) -> int:
+    return await db.scalar(
+        select(ChangeFeedHorizon.change_seq).where(ChangeFeedHorizon.id == _HORIZON_ID)
+    ) or 0
+
+
+async def advance_horizon(db: AsyncSession, change_seq: int) -> None:
+    stmt = insert(ChangeFeedHorizon).values(id=_HORIZON_ID, change_seq=change_seq)
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[ChangeFeedHorizon.id],
+            set_={"change_seq": func.greatest(ChangeFeedHorizon.change_seq, stmt.excluded.change_seq)},
+        )
+    )
@@ -17,6 +17,66 @@ class Settings(BaseSettings):
 
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
     REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    # Окно, в котором предыдущий refresh-токен ещё принимается (параллельные вкладки)
+    REFRESH_REUSE_GRACE_SECONDS: int = 30
+
+    # Access-токен несёт id, роль и поколение пользователя: авторизация без запросов к БД
+    STATELESS_ACCESS_TOKENS: bool = False
+    TOKEN_REVOCATION_REFRESH_SECONDS: int = 30
+
+    # --- Auth cache ---
+    PRINCIPAL_CACHE_SIZE: int = 1024
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    ACL_CACHE_SIZE: int = 4096
+    ACL_CACHE_TTL_SECONDS: int = 300
+
+    # --- Password hashing ---
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_QUEUE_LIMIT: int = 32
+
+    # --- Maintenance ---
+    MAINTENANCE_INTERVAL_SECONDS: int = 3600
+    MAINTENANCE_BATCH_SIZE: int = 1000
+    MAX_SESSIONS_PER_USER: int = 10
+
+    # --- Change feed ---
+    TOMBSTONE_RETENTION_DAYS: int = 30
+    CHANGES_PAGE_LIMIT: int = 500
+
+    # --- Realtime (SSE) ---
+    REALTIME_QUEUE_SIZE: int = 100
+    REALTIME_HEARTBEAT_SECONDS: int = 25
+
+    # --- Search ---
+    SEARCH_PAGE_LIMIT: int = 50
+
+    # --- Event ranges ---
+    # Максимальная длина периода в /range, /histogram и /freebusy: серии разворачиваются
+    # в экземпляры внутри периода, и без предела ежедневная серия за век — десятки тысяч объектов
+    EVENTS_RANGE_MAX_DAYS: int = 366
+
+    # --- Agenda ---
+    AGENDA_PAGE_LIMIT: int = 100
+    # Насколько вперёд разворачиваются серии, если одиночных событий не хватило на страницу
+    AGENDA_SERIES_HORIZON_DAYS: int = 365
+
+    # --- Conflicts ---
+    # Насколько вперёд проверяются экземпляры повторяющегося события
+    CONFLICT_SERIES_HORIZON_DAYS: int = 365
+
+    # --- Histogram ---
+    HISTOGRAM_CACHE_SIZE: int = 1024
+    HISTOGRAM_CACHE_TTL_SECONDS: int = 3600
+
+    # --- iCalendar import ---
+    ICS_IMPORT_BATCH_SIZE: int = 1000
+    ICS_IMPORT_MAX_EVENTS: int = 100_000
+    ICS_IMPORT_MAX_ERRORS: int = 100
+
+    # --- Free/busy ---
+    FREEBUSY_MAX_USERS: int = 50
+    FREEBUSY_CACHE_SIZE: int = 2048
+    FREEBUSY_CACHE_TTL_SECONDS: int = 300
 
     # --- Frontend / CORS ---
     FRONTEND_URL: str = "http://localhost"
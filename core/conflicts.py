@@ -0,0 +1,159 @@
+import datetime
+from dataclasses import dataclass
+from typing import Iterable, Literal
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.intervals import IntervalIndex
+from core.occurrences import expand_series
+from core.recurrence import as_aware, occurrence_windows, parse_rrule
+from models.event import Event, events_overlapping
+from schemas.event import EventBatchItemResult, EventConflict
+
+# Проверка пересечений по времени при записи событий (двойное бронирование
+# переговорок и т.п.). Вызывается после самой записи, в той же транзакции:
+# проверяются уже итоговые строки. Все календари политики (и свой, и связанные)
+# блокируются до записи, по возрастанию id (lock_calendars в зависимости политики),
+# так что параллельная запись в любой из них не проскочит между проверкой и commit.
+# Кандидатов из БД отбирает GiST-индекс (events_overlapping) одним запросом
+# на общее окно всех проверяемых событий, дальше — дерево интервалов в памяти:
+# одно и то же и для одного события, и для пакета, где события проверяются
+# и друг с другом.
+#
+# Пересечение — по полуоткрытым интервалам: встречи «встык» не конфликтуют.
+
+ConflictMode = Literal["warn", "reject"]
+
+CONFLICTS_HEADER = "X-Event-Conflicts"
+
+
+@dataclass(frozen=True)
+class ConflictPolicy:
+    mode: ConflictMode
+    # Календарь записи и связанные с ним (например, все переговорки этажа)
+    calendar_ids: tuple[int, ...]
+
+
+def _busy_intervals(event) -> Iterable[tuple[datetime.datetime, datetime.datetime]]:
+    if not event.rrule:
+        return [(event.start, event.end)]
+
+    # Серию проверяем от её начала (но не раньше текущего момента) на горизонт вперёд
+    window_start = max(as_aware(event.start), datetime.datetime.now(datetime.timezone.utc))
+    window_end = window_start + datetime.timedelta(days=settings.CONFLICT_SERIES_HORIZON_DAYS)
+    return occurrence_windows(
+        parse_rrule(event.rrule), event.start, event.end,
+        window_start, window_end, event.timezone, event.exdates or (),
+    )
+
+
+async def find_conflicts(
+    db: AsyncSession,
+    calendar_ids: Iterable[int],
+    events: list,
+) -> dict[int, list[EventConflict]]:
+    """
+    События (ORM или EventOut), уже записанные в текущей транзакции ->
+    пересекающиеся с ними события календарей calendar_ids. Без пересечений в ответе нет.
+    """
+    spans = {event.id: list(_busy_intervals(event)) for event in events}
+    intervals = [interval for items in spans.values() for interval in items]
+    if not intervals:
+        return {}
+    window_start = min(start for start, _ in intervals)
+    window_end = max(end for _, end in intervals)
+
+    scope = Event.calendar_id.in_(list(calendar_ids))
+    singles = await db.execute(
+        select(Event.id, Event.calendar_id, Event.title, Event.start, Event.end, Event.recurrence_id)
+        .where(scope, events_overlapping(window_start, window_end))
+    )
+    instances = await expand_series(db, scope, window_start, window_end)
+    index = IntervalIndex(
+        (other.start, other.end, other) for other in (*singles.all(), *instances)
+    )
+
+    conflicts = {}
+    for event in events:
+        found = {}
+        for start, end in spans[event.id]:
+            for other in index.overlapping(start, end):
+                # Само событие, экземпляры и изменённые экземпляры его же серии
+                if event.id in (other.id, other.recurrence_id):
+                    continue
+                found.setdefault((other.id, other.start), other)
+        if found:
+            conflicts[event.id] = [
+                EventConflict.model_validate(other)
+                for other in sorted(found.values(), key=lambda other: other.start)
+            ]
+    return conflicts
+
+
+async def check_conflicts(
+    db: AsyncSession,
+    policy: ConflictPolicy | None,
+    event,
+    response: Response,
+) -> None:
+    """
+    Для одиночной записи: reject — 409 со списком пересечений (транзакция откатится),
+    warn — id пересекающихся событий в заголовке X-Event-Conflicts.
+    """
+    if policy is None:
+        return
+
+    conflicts = (await find_conflicts(db, policy.calendar_ids, [event])).get(event.id)
+    if not conflicts:
+        return
+
+    if policy.mode == "reject":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={
+                "message": "Время события пересекается с другими событиями",
+                "conflicts": [conflict.model_dump(mode="json") for conflict in conflicts],
+            },
+        )
+    response.headers[CONFLICTS_HEADER] = ",".join(
+        dict.fromkeys(str(conflict.id) for conflict in conflicts)
+    )
+
+
+async def check_batch_conflicts(
+    db: AsyncSession,
+    policy: ConflictPolicy,
+    results: list[EventBatchItemResult],
+) -> None:
+    """
+    Для пакета: reject — 409 на весь пакет с пересечениями по номерам операций,
+    warn — пересечения в поле conflicts результатов созданий и изменений.
+    """
+    written = [result for result in results if result.event is not None]
+    conflicts = await find_conflicts(
+        db, policy.calendar_ids, list({result.id: result.event for result in written}.values())
+    )
+    if not conflicts:
+        return
+
+    if policy.mode == "reject":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={
+                "message": "Время событий пакета пересекается с другими событиями",
+                "conflicts": [
+                    {
+                        "index": result.index,
+                        "id": result.id,
+                        "conflicts": [conflict.model_dump(mode="json") for conflict in conflicts[result.id]],
+                    }
+                    for result in written
+                    if result.id in conflicts
+                ],
+            },
+        )
+    for result in written:
+        result.conflicts = conflicts.get(result.id)
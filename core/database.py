@@ -3,7 +3,8 @@ from sqlalchemy.orm import DeclarativeBase
 from core.config import settings
 
 engine = create_async_engine(settings.DATABASE_URL)
-async_session_factory = async_sessionmaker(engine, expire_on_commit=True)
+# Объекты остаются загруженными после commit: ответ строится без повторного SELECT
+async_session_factory = async_sessionmaker(engine, expire_on_commit=False)
 
 
 class Base(DeclarativeBase):
@@ -11,8 +12,12 @@ class Base(DeclarativeBase):
 
 
 async def init_db():
+    from core.migrations import lock_schema, run_migrations
+
     async with engine.begin() as connection:
+        await lock_schema(connection)
         await connection.run_sync(Base.metadata.create_all)
+        await run_migrations(connection)
 
 
 async def get_async_session():
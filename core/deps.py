@@ -1,19 +1,65 @@
-from fastapi import Depends, HTTPException, status, Path, Request
+import datetime
+from typing import NamedTuple
+
+from fastapi import Depends, HTTPException, status, Path, Query, Request
 from jose import jwt, JWTError
+from sqlalchemy import and_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
 from core.database import get_async_session
 from core.config import settings
+from core.cache import TTLCache
+from core.acl import get_calendar_role, remember_role
+from core import pubsub, revocation
+from core.recurrence import as_aware
+from core.security import token_digest
 from models.user import User
 from models.calendar_user import CalendarUser
 from schemas.auth import GlobalRole, LocalRole
+from schemas.event import EventsRangeQuery
+from schemas.user import UserSnapshot
 
 
-async def get_current_user(
-    request: Request,
-    db: AsyncSession = Depends(get_async_session),
-) -> User:
+# Кэш авторизованных пользователей: sha256(access_token) -> UserSnapshot.
+# Снимаем SELECT users с каждого запроса; записи сбрасываются через invalidate_user()
+# во всех воркерах.
+principal_cache = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+
+PRINCIPAL_CHANNEL = "principal_invalidations"
+
+
+def _drop_user(user_id: int) -> None:
+    principal_cache.pop_where(lambda _, snapshot: snapshot.id == user_id)
+
+
+async def invalidate_user(db: AsyncSession, user_id: int) -> None:
+    """
+    Сбрасывает закэшированные снимки пользователя в этом процессе и рассылает NOTIFY
+    остальным воркерам. Вызывать в той же транзакции, что и изменение users:
+    уведомление уйдёт после commit и заодно перекроет гонку с параллельными чтениями.
+    """
+    _drop_user(user_id)
+    await pubsub.publish(db, PRINCIPAL_CHANNEL, str(user_id))
+
+
+def _on_principal_notify(payload: str | None) -> None:
+    if payload is None:
+        principal_cache.clear()
+        return
+
+    _drop_user(int(payload))
+
+
+pubsub.subscribe(PRINCIPAL_CHANNEL, _on_principal_notify)
+
+
+def _decode_access_token(request: Request) -> tuple[str, dict]:
+    """Проверяет access_token из cookies. Возвращает (sha256 токена, payload)."""
     token = request.cookies.get("access_token")
 
     if not token:
@@ -37,25 +83,119 @@ async def get_current_user(
             detail="Invalid token",
         )
 
+    return token_digest(token), payload
+
+
+async def _snapshot_from_claims(
+    db: AsyncSession,
+    payload: dict,
+) -> UserSnapshot | None:
+    """
+    Stateless-режим: пользователь целиком берётся из claims токена.
+    None, если токен выдан без claims (режим включили позже) — тогда идём в БД.
+    """
+    if not settings.STATELESS_ACCESS_TOKENS or "uid" not in payload:
+        return None
+
+    await revocation.ensure_fresh(db)
+    if revocation.is_revoked(payload["uid"], payload.get("gen", 0)):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token revoked",
+        )
+
+    return UserSnapshot(
+        id=payload["uid"],
+        username=payload["sub"],
+        display_name=payload.get("name"),
+        role=payload["role"],
+        is_items_corrector=payload.get("corr", False),
+        telegram_id=payload.get("tg"),
+    )
+
+
+def _user_not_found() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="User not found",
+    )
+
+
+async def get_current_user(
+    request: Request,
+    db: AsyncSession = Depends(get_async_session),
+) -> UserSnapshot:
+    digest, payload = _decode_access_token(request)
+
+    snapshot = await _snapshot_from_claims(db, payload) or principal_cache.get(digest)
+    if snapshot is not None:
+        return snapshot
+
     result = await db.execute(
-        select(User).where(User.username == username)
+        select(User).where(User.username == payload["sub"])
     )
     user = result.scalar_one_or_none()
 
     if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
+        raise _user_not_found()
+
+    snapshot = UserSnapshot.model_validate(user)
+    principal_cache.set(digest, snapshot)
+    return snapshot
+
+
+class CalendarPrincipal(NamedTuple):
+    user: UserSnapshot
+    role: LocalRole | None
+
+
+async def get_calendar_principal(
+    request: Request,
+    calendar_id: int = Path(...),
+    db: AsyncSession = Depends(get_async_session),
+) -> CalendarPrincipal:
+    """
+    Пользователь и его роль в календаре за один запрос к БД:
+    users LEFT JOIN calendar_users. Если пользователь и его членство уже в кэшах,
+    запросов нет вовсе. FastAPI кэширует зависимость в пределах запроса,
+    так что все проверки прав одного запроса используют один и тот же результат.
+    """
+    digest, payload = _decode_access_token(request)
+
+    snapshot = await _snapshot_from_claims(db, payload) or principal_cache.get(digest)
+    if snapshot is not None:
+        role = await get_calendar_role(db, snapshot.id, calendar_id)
+        return CalendarPrincipal(snapshot, role)
+
+    result = await db.execute(
+        select(User, CalendarUser.role)
+        .outerjoin(
+            CalendarUser,
+            and_(
+                CalendarUser.user_id == User.id,
+                CalendarUser.calendar_id == calendar_id,
+            ),
         )
+        .where(User.username == payload["sub"])
+    )
+    row = result.one_or_none()
+    if not row:
+        raise _user_not_found()
 
-    return user
+    user, role = row
+    snapshot = UserSnapshot.model_validate(user)
+    principal_cache.set(digest, snapshot)
+
+    role = LocalRole(role) if role else None
+    remember_role(snapshot.id, calendar_id, role)
+    return CalendarPrincipal(snapshot, role)
 
 
 class RoleChecker:
     def __init__(self, allowed_roles: list[GlobalRole]):
         self.allowed_roles = allowed_roles
 
-    def __call__(self, user: User = Depends(get_current_user)):
+    def __call__(self, user: UserSnapshot = Depends(get_current_user)):
         if user.role not in self.allowed_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -68,8 +208,8 @@ allow_admin = RoleChecker([GlobalRole.ADMIN])
 # allow_any_auth = get_current_user # это у тебя уже есть
 
 async def require_items_corrector(
-    current_user: User = Depends(get_current_user)
-) -> User:
+    current_user: UserSnapshot = Depends(get_current_user)
+) -> UserSnapshot:
     """
     Проверяет, является ли пользователь корректором или админом.
     """
@@ -82,51 +222,60 @@ async def require_items_corrector(
     )
 
 
-async def require_editor(
-    calendar_id: int = Path(...), 
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_async_session)
-) -> CalendarUser:
+class CalendarAccess:
     """
-    Проверяет, есть ли у пользователя права на редактирование календаря.
-    Если записи в CalendarUser нет — доступ запрещен.
+    Декларативная политика доступа к календарю: какие локальные роли допускаются.
+    Возвращает CalendarPrincipal (пользователь + его роль).
     """
-    query = select(CalendarUser).where(
-        CalendarUser.calendar_id == calendar_id,
-        CalendarUser.user_id == current_user.id
-    )
-    result = await db.execute(query)
-    link = result.scalar_one_or_none()
 
-    if not link or link.role not in [LocalRole.OWNER, LocalRole.EDITOR]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN, 
-            detail="У вас недостаточно прав для редактирования (нужна роль: Редактор или Владелец)"
-        )
-    
-    return link
+    def __init__(self, allowed_roles: list[LocalRole], detail: str):
+        self.allowed_roles = allowed_roles
+        self.detail = detail
 
+    def __call__(
+        self,
+        principal: CalendarPrincipal = Depends(get_calendar_principal),
+    ) -> CalendarPrincipal:
+        if principal.role not in self.allowed_roles:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=self.detail,
+            )
+        return principal
 
-async def require_viewer(
-    calendar_id: int = Path(...), 
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_async_session)
-) -> CalendarUser:
+
+require_owner = CalendarAccess(
+    [LocalRole.OWNER],
+    "Только владелец может выполнить это действие",
+)
+require_editor = CalendarAccess(
+    [LocalRole.OWNER, LocalRole.EDITOR],
+    "У вас недостаточно прав для редактирования (нужна роль: Редактор или Владелец)",
+)
+require_viewer = CalendarAccess(
+    [LocalRole.OWNER, LocalRole.EDITOR, LocalRole.VIEWER],
+    "У вас нет прав на доступ к этому календарю",
+)
+
+
+def events_range(
+    from_date: datetime.datetime = Query(...),
+    to_date: datetime.datetime = Query(...),
+) -> EventsRangeQuery:
     """
-    Проверяет, есть ли у пользователя права на просмотр календаря.
-    Нужен хотя бы 'viewer'.
+    Период выборки событий из query-параметров, не длиннее EVENTS_RANGE_MAX_DAYS.
+    Ошибка валидатора внутри Depends()-модели дала бы 500, поэтому проверка здесь — 422.
     """
-    query = select(CalendarUser).where(
-        CalendarUser.calendar_id == calendar_id,
-        CalendarUser.user_id == current_user.id
-    )
-    result = await db.execute(query)
-    link = result.scalar_one_or_none()
-
-    if not link:
+    # Наивное и aware-время иначе не сравнить; наивное считается UTC, как и везде
+    from_date, to_date = as_aware(from_date), as_aware(to_date)
+    if to_date < from_date:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN, 
-            detail="У вас нет прав на доступ к этому календарю"
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="to_date должна быть не раньше from_date",
         )
-    
-    return link
+    if to_date - from_date > datetime.timedelta(days=settings.EVENTS_RANGE_MAX_DAYS):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Период не может быть длиннее {settings.EVENTS_RANGE_MAX_DAYS} дней",
+        )
+    return EventsRangeQuery(from_date=from_date, to_date=to_date)
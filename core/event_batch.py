@@ -0,0 +1,229 @@
+import datetime
+from collections import defaultdict
+
+from sqlalchemy import Integer, and_, cast, column, delete, insert, or_, select, update, values
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.change_feed import tombstone_events
+from core.recurrence import parse_rrule, series_end
+from core.histogram import HISTOGRAM_FIELDS, event_span
+from core.writes import CONFLICT_DETAIL
+from models.event import Event
+from models.event_content import EventContent
+from schemas.event import (
+    EventBatchCreate, EventBatchDelete, EventBatchItemResult, EventBatchOperation, EventOut,
+)
+
+# Пакетная запись событий одного календаря: все операции одной транзакцией и
+# фиксированным числом запросов независимо от размера пакета —
+# один INSERT ... RETURNING на все создания, по одному UPDATE ... FROM (VALUES ...)
+# на каждый набор изменяемых полей, один DELETE на все удаления.
+# Вызывающий уже проверил права и взял блокировку календаря (touch_calendar).
+
+# Поля, от которых зависит конец серии (recurrence_until)
+RECURRENCE_FIELDS = {"start", "end", "rrule", "timezone"}
+
+_NOT_FOUND = "Событие не найдено"
+
+
+def _series_end(rrule, start, end, timezone):
+    return series_end(parse_rrule(rrule), start, end, timezone) if rrule else None
+
+
+def _span(row):
+    return event_span(row.start, row.end, row.rrule, row.recurrence_until)
+
+
+async def _create(db, calendar_id, user_id, items, results, spans) -> None:
+    now = datetime.datetime.now(datetime.timezone.utc)
+    rows = [
+        {
+            **op.data.model_dump(),
+            "calendar_id": calendar_id,
+            "created_by": user_id,
+            "created_at": now,
+            "recurrence_until": _series_end(op.data.rrule, op.data.start, op.data.end, op.data.timezone),
+        }
+        for _, op in items
+    ]
+    created = await db.scalars(insert(Event).returning(Event, sort_by_parameter_order=True), rows)
+    for (index, op), event in zip(items, created.all()):
+        spans.append(_span(event))
+        results[index] = EventBatchItemResult(
+            index=index, op=op.op, status=201, id=event.id, event=EventOut.model_validate(event)
+        )
+
+
+async def _update(db, calendar_id, updates, versions, results, spans) -> None:
+    # Поля серии могут прийти не все — остальные берём из текущих строк
+    recurring_ids = [event_id for event_id, (_, fields) in updates.items() if fields.keys() & RECURRENCE_FIELDS]
+    if recurring_ids:
+        current = await db.execute(
+            select(
+                Event.id, Event.start, Event.end, Event.rrule, Event.timezone,
+                Event.recurrence_id, Event.recurrence_until,
+            )
+            .where(Event.calendar_id == calendar_id, Event.id.in_(recurring_ids))
+        )
+        for row in current.all():
+            indexes, fields = updates[row.id]
+            merged = {**row._asdict(), **fields}
+            if merged["rrule"] and row.recurrence_id is not None:
+                for index in indexes:
+                    results[index] = EventBatchItemResult(
+                        index=index, op="update", status=400, id=row.id,
+                        detail="Изменённый экземпляр серии не может сам повторяться",
+                    )
+                del updates[row.id]
+                continue
+            try:
+                fields["recurrence_until"] = _series_end(
+                    merged["rrule"], merged["start"], merged["end"], merged["timezone"]
+                )
+            except ValueError as exc:
+                for index in indexes:
+                    results[index] = EventBatchItemResult(
+                        index=index, op="update", status=422, id=row.id, detail=str(exc),
+                    )
+                del updates[row.id]
+                continue
+            spans.append(_span(row))
+
+    groups = defaultdict(list)
+    for event_id, (_, fields) in updates.items():
+        groups[tuple(sorted(fields))].append((event_id, fields))
+
+    table = Event.__table__
+    updated_ids = set()
+    for names, items in groups.items():
+        rows = values(
+            column("id", Integer),
+            column("expected_version", Integer),
+            *(column(name, table.c[name].type) for name in names),
+            name="batch",
+        ).data([
+            (event_id, versions.get(event_id), *(fields[name] for name in names))
+            for event_id, fields in items
+        ])
+        # Версия проверяется только там, где клиент её прислал (core/writes.py)
+        expected_version = cast(rows.c.expected_version, Integer)
+
+        updated = await db.scalars(
+            update(Event)
+            .where(
+                Event.id == rows.c.id,
+                Event.calendar_id == calendar_id,
+                or_(expected_version.is_(None), Event.version == expected_version),
+            )
+            # NULL в VALUES без типа Postgres считает text — приводим явно
+            .values({
+                **{name: cast(rows.c[name], table.c[name].type) for name in names},
+                "version": Event.version + 1,
+            })
+            .returning(Event),
+            execution_options={"synchronize_session": False},
+        )
+        for event in updated.all():
+            updated_ids.add(event.id)
+            if HISTOGRAM_FIELDS.intersection(names):
+                spans.append(_span(event))
+            for index in updates[event.id][0]:
+                results[index] = EventBatchItemResult(
+                    index=index, op="update", status=200, id=event.id,
+                    event=EventOut.model_validate(event),
+                )
+
+    # Не обновились, хотя существуют — значит, не совпала версия
+    stale = [event_id for event_id in versions if event_id in updates and event_id not in updated_ids]
+    if stale:
+        existing = await db.scalars(
+            select(Event.id).where(Event.calendar_id == calendar_id, Event.id.in_(stale))
+        )
+        for event_id in existing.all():
+            for index in updates[event_id][0]:
+                results[index] = EventBatchItemResult(
+                    index=index, op="update", status=409, id=event_id, detail=CONFLICT_DETAIL,
+                )
+
+
+async def _delete(db, calendar_id, deletes, results, spans) -> None:
+    ids = list(deletes)
+    # Вместе с изменёнными экземплярами удаляемых серий
+    rows = and_(
+        Event.calendar_id == calendar_id,
+        or_(Event.id.in_(ids), Event.recurrence_id.in_(ids)),
+    )
+    owned = select(Event.id).where(rows)
+
+    await tombstone_events(db, calendar_id, owned)
+    await db.execute(
+        delete(EventContent).where(EventContent.event_id.in_(owned)),
+        execution_options={"synchronize_session": False},
+    )
+    deleted = await db.execute(
+        delete(Event)
+        .where(rows)
+        .returning(Event.id, Event.start, Event.end, Event.rrule, Event.recurrence_until),
+        execution_options={"synchronize_session": False},
+    )
+    for row in deleted.all():
+        spans.append(_span(row))
+        for index in deletes.get(row.id, ()):
+            results[index] = EventBatchItemResult(index=index, op="delete", status=204, id=row.id)
+
+
+async def apply_event_batch(
+    db: AsyncSession,
+    calendar_id: int,
+    user_id: int,
+    operations: list[EventBatchOperation],
+    spans: list | None = None,
+) -> list[EventBatchItemResult]:
+    """
+    Выполняет операции в текущей транзакции (commit — за вызывающим) и возвращает
+    результат по каждой в исходном порядке. Ошибочные операции (нет события и т.п.)
+    отражаются в результате и не мешают остальным.
+    В spans, если передан, добавляются затронутые интервалы времени (core/histogram.py).
+    Порядок применения: создания, изменения (несколько изменений одного события
+    сливаются по порядку), удаления.
+    """
+    results: list[EventBatchItemResult | None] = [None] * len(operations)
+    spans = [] if spans is None else spans
+
+    creates = []
+    updates: dict[int, tuple[list[int], dict]] = {}
+    # Ожидаемая версия события — из первой операции, где она указана
+    versions: dict[int, int] = {}
+    deletes: dict[int, list[int]] = defaultdict(list)
+    for index, op in enumerate(operations):
+        if isinstance(op, EventBatchCreate):
+            creates.append((index, op))
+        elif isinstance(op, EventBatchDelete):
+            deletes[op.id].append(index)
+        else:
+            fields = op.data.model_dump(exclude_unset=True, exclude={"version"})
+            if not fields:
+                results[index] = EventBatchItemResult(
+                    index=index, op=op.op, status=400, id=op.id, detail="Нет данных для обновления"
+                )
+                continue
+            indexes, merged = updates.setdefault(op.id, ([], {}))
+            indexes.append(index)
+            merged.update(fields)
+            if op.data.version is not None:
+                versions.setdefault(op.id, op.data.version)
+
+    if creates:
+        await _create(db, calendar_id, user_id, creates, results, spans)
+    if updates:
+        await _update(db, calendar_id, updates, versions, results, spans)
+    if deletes:
+        await _delete(db, calendar_id, deletes, results, spans)
+
+    return [
+        result or EventBatchItemResult(
+            index=index, op=operations[index].op, status=404,
+            id=getattr(operations[index], "id", None), detail=_NOT_FOUND,
+        )
+        for index, result in enumerate(results)
+    ]
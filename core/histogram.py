@@ -0,0 +1,211 @@
+import datetime
+from bisect import bisect_right
+from collections import defaultdict
+
+from sqlalchemy import and_, func, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core import pubsub
+from core.cache import TTLCache
+from core.config import settings
+from core.occurrences import expand_series
+from core.recurrence import as_aware
+from models.event import Event, events_overlapping
+from schemas.event import HistogramBucket
+
+# Плотность событий календаря по дням/неделям/месяцам (тепловая карта).
+# Корзины строит Postgres: generate_series по date_trunc в часовом поясе клиента,
+# одиночные события считаются там же одним запросом (кандидаты — по GiST-индексу),
+# экземпляры серий добавляются поверх, после развёртки в окне.
+#
+# Кэшируются только окна целиком в прошлом: они почти не меняются. Запись события
+# вызывает invalidate_histograms() с затронутым интервалом (старым и новым временем);
+# NOTIFY после commit сбрасывает пересекающиеся окна во всех воркерах.
+# Запись, целиком лежащая в будущем, не рассылает ничего.
+
+HISTOGRAM_CHANNEL = "histogram_invalidations"
+
+BUCKET_STEPS = {"day": "1 day", "week": "1 week", "month": "1 month"}
+
+# Поля события, от которых зависит гистограмма
+HISTOGRAM_FIELDS = {"start", "end", "rrule", "timezone", "exdates"}
+
+histogram_cache = TTLCache(
+    maxsize=settings.HISTOGRAM_CACHE_SIZE,
+    ttl=settings.HISTOGRAM_CACHE_TTL_SECONDS,
+)
+
+# Счётчик сбросов по календарю: результат, посчитанный во время сброса, в кэш не кладём
+_generations: dict[int, int] = defaultdict(int)
+
+
+def event_span(start, end, rrule=None, recurrence_until=None) -> tuple[datetime.datetime, datetime.datetime | None]:
+    """Интервал, который занимает событие; у серии — до конца последнего экземпляра (None — бесконечно)."""
+    if rrule:
+        return start, recurrence_until
+    return start, max(end, start)
+
+
+def _drop(calendar_id: int, start: float | None, end: float | None) -> None:
+    _generations[calendar_id] += 1
+
+    def hit(key, _):
+        if key[0] != calendar_id:
+            return False
+        window_start, window_end = key[1].timestamp(), key[2].timestamp()
+        return (start is None or start < window_end) and (end is None or end > window_start)
+
+    histogram_cache.pop_where(hit)
+
+
+async def invalidate_histograms(
+    db: AsyncSession,
+    calendar_id: int,
+    spans: list[tuple[datetime.datetime, datetime.datetime | None]] | None = None,
+) -> None:
+    """
+    Сбрасывает кэш гистограмм календаря по затронутым интервалам (None — целиком).
+    Вызывать в транзакции записи; уведомление уйдёт после commit.
+    """
+    start = end = None
+    if spans is not None:
+        if not spans:
+            return
+        start = min(as_aware(span_start) for span_start, _ in spans)
+        ends = [span_end for _, span_end in spans]
+        end = None if None in ends else max(as_aware(span_end) for span_end in ends)
+        # В кэше только прошедшие окна: будущее их не задевает
+        if start >= datetime.datetime.now(datetime.timezone.utc):
+            return
+
+    # Свой воркер — сразу (NOTIFY придёт позже), остальные — после commit
+    _drop(
+        calendar_id,
+        None if start is None else start.timestamp(),
+        None if end is None else end.timestamp(),
+    )
+    await pubsub.publish(
+        db,
+        HISTOGRAM_CHANNEL,
+        ":".join([
+            str(calendar_id),
+            "" if start is None else repr(start.timestamp()),
+            "" if end is None else repr(end.timestamp()),
+        ]),
+    )
+
+
+def _on_histogram_notify(payload: str | None) -> None:
+    if payload is None:
+        histogram_cache.clear()
+        for calendar_id in _generations:
+            _generations[calendar_id] += 1
+        return
+
+    calendar_id, start, end = payload.split(":")
+    _drop(int(calendar_id), float(start) if start else None, float(end) if end else None)
+
+
+pubsub.subscribe(HISTOGRAM_CHANNEL, _on_histogram_notify)
+
+
+async def _compute(
+    db: AsyncSession,
+    calendar_id: int,
+    from_date: datetime.datetime,
+    to_date: datetime.datetime,
+    bucket: str,
+    tz: str,
+) -> list[HistogramBucket]:
+    step = literal_column(f"interval '{BUCKET_STEPS[bucket]}'")
+    series = (
+        func.generate_series(
+            func.date_trunc(bucket, func.timezone(tz, from_date)),
+            func.timezone(tz, to_date),
+            step,
+        )
+        .table_valued("local_start")
+        .render_derived(name="series")
+    )
+    buckets = (
+        select(
+            series.c.local_start,
+            func.timezone(tz, series.c.local_start).label("start"),
+            func.timezone(tz, series.c.local_start + step).label("end"),
+        )
+        .subquery("buckets")
+    )
+    events = (
+        select(Event.start, Event.end)
+        .where(Event.calendar_id == calendar_id, events_overlapping(from_date, to_date))
+        .cte("window_events")
+    )
+
+    busy_seconds = func.extract(
+        "epoch",
+        func.least(events.c.end, buckets.c.end, to_date)
+        - func.greatest(events.c.start, buckets.c.start, from_date),
+    )
+    result = await db.execute(
+        select(
+            buckets.c.local_start,
+            buckets.c.start,
+            buckets.c.end,
+            func.count(events.c.start),
+            func.coalesce(func.sum(busy_seconds), 0),
+        )
+        .select_from(buckets.outerjoin(
+            events,
+            and_(events.c.start < buckets.c.end, events.c.end > buckets.c.start),
+        ))
+        .where(buckets.c.start < to_date)
+        .group_by(buckets.c.local_start, buckets.c.start, buckets.c.end)
+        .order_by(buckets.c.local_start)
+    )
+    rows = [[local_start, start, end, count, float(seconds)] for local_start, start, end, count, seconds in result.all()]
+
+    # Экземпляры серий — в те же корзины
+    starts = [row[1] for row in rows]
+    window_start, window_end = as_aware(from_date), as_aware(to_date)
+    for instance in await expand_series(db, Event.calendar_id == calendar_id, from_date, to_date):
+        index = max(bisect_right(starts, instance.start) - 1, 0)
+        while index < len(rows) and rows[index][1] < instance.end:
+            row = rows[index]
+            if row[2] > instance.start:
+                row[3] += 1
+                row[4] += (
+                    min(instance.end, row[2], window_end) - max(instance.start, row[1], window_start)
+                ).total_seconds()
+            index += 1
+
+    return [
+        HistogramBucket(
+            bucket=local_start.date(), start=start, end=end,
+            count=count, busy_minutes=round(seconds / 60),
+        )
+        for local_start, start, end, count, seconds in rows
+    ]
+
+
+async def get_histogram(
+    db: AsyncSession,
+    calendar_id: int,
+    from_date: datetime.datetime,
+    to_date: datetime.datetime,
+    bucket: str,
+    tz: str,
+) -> list[HistogramBucket]:
+    from_date, to_date = as_aware(from_date), as_aware(to_date)
+    if to_date > datetime.datetime.now(datetime.timezone.utc):
+        return await _compute(db, calendar_id, from_date, to_date, bucket, tz)
+
+    key = (calendar_id, from_date, to_date, bucket, tz)
+    cached = histogram_cache.get(key)
+    if cached is not None:
+        return cached
+
+    generation = _generations[calendar_id]
+    result = await _compute(db, calendar_id, from_date, to_date, bucket, tz)
+    if _generations[calendar_id] == generation:
+        histogram_cache.set(key, result)
+    return result
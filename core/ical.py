@@ -0,0 +1,535 @@
+import codecs
+import datetime
+import re
+from dataclasses import dataclass, field
+from typing import AsyncIterable, AsyncIterator, Iterable
+
+from pydantic import ValidationError
+from sqlalchemy import cast, func, insert, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.types import DateTime
+
+from core.config import settings
+from core.histogram import event_span
+from core.recurrence import as_aware, get_zone, is_occurrence, parse_rrule, series_end
+from models.event import Event
+from schemas.event import EventCreate, EventImportError, EventImportResult
+
+# iCalendar (RFC 5545) для переноса календарей между сервисами.
+#
+# Экспорт: VEVENT по одному на строку events, строки читаются из серверного курсора,
+# наружу уходят байты — память не зависит от размера календаря. Серия отдаётся с RRULE
+# и EXDATE, изменённый экземпляр — отдельным VEVENT с UID серии и RECURRENCE-ID.
+# Пояс серии — TZID у DTSTART (имя IANA, без VTIMEZONE: его понимают все основные клиенты).
+#
+# Импорт: файл читается кусками, строки склеиваются (unfolding) и разбираются на лету,
+# в памяти одновременно — один VEVENT. Поддерживаются SUMMARY, DESCRIPTION, DTSTART,
+# DTEND/DURATION, RRULE (подмножество core/recurrence.py), EXDATE, RECURRENCE-ID, UID,
+# STATUS; остальные свойства и компоненты (VALARM, VTODO, VTIMEZONE...) пропускаются.
+# События пишутся пачками по ICS_IMPORT_BATCH_SIZE многострочным INSERT в одной
+# транзакции. Изменённые экземпляры серий (их обычно немного) откладываются до конца
+# файла: серия может идти после них.
+
+CONTENT_TYPE = "text/calendar; charset=utf-8"
+PRODID = "-//Calendar//Calendar API//RU"
+
+# RFC 5545 3.1: строки длиннее 75 октетов переносятся
+FOLD_OCTETS = 75
+
+READ_CHUNK_SIZE = 64 * 1024
+
+_DURATION = re.compile(
+    r"^([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$"
+)
+
+
+# ── Экспорт ─────────────────────────────────────────────────────────────────
+
+def escape_text(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def fold(line: str) -> bytes:
+    """Строка в байтах с переносами по 75 октетов, не разрывая символы UTF-8."""
+    data = line.encode()
+    if len(data) <= FOLD_OCTETS:
+        return data + b"\r\n"
+
+    parts = []
+    start, limit = 0, FOLD_OCTETS
+    while len(data) - start > limit:
+        end = start + limit
+        # Не режем посередине многобайтового символа
+        while data[end] & 0xC0 == 0x80:
+            end -= 1
+        parts.append(data[start:end])
+        start, limit = end, FOLD_OCTETS - 1
+    parts.append(data[start:])
+    return b"\r\n ".join(parts) + b"\r\n"
+
+
+def _utc(value: datetime.datetime) -> str:
+    return as_aware(value).astimezone(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _datetime_property(name: str, value: datetime.datetime, tz: str | None) -> str:
+    if tz:
+        local = as_aware(value).astimezone(get_zone(tz))
+        return f"{name};TZID={tz}:{local.strftime('%Y%m%dT%H%M%S')}"
+    return f"{name}:{_utc(value)}"
+
+
+def event_uid(event_id: int, domain: str) -> str:
+    return f"event-{event_id}@{domain}"
+
+
+def vevent(event, domain: str) -> bytes:
+    """VEVENT для строки events (серии, одиночного события или изменённого экземпляра)."""
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{event_uid(event.recurrence_id or event.id, domain)}",
+        f"DTSTAMP:{_utc(event.updated_at or event.created_at)}",
+        _datetime_property("DTSTART", event.start, event.timezone),
+        _datetime_property("DTEND", max(event.end, event.start), event.timezone),
+        f"SUMMARY:{escape_text(event.title)}",
+    ]
+    if event.description:
+        lines.append(f"DESCRIPTION:{escape_text(event.description)}")
+    if event.rrule:
+        lines.append(f"RRULE:{event.rrule.strip().removeprefix('RRULE:')}")
+        if event.exdates:
+            lines.append("EXDATE:" + ",".join(_utc(exdate) for exdate in event.exdates))
+    if event.recurrence_id is not None:
+        lines.append(f"RECURRENCE-ID:{_utc(event.recurrence_start)}")
+    if event.version:
+        lines.append(f"SEQUENCE:{event.version - 1}")
+    lines.append("END:VEVENT")
+    return b"".join(fold(line) for line in lines)
+
+
+async def stream_calendar(
+    events: AsyncIterable,
+    name: str,
+    domain: str,
+) -> AsyncIterator[bytes]:
+    yield b"".join(fold(line) for line in (
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODID}",
+        "CALSCALE:GREGORIAN",
+        f"X-WR-CALNAME:{escape_text(name)}",
+    ))
+    async for event in events:
+        yield vevent(event, domain)
+    yield fold("END:VCALENDAR")
+
+
+# ── Импорт ──────────────────────────────────────────────────────────────────
+
+async def read_lines(file, chunk_size: int = READ_CHUNK_SIZE) -> AsyncIterator[tuple[int, str]]:
+    """
+    Логические строки файла (продолжения уже приклеены) с номером первой физической строки.
+    file — объект с async read(size), например UploadFile.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    tail = ""
+    number = 0
+    current, current_number = "", 0
+    while True:
+        chunk = await file.read(chunk_size)
+        tail += decoder.decode(chunk, final=not chunk)
+        lines = tail.split("\n")
+        tail = lines.pop() if chunk else ""
+        for line in lines:
+            number += 1
+            line = line.rstrip("\r")
+            if line[:1] in (" ", "\t"):
+                current += line[1:]
+                continue
+            if current:
+                yield current_number, current
+            current, current_number = line, number
+        if not chunk:
+            break
+    if current:
+        yield current_number, current
+
+
+def parse_content_line(line: str) -> tuple[str, dict[str, str], str]:
+    """NAME;PARAM=VALUE:value -> (NAME, {PARAM: VALUE}, value)."""
+    colon = line.find(":")
+    if colon == -1:
+        raise ValueError(f"Некорректная строка: {line[:50]}")
+    if line.find('"', 0, colon) != -1:
+        # Двоеточие может быть внутри кавычек в значении параметра
+        quoted = False
+        for colon, char in enumerate(line):
+            if char == '"':
+                quoted = not quoted
+            elif char == ":" and not quoted:
+                break
+        else:
+            raise ValueError(f"Некорректная строка: {line[:50]}")
+
+    name, *params = line[:colon].split(";")
+    parsed = {}
+    for param in params:
+        key, _, value = param.partition("=")
+        parsed[key.upper()] = value.strip('"')
+    return name.upper(), parsed, line[colon + 1:]
+
+
+@dataclass
+class ParsedEvent:
+    """Свойства одного VEVENT: имя -> [(параметры, значение), ...]."""
+    line: int
+    properties: dict[str, list[tuple[dict[str, str], str]]] = field(default_factory=dict)
+
+    def first(self, name: str) -> tuple[dict[str, str], str] | None:
+        values = self.properties.get(name)
+        return values[0] if values else None
+
+    def text(self, name: str) -> str | None:
+        prop = self.first(name)
+        return unescape_text(prop[1]) if prop else None
+
+
+@dataclass
+class CalendarDefaults:
+    # X-WR-TIMEZONE: пояс для «плавающего» времени без TZID и Z
+    tz: str | None = None
+
+
+async def parse_events(
+    lines: AsyncIterable[tuple[int, str]],
+    defaults: CalendarDefaults,
+) -> AsyncIterator[ParsedEvent | tuple[int, str]]:
+    """
+    VEVENT по одному. Ошибка разбора строки внутри события отдаётся как (номер строки, текст),
+    а само событие пропускается. Без BEGIN:VCALENDAR — ValueError.
+    """
+    seen_calendar = False
+    event: ParsedEvent | None = None
+    broken = False
+    # Вложенные компоненты внутри VEVENT (VALARM) пропускаются целиком
+    nested = 0
+
+    async for number, line in lines:
+        try:
+            name, params, value = parse_content_line(line)
+        except ValueError as exc:
+            if event is None:
+                if not seen_calendar:
+                    raise
+                continue
+            if not broken:
+                yield number, str(exc)
+            broken = True
+            continue
+
+        if name == "BEGIN":
+            value = value.upper()
+            if value == "VCALENDAR":
+                seen_calendar = True
+            elif event is not None:
+                nested += 1
+            elif value == "VEVENT":
+                event, broken, nested = ParsedEvent(line=number), False, 0
+            continue
+        if not seen_calendar:
+            raise ValueError("Файл не похож на iCalendar: нет BEGIN:VCALENDAR")
+
+        if name == "END":
+            if event is not None and nested:
+                nested -= 1
+            elif event is not None and value.upper() == "VEVENT":
+                if not broken:
+                    yield event
+                event = None
+            continue
+
+        if event is None:
+            if name == "X-WR-TIMEZONE":
+                try:
+                    get_zone(value)
+                    defaults.tz = value
+                except ValueError:
+                    pass
+        elif not nested:
+            event.properties.setdefault(name, []).append((params, value))
+
+    if not seen_calendar:
+        raise ValueError("Файл не похож на iCalendar: нет BEGIN:VCALENDAR")
+
+
+def unescape_text(value: str) -> str:
+    if "\\" not in value:
+        return value
+    result = []
+    chars = iter(value)
+    for char in chars:
+        if char == "\\":
+            char = next(chars, "")
+            char = "\n" if char in ("n", "N") else char
+        result.append(char)
+    return "".join(result)
+
+
+def parse_datetime(value: str, params: dict[str, str], default_tz: str | None = None) -> tuple[datetime.datetime, bool]:
+    """Значение DATE или DATE-TIME -> (момент с поясом, это дата без времени)."""
+    value = value.strip()
+    try:
+        if params.get("VALUE", "").upper() == "DATE" or len(value) == 8:
+            day = datetime.datetime(int(value[0:4]), int(value[4:6]), int(value[6:8]))
+            return day.replace(tzinfo=get_zone(params.get("TZID") or default_tz)), True
+
+        if value[8] != "T":
+            raise ValueError
+        local = datetime.datetime(
+            int(value[0:4]), int(value[4:6]), int(value[6:8]),
+            int(value[9:11]), int(value[11:13]), int(value[13:15]),
+        )
+    except (ValueError, IndexError):
+        raise ValueError(f"Некорректная дата: {value}") from None
+
+    if value.endswith("Z"):
+        return local.replace(tzinfo=datetime.timezone.utc), False
+    return local.replace(tzinfo=get_zone(params.get("TZID") or default_tz)), False
+
+
+def parse_datetimes(values: Iterable[tuple[dict[str, str], str]], default_tz: str | None) -> list[datetime.datetime]:
+    """EXDATE: значения через запятую, свойство может повторяться."""
+    return [
+        parse_datetime(item, params, default_tz)[0]
+        for params, value in values
+        for item in value.split(",")
+        if item.strip()
+    ]
+
+
+def parse_duration(value: str) -> datetime.timedelta:
+    match = _DURATION.match(value.strip().upper())
+    if not match or not any(match.groups()[1:]):
+        raise ValueError(f"Некорректная длительность: {value}")
+    sign, weeks, days, hours, minutes, seconds = match.groups()
+    duration = datetime.timedelta(
+        weeks=int(weeks or 0), days=int(days or 0),
+        hours=int(hours or 0), minutes=int(minutes or 0), seconds=int(seconds or 0),
+    )
+    return -duration if sign == "-" else duration
+
+
+@dataclass
+class ImportedEvent:
+    line: int
+    uid: str | None
+    # Поля EventCreate
+    data: dict
+    # Для изменённого экземпляра — исходное начало в серии
+    recurrence_start: datetime.datetime | None = None
+    cancelled: bool = False
+
+
+def to_event(parsed: ParsedEvent, defaults: CalendarDefaults) -> ImportedEvent:
+    """Поля события из VEVENT; ValueError с понятным текстом, если событие не перенести."""
+    dtstart = parsed.first("DTSTART")
+    if dtstart is None:
+        raise ValueError("Нет DTSTART")
+    params, value = dtstart
+    tz = params.get("TZID") or defaults.tz
+    start, all_day = parse_datetime(value, params, defaults.tz)
+
+    dtend = parsed.first("DTEND")
+    duration = parsed.first("DURATION")
+    if dtend is not None:
+        end = parse_datetime(dtend[1], dtend[0], defaults.tz)[0]
+    elif duration is not None:
+        end = start + parse_duration(duration[1])
+    else:
+        # RFC 5545 3.6.1: у даты без DTEND — один день, у момента — нулевая длительность
+        end = start + datetime.timedelta(days=1) if all_day else start
+
+    rrule = parsed.first("RRULE")
+    exdates = parse_datetimes(parsed.properties.get("EXDATE", ()), defaults.tz) if rrule else None
+    data = {
+        "title": parsed.text("SUMMARY") or "Без названия",
+        "description": parsed.text("DESCRIPTION") or None,
+        "start": start,
+        "end": end,
+        "rrule": rrule[1] if rrule else None,
+        "exdates": exdates or None,
+        "timezone": tz if rrule else None,
+    }
+
+    recurrence = parsed.first("RECURRENCE-ID")
+    status = parsed.first("STATUS")
+    return ImportedEvent(
+        line=parsed.line,
+        uid=parsed.text("UID"),
+        data=data,
+        recurrence_start=parse_datetime(recurrence[1], recurrence[0], defaults.tz)[0] if recurrence else None,
+        cancelled=bool(status and status[1].strip().upper() == "CANCELLED"),
+    )
+
+
+def _validation_detail(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(map(str, error['loc']))}: {error['msg']}" if error["loc"] else error["msg"]
+        for error in exc.errors()
+    )
+
+
+@dataclass
+class _Series:
+    id: int
+    rrule: str
+    start: datetime.datetime
+    timezone: str | None
+
+
+async def import_events(
+    db: AsyncSession,
+    calendar_id: int,
+    user_id: int,
+    file,
+    spans: list,
+) -> EventImportResult:
+    """
+    Импортирует события из .ics в текущей транзакции (touch_calendar и commit — за вызывающим).
+    Ошибочные события попадают в errors и не мешают остальным. Файл не iCalendar
+    или событий больше ICS_IMPORT_MAX_EVENTS — ValueError.
+    В spans добавляется один общий интервал импортированных событий (core/histogram.py).
+    """
+    defaults = CalendarDefaults()
+    now = datetime.datetime.now(datetime.timezone.utc)
+    errors: list[EventImportError] = []
+    counts = {"imported": 0, "skipped": 0, "failed": 0}
+
+    pending: list[dict] = []
+    pending_uids: list[str | None] = []
+    # UID серии -> её строка: к ней привязываются изменённые экземпляры
+    series: dict[str, _Series] = {}
+    overrides: dict[tuple[str, datetime.datetime], ImportedEvent] = {}
+    bounds: list = []
+
+    def fail(line: int, uid: str | None, detail: str) -> None:
+        counts["failed"] += 1
+        if len(errors) < settings.ICS_IMPORT_MAX_ERRORS:
+            errors.append(EventImportError(line=line, uid=uid, detail=detail))
+
+    def widen(span) -> None:
+        start, end = span
+        if not bounds:
+            bounds[:] = [start, end]
+            return
+        bounds[0] = min(bounds[0], start)
+        bounds[1] = None if end is None or bounds[1] is None else max(bounds[1], end)
+
+    def row(item: ImportedEvent) -> dict | None:
+        try:
+            data = EventCreate.model_validate(item.data).model_dump()
+        except ValidationError as exc:
+            fail(item.line, item.uid, _validation_detail(exc))
+            return None
+        try:
+            recurrence_until = (
+                series_end(parse_rrule(data["rrule"]), data["start"], data["end"], data["timezone"])
+                if data["rrule"] else None
+            )
+        except ValueError as exc:
+            fail(item.line, item.uid, str(exc))
+            return None
+        widen(event_span(data["start"], data["end"], data["rrule"], recurrence_until))
+        return {
+            **data,
+            "calendar_id": calendar_id,
+            "created_by": user_id,
+            "created_at": now,
+            "recurrence_until": recurrence_until,
+        }
+
+    async def flush(rows: list[dict], uids: list[str | None]) -> None:
+        if not rows:
+            return
+        ids = await db.scalars(insert(Event).returning(Event.id, sort_by_parameter_order=True), rows)
+        for values, uid, event_id in zip(rows, uids, ids.all()):
+            if uid and values["rrule"]:
+                series[uid] = _Series(event_id, values["rrule"], values["start"], values["timezone"])
+        counts["imported"] += len(rows)
+        rows.clear()
+        uids.clear()
+
+    async for parsed in parse_events(read_lines(file), defaults):
+        if isinstance(parsed, tuple):
+            fail(parsed[0], None, parsed[1])
+            continue
+        try:
+            item = to_event(parsed, defaults)
+        except ValueError as exc:
+            fail(parsed.line, parsed.text("UID"), str(exc))
+            continue
+
+        if item.recurrence_start is not None:
+            if not item.uid:
+                fail(item.line, None, "У изменённого экземпляра нет UID серии")
+            else:
+                # Повтор того же экземпляра заменяет предыдущий, как в клиентах
+                overrides[(item.uid, item.recurrence_start)] = item
+        elif item.cancelled:
+            counts["skipped"] += 1
+        elif (values := row(item)) is not None:
+            pending.append(values)
+            pending_uids.append(item.uid)
+            if len(pending) >= settings.ICS_IMPORT_BATCH_SIZE:
+                await flush(pending, pending_uids)
+
+        if counts["imported"] + len(pending) + len(overrides) > settings.ICS_IMPORT_MAX_EVENTS:
+            raise ValueError(f"В файле больше {settings.ICS_IMPORT_MAX_EVENTS} событий")
+    await flush(pending, pending_uids)
+
+    # Изменённые и отменённые экземпляры — когда все серии уже вставлены
+    cancelled: dict[int, list[datetime.datetime]] = {}
+    override_rows = []
+    for (uid, recurrence_start), item in overrides.items():
+        parent = series.get(uid)
+        if parent is None:
+            fail(item.line, uid, "Серия этого экземпляра не найдена в файле")
+            continue
+        if not is_occurrence(parse_rrule(parent.rrule), parent.start, recurrence_start, parent.timezone):
+            fail(item.line, uid, "RECURRENCE-ID не совпадает ни с одним экземпляром серии")
+            continue
+        if item.cancelled:
+            cancelled.setdefault(parent.id, []).append(recurrence_start)
+            counts["skipped"] += 1
+            continue
+
+        item.data.update(rrule=None, exdates=None, timezone=None)
+        if (values := row(item)) is not None:
+            override_rows.append({**values, "recurrence_id": parent.id, "recurrence_start": recurrence_start})
+
+    for start in range(0, len(override_rows), settings.ICS_IMPORT_BATCH_SIZE):
+        batch = override_rows[start:start + settings.ICS_IMPORT_BATCH_SIZE]
+        await flush(batch, [None] * len(batch))
+
+    for series_id, exdates in cancelled.items():
+        await db.execute(
+            update(Event)
+            .where(Event.id == series_id)
+            # array_cat(NULL, ...) — просто второй массив
+            .values(
+                exdates=func.array_cat(Event.exdates, cast(exdates, ARRAY(DateTime(timezone=True)))),
+                version=Event.version + 1,
+            ),
+            execution_options={"synchronize_session": False},
+        )
+
+    if bounds:
+        spans.append(tuple(bounds))
+    return EventImportResult(errors=errors, **counts)
@@ -0,0 +1,78 @@
+from bisect import bisect_left
+from datetime import datetime
+from typing import Generic, Iterable, TypeVar
+
+# Операции над полуоткрытыми интервалами времени [start, end)
+
+Interval = tuple[datetime, datetime]
+T = TypeVar("T")
+
+
+def clip(intervals: Iterable[Interval], window_start: datetime, window_end: datetime) -> list[Interval]:
+    """Обрезает интервалы по окну; пустые (нулевой длины) отбрасываются."""
+    clipped = []
+    for start, end in intervals:
+        start, end = max(start, window_start), min(end, window_end)
+        if start < end:
+            clipped.append((start, end))
+    return clipped
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> list[Interval]:
+    """
+    Сливает пересекающиеся и смежные интервалы одним проходом.
+    Вход должен быть отсортирован по началу.
+    """
+    merged: list[Interval] = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class IntervalIndex(Generic[T]):
+    """
+    Статическое дерево интервалов для проверки многих интервалов сразу (пакеты, импорт):
+    элементы отсортированы по началу, над концами — дерево отрезков с максимумами.
+    Поиск всех пересечений с [start, end) — O(log n + k).
+    """
+
+    def __init__(self, items: Iterable[tuple[datetime, datetime, T]]):
+        self._items = sorted(items, key=lambda item: item[0])
+        self._starts = [item[0] for item in self._items]
+
+        self._size = 1
+        while self._size < len(self._items):
+            self._size *= 2
+        self._max_end: list[datetime | None] = [None] * (2 * self._size)
+        for i, (_, end, _) in enumerate(self._items):
+            self._max_end[self._size + i] = end
+        for node in range(self._size - 1, 0, -1):
+            ends = [end for end in self._max_end[2 * node:2 * node + 2] if end is not None]
+            self._max_end[node] = max(ends) if ends else None
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def overlapping(self, start: datetime, end: datetime) -> list[T]:
+        """Значения интервалов, пересекающихся с [start, end), по возрастанию начала."""
+        # Кандидаты — только с началом до end; среди них спускаемся в поддеревья,
+        # где максимальный конец больше start
+        limit = bisect_left(self._starts, end)
+        found = []
+        stack = [(1, 0, self._size)]
+        while stack:
+            node, low, high = stack.pop()
+            max_end = self._max_end[node]
+            if low >= limit or max_end is None or max_end <= start:
+                continue
+            if node >= self._size:
+                found.append(self._items[low][2])
+                continue
+            middle = (low + high) // 2
+            stack.append((2 * node + 1, middle, high))
+            stack.append((2 * node, low, middle))
+        return found
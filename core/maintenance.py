@@ -0,0 +1,214 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Awaitable, Callable
+
+from sqlalchemy import delete, func, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core import metrics
+from core.change_feed import advance_horizon
+from core.config import settings
+from core.database import async_session_factory
+from core.revocation import DELETED_USER_RETENTION_SECONDS
+from models.change_feed import Tombstone
+from models.refresh_session import RefreshSession
+from models.user import DeletedUser, User
+
+# Периодическое обслуживание БД внутри приложения (запускается из lifespan).
+# Задачи чистят данные пачками по MAINTENANCE_BATCH_SIZE строк, каждая пачка — своя
+# короткая транзакция, чтобы не держать долгих блокировок. Если воркеров несколько,
+# каждую пачку выполняет только один: advisory lock берётся на транзакцию пачки.
+# Между пачками блокировка отпускается, так что пачки одной задачи в одном тике могут
+# выполнять разные воркеры по очереди — задачи идемпотентны, это безопасно.
+
+Job = Callable[[AsyncSession], Awaitable[int]]
+
+
+@dataclass
+class PeriodicJob:
+    name: str
+    interval_seconds: int
+    func: Job
+
+
+_jobs: list[PeriodicJob] = []
+_tasks: list[asyncio.Task] = []
+
+
+def periodic(name: str, interval_seconds: int):
+    """Регистрирует задачу обслуживания. Функция возвращает число затронутых строк."""
+    def decorator(func: Job) -> Job:
+        _jobs.append(PeriodicJob(name, interval_seconds, func))
+        return func
+    return decorator
+
+
+async def _try_lock(db: AsyncSession, name: str) -> bool:
+    return await db.scalar(
+        text("SELECT pg_try_advisory_xact_lock(hashtext(:name))"),
+        {"name": name},
+    )
+
+
+async def run_in_batches(db: AsyncSession, name: str, stmt) -> int:
+    """
+    Выполняет DML, ограниченный LIMIT MAINTENANCE_BATCH_SIZE, пока он что-то затрагивает.
+    Каждая пачка — под своей advisory-блокировкой; если её держит другой воркер,
+    этот заканчивает. Возвращает общее число строк, затронутых этим воркером.
+    """
+    total = 0
+    while True:
+        if not await _try_lock(db, name):
+            await db.rollback()
+            return total
+
+        result = await db.execute(stmt, execution_options={"synchronize_session": False})
+        await db.commit()
+
+        total += result.rowcount
+        if result.rowcount < settings.MAINTENANCE_BATCH_SIZE:
+            return total
+
+
+async def _run_job(job: PeriodicJob) -> None:
+    while True:
+        await asyncio.sleep(job.interval_seconds)
+
+        started = time.perf_counter()
+        try:
+            async with async_session_factory() as db:
+                rows = await job.func(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            metrics.increment(f"maintenance.{job.name}.errors")
+            print(f"[!] Maintenance job {job.name} failed: {e}")
+            continue
+
+        elapsed = time.perf_counter() - started
+        metrics.timing(f"maintenance.{job.name}").observe(elapsed)
+        metrics.increment(f"maintenance.{job.name}.rows", rows)
+        if rows:
+            print(f"[~] Maintenance {job.name}: {rows} rows in {elapsed * 1000:.0f} ms")
+
+
+def start() -> None:
+    if not _tasks:
+        _tasks.extend(asyncio.create_task(_run_job(job)) for job in _jobs)
+
+
+async def stop() -> None:
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
+
+
+# --- Jobs ---
+
+@periodic("expired_refresh_sessions", settings.MAINTENANCE_INTERVAL_SECONDS)
+async def purge_expired_refresh_sessions(db: AsyncSession) -> int:
+    expired = (
+        select(RefreshSession.id)
+        .where(RefreshSession.expires_at < func.now())
+        .limit(settings.MAINTENANCE_BATCH_SIZE)
+    )
+    return await run_in_batches(
+        db,
+        "expired_refresh_sessions",
+        delete(RefreshSession).where(RefreshSession.id.in_(expired)),
+    )
+
+
+@periodic("excess_refresh_sessions", settings.MAINTENANCE_INTERVAL_SECONDS)
+async def purge_excess_refresh_sessions(db: AsyncSession) -> int:
+    """Оставляет каждому пользователю не больше MAX_SESSIONS_PER_USER самых свежих сессий."""
+    crowded_users = (
+        select(RefreshSession.user_id)
+        .group_by(RefreshSession.user_id)
+        .having(func.count() > settings.MAX_SESSIONS_PER_USER)
+    )
+    ranked = (
+        select(
+            RefreshSession.id,
+            func.row_number().over(
+                partition_by=RefreshSession.user_id,
+                order_by=(RefreshSession.created_at.desc(), RefreshSession.id.desc()),
+            ).label("rn"),
+        )
+        .where(RefreshSession.user_id.in_(crowded_users))
+        .subquery()
+    )
+    excess = (
+        select(ranked.c.id)
+        .where(ranked.c.rn > settings.MAX_SESSIONS_PER_USER)
+        .limit(settings.MAINTENANCE_BATCH_SIZE)
+    )
+    return await run_in_batches(
+        db,
+        "excess_refresh_sessions",
+        delete(RefreshSession).where(RefreshSession.id.in_(excess)),
+    )
+
+
+@periodic("stale_telegram_tokens", settings.MAINTENANCE_INTERVAL_SECONDS)
+async def clear_stale_telegram_tokens(db: AsyncSession) -> int:
+    stale = (
+        select(User.id)
+        .where(User.telegram_connect_token_expires_at < func.now())
+        .limit(settings.MAINTENANCE_BATCH_SIZE)
+    )
+    return await run_in_batches(
+        db,
+        "stale_telegram_tokens",
+        update(User)
+        .where(User.id.in_(stale))
+        .values(telegram_connect_token=None, telegram_connect_token_expires_at=None),
+    )
+
+
+@periodic("expired_deleted_users", settings.MAINTENANCE_INTERVAL_SECONDS)
+async def purge_expired_deleted_users(db: AsyncSession) -> int:
+    """Забывает удалённых пользователей, чьи access-токены уже истекли (core/revocation.py)."""
+    expired = (
+        select(DeletedUser.user_id)
+        .where(DeletedUser.deleted_at < func.now() - timedelta(seconds=DELETED_USER_RETENTION_SECONDS))
+        .limit(settings.MAINTENANCE_BATCH_SIZE)
+    )
+    return await run_in_batches(
+        db,
+        "expired_deleted_users",
+        delete(DeletedUser).where(DeletedUser.user_id.in_(expired)),
+    )
+
+
+@periodic("expired_tombstones", settings.MAINTENANCE_INTERVAL_SECONDS)
+async def purge_expired_tombstones(db: AsyncSession) -> int:
+    """
+    Удаляет записи об удалениях старше TOMBSTONE_RETENTION_DAYS. Сначала сдвигается
+    горизонт ленты: курсоры до него получат 410 и пересинхронизируются целиком.
+    """
+    cutoff = await db.scalar(
+        select(func.max(Tombstone.change_seq)).where(
+            Tombstone.deleted_at
+            < func.now() - timedelta(days=settings.TOMBSTONE_RETENTION_DAYS)
+        )
+    )
+    if cutoff is None:
+        return 0
+
+    await advance_horizon(db, cutoff)
+    await db.commit()
+
+    expired = (
+        select(Tombstone.id)
+        .where(Tombstone.change_seq <= cutoff)
+        .limit(settings.MAINTENANCE_BATCH_SIZE)
+    )
+    return await run_in_batches(
+        db,
+        "expired_tombstones",
+        delete(Tombstone).where(Tombstone.id.in_(expired)),
+    )
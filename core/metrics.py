@@ -0,0 +1,44 @@
+from collections import defaultdict
+
+
+class Timing:
+    """Накопитель длительностей: количество, сумма и максимум (в секундах)."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "avg_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+_timings: dict[str, Timing] = defaultdict(Timing)
+_counters: dict[str, int] = defaultdict(int)
+
+
+def timing(name: str) -> Timing:
+    return _timings[name]
+
+
+def increment(name: str, value: int = 1) -> None:
+    _counters[name] += value
+
+
+def snapshot() -> dict:
+    """Текущее состояние всех метрик процесса (для /metrics)."""
+    return {
+        "timings": {name: t.as_dict() for name, t in sorted(_timings.items())},
+        "counters": dict(sorted(_counters.items())),
+    }
@@ -0,0 +1,235 @@
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+# Изменения схемы для уже существующих баз: create_all создаёт только недостающие таблицы
+# и не трогает индексы/колонки существующих. Новые базы получают всё через create_all,
+# поэтому каждая миграция обязана быть идемпотентной (IF NOT EXISTS и т.п.).
+# Миграции применяются по порядку, один раз; список только дополняется.
+#
+# Чтобы добавить индекс или колонку: описать их в модели (для новых баз) и добавить
+# сюда миграцию с тем же именем объекта (для существующих). Применяется в init_db
+# при старте, в одной транзакции под advisory lock.
+
+MIGRATIONS: list[tuple[str, list[str]]] = [
+    (
+        "0001_calendar_users_unique_pair",
+        [
+            # Убираем возможные дубли, иначе уникальный индекс не создастся
+            """
+            DELETE FROM calendar_users a
+            USING calendar_users b
+            WHERE a.calendar_id = b.calendar_id
+              AND a.user_id = b.user_id
+              AND a.id > b.id
+            """,
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS uq_calendar_users_calendar_user
+            ON calendar_users (calendar_id, user_id)
+            """,
+        ],
+    ),
+    (
+        "0002_users_token_generation",
+        [
+            """
+            ALTER TABLE users
+            ADD COLUMN IF NOT EXISTS token_generation INTEGER NOT NULL DEFAULT 0
+            """,
+        ],
+    ),
+    (
+        "0003_refresh_sessions_token_hash",
+        [
+            "ALTER TABLE refresh_sessions ADD COLUMN IF NOT EXISTS token_hash VARCHAR(64)",
+            "ALTER TABLE refresh_sessions ADD COLUMN IF NOT EXISTS previous_token_hash VARCHAR(64)",
+            "ALTER TABLE refresh_sessions ADD COLUMN IF NOT EXISTS rotated_at TIMESTAMPTZ",
+            # Переносим полные токены в дайджесты и удаляем старую колонку с её индексом
+            """
+            DO $$
+            BEGIN
+                IF EXISTS (
+                    SELECT 1 FROM information_schema.columns
+                    WHERE table_name = 'refresh_sessions' AND column_name = 'refresh_token'
+                ) THEN
+                    UPDATE refresh_sessions
+                    SET token_hash = encode(sha256(convert_to(refresh_token, 'UTF8')), 'hex')
+                    WHERE token_hash IS NULL;
+
+                    ALTER TABLE refresh_sessions DROP COLUMN refresh_token;
+                END IF;
+            END
+            $$
+            """,
+            "ALTER TABLE refresh_sessions ALTER COLUMN token_hash SET NOT NULL",
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS ix_refresh_sessions_token_hash
+            ON refresh_sessions (token_hash)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS ix_refresh_sessions_previous_token_hash
+            ON refresh_sessions (previous_token_hash)
+            """,
+        ],
+    ),
+    (
+        "0004_maintenance_indexes",
+        [
+            """
+            CREATE INDEX IF NOT EXISTS ix_refresh_sessions_expires_at
+            ON refresh_sessions (expires_at)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS ix_refresh_sessions_user_created
+            ON refresh_sessions (user_id, created_at)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS ix_users_telegram_connect_token_expires_at
+            ON users (telegram_connect_token_expires_at)
+            """,
+        ],
+    ),
+    (
+        "0005_events_range_indexes",
+        [
+            """
+            CREATE INDEX IF NOT EXISTS ix_events_calendar_start
+            ON events (calendar_id, start)
+            """,
+            # Выражение обязано совпадать с models.event.event_period
+            """
+            CREATE INDEX IF NOT EXISTS ix_events_period
+            ON events USING gist (tstzrange(start, GREATEST("end", start), '[]'))
+            """,
+        ],
+    ),
+    (
+        "0006_calendars_version",
+        [
+            """
+            ALTER TABLE calendars
+            ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 1
+            """,
+        ],
+    ),
+    (
+        "0007_change_feed_columns",
+        [
+            # Последовательность и таблицы ленты создаёт create_all, здесь — колонки
+            # существующих таблиц. Старые строки получают номера по порядку
+            "CREATE SEQUENCE IF NOT EXISTS calendar_change_seq",
+            "ALTER TABLE events ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now()",
+            """
+            ALTER TABLE events
+            ADD COLUMN IF NOT EXISTS change_seq BIGINT NOT NULL DEFAULT nextval('calendar_change_seq')
+            """,
+            "ALTER TABLE event_contents ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now()",
+            """
+            ALTER TABLE event_contents
+            ADD COLUMN IF NOT EXISTS change_seq BIGINT NOT NULL DEFAULT nextval('calendar_change_seq')
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS ix_events_calendar_change_seq
+            ON events (calendar_id, change_seq)
+            """,
+        ],
+    ),
+    (
+        "0008_events_recurrence",
+        [
+            "ALTER TABLE events ADD COLUMN IF NOT EXISTS rrule VARCHAR(255)",
+            "ALTER TABLE events ADD COLUMN IF NOT EXISTS exdates TIMESTAMPTZ[]",
+            "ALTER TABLE events ADD COLUMN IF NOT EXISTS timezone VARCHAR(64)",
+            "ALTER TABLE events ADD COLUMN IF NOT EXISTS recurrence_until TIMESTAMPTZ",
+            """
+            ALTER TABLE events ADD COLUMN IF NOT EXISTS recurrence_id INTEGER
+            REFERENCES events (id) ON DELETE CASCADE
+            """,
+            "ALTER TABLE events ADD COLUMN IF NOT EXISTS recurrence_start TIMESTAMPTZ",
+            """
+            CREATE INDEX IF NOT EXISTS ix_events_calendar_series
+            ON events (calendar_id, start) WHERE rrule IS NOT NULL
+            """,
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS uq_events_recurrence
+            ON events (recurrence_id, recurrence_start)
+            """,
+        ],
+    ),
+    (
+        "0009_row_versions",
+        [
+            "ALTER TABLE events ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1",
+            "ALTER TABLE event_contents ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1",
+            "ALTER TABLE correction_orders ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1",
+        ],
+    ),
+    (
+        "0010_search_vectors",
+        [
+            # Выражения совпадают с Computed в моделях (models/event.py, models/event_content.py)
+            """
+            ALTER TABLE events ADD COLUMN IF NOT EXISTS search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('russian', coalesce(title, '')), 'A') ||
+                setweight(to_tsvector('russian', coalesce(description, '')), 'B')
+            ) STORED
+            """,
+            """
+            ALTER TABLE event_contents ADD COLUMN IF NOT EXISTS search_vector tsvector
+            GENERATED ALWAYS AS (
+                CASE WHEN type = 'text' THEN to_tsvector('russian', coalesce(text, '')) END
+            ) STORED
+            """,
+            "CREATE INDEX IF NOT EXISTS ix_events_search ON events USING gin (search_vector)",
+            "CREATE INDEX IF NOT EXISTS ix_event_contents_search ON event_contents USING gin (search_vector)",
+        ],
+    ),
+    (
+        "0011_events_calendar_start_id",
+        [
+            # Заменяет ix_events_calendar_start: тот же префикс плюс id для агенды
+            """
+            CREATE INDEX IF NOT EXISTS ix_events_calendar_start_id
+            ON events (calendar_id, start, id)
+            """,
+            "DROP INDEX IF EXISTS ix_events_calendar_start",
+        ],
+    ),
+]
+
+# Произвольный ключ pg_advisory_xact_lock: воркеры стартуют одновременно
+_MIGRATIONS_LOCK_KEY = 7_314_205_001
+
+
+async def lock_schema(connection: AsyncConnection) -> None:
+    await connection.execute(
+        text("SELECT pg_advisory_xact_lock(:key)"),
+        {"key": _MIGRATIONS_LOCK_KEY},
+    )
+
+
+async def run_migrations(connection: AsyncConnection) -> None:
+    await connection.execute(text(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            name TEXT PRIMARY KEY,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """
+    ))
+
+    result = await connection.execute(text("SELECT name FROM schema_migrations"))
+    applied = set(result.scalars().all())
+
+    for name, statements in MIGRATIONS:
+        if name in applied:
+            continue
+
+        for statement in statements:
+            await connection.execute(text(statement))
+
+        await connection.execute(
+            text("INSERT INTO schema_migrations (name) VALUES (:name)"),
+            {"name": name},
+        )
+        print(f"[+] Applied migration {name}")
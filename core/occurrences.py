@@ -0,0 +1,73 @@
+from datetime import timedelta
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.recurrence import occurrence_windows, parse_rrule
+from models.event import Event, series_overlapping
+from schemas.event import EventOut
+
+# Разворачивание серий в экземпляры для выборок по периоду. Одиночные события и
+# изменённые экземпляры приходят обычным запросом (events_overlapping); здесь
+# добавляются остальные экземпляры серий, только внутри запрошенного окна.
+
+
+def occurrence_key(event) -> tuple:
+    """Порядок выдачи: календарь, затем начало (так же сортируются запросы событий)."""
+    return event.calendar_id, event.start
+
+
+async def _overridden_starts(
+    db: AsyncSession,
+    series_ids: list[int],
+    from_date,
+    to_date,
+) -> dict[int, list]:
+    result = await db.execute(
+        select(Event.recurrence_id, Event.recurrence_start).where(
+            Event.recurrence_id.in_(series_ids),
+            Event.recurrence_start >= from_date,
+            Event.recurrence_start < to_date,
+        )
+    )
+    overridden: dict[int, list] = {}
+    for series_id, start in result.all():
+        overridden.setdefault(series_id, []).append(start)
+    return overridden
+
+
+async def expand_series(db: AsyncSession, scope, from_date, to_date) -> list[EventOut]:
+    """
+    Экземпляры серий, попадающих под условие scope (календарь, членство),
+    пересекающиеся с [from_date, to_date). Отсортированы по occurrence_key.
+    Экземпляры, для которых есть изменённая строка или EXDATE, пропускаются.
+    """
+    result = await db.scalars(select(Event).where(scope, series_overlapping(from_date, to_date)))
+    series = result.all()
+    if not series:
+        return []
+
+    # Экземпляр попадает в окно и тогда, когда начался раньше него
+    longest = max(max(event.end - event.start, timedelta(0)) for event in series)
+    overridden = await _overridden_starts(
+        db, [event.id for event in series], from_date - longest, to_date
+    )
+
+    instances = []
+    for event in series:
+        template = EventOut.model_validate(event)
+        skip = [*(event.exdates or ()), *overridden.get(event.id, ())]
+        for start, end in occurrence_windows(
+            parse_rrule(event.rrule), event.start, event.end,
+            from_date, to_date, event.timezone, skip,
+        ):
+            instances.append(template.model_copy(update={
+                "start": start,
+                "end": end,
+                "exdates": None,
+                "recurrence_id": event.id,
+                "recurrence_start": start,
+            }))
+
+    instances.sort(key=occurrence_key)
+    return instances
@@ -0,0 +1,60 @@
+from typing import Any
+
+import orjson
+from fastapi import HTTPException, Query, Response, status
+
+from models.event import Event
+from schemas.event import EventOut
+
+# Выборочные поля (sparse fieldsets) в списках событий: ?fields=id,title,start,end.
+# В SQL выбираются только нужные колонки (select по колонкам — строки Row, без
+# ORM-объектов и identity map), ответ собирается orjson из словарей, без pydantic-моделей.
+# Даты — в том же виде, что и у response_model (UTC с суффиксом Z). id отдаётся всегда.
+
+EVENT_FIELDS = tuple(EventOut.model_fields)
+
+_ORJSON_OPTIONS = orjson.OPT_UTC_Z
+
+
+class Projection:
+    def __init__(self, fields: tuple[str, ...]):
+        self.fields = fields
+
+    def columns(self, *required: str) -> list:
+        """Колонки Event для select: запрошенные плюс нужные для сортировки/группировки."""
+        return [getattr(Event, name) for name in dict.fromkeys((*self.fields, *required))]
+
+    def to_dict(self, row: Any) -> dict[str, Any]:
+        # row — Row, объект Event или EventOut (экземпляр серии): у всех поля — атрибуты
+        return {name: getattr(row, name) for name in self.fields}
+
+    def dump(self, row: Any) -> bytes:
+        return orjson.dumps(self.to_dict(row), option=_ORJSON_OPTIONS)
+
+    def response(self, content: Any, headers: dict[str, str] | None = None) -> Response:
+        return Response(
+            orjson.dumps(content, option=_ORJSON_OPTIONS),
+            media_type="application/json",
+            headers=headers,
+        )
+
+    def etag_part(self) -> str:
+        return ",".join(self.fields)
+
+
+def event_projection(
+    fields: str | None = Query(
+        None, description="Только эти поля события, через запятую: id,title,start,end,calendar_id"
+    ),
+) -> Projection | None:
+    if not fields:
+        return None
+
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in EVENT_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Неизвестные поля: {', '.join(unknown)}",
+        )
+    return Projection(tuple(dict.fromkeys(["id", *names])))
@@ -0,0 +1,95 @@
+import asyncio
+from collections import defaultdict
+from typing import Callable
+
+import asyncpg
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+
+# Межпроцессные уведомления через Postgres LISTEN/NOTIFY.
+# Каждый воркер uvicorn держит одно выделенное соединение и слушает зарегистрированные каналы.
+# Обработчик получает payload строкой, либо None после (пере)подключения —
+# это значит, что часть сообщений могла быть пропущена и локальное состояние надо сбросить целиком.
+
+Handler = Callable[[str | None], None]
+
+_handlers: dict[str, list[Handler]] = defaultdict(list)
+_listener_task: asyncio.Task | None = None
+
+RECONNECT_DELAY_SECONDS = 5
+
+
+def subscribe(channel: str, handler: Handler) -> None:
+    _handlers[channel].append(handler)
+
+
+async def publish(db: AsyncSession, channel: str, payload: str) -> None:
+    """
+    Отправляет NOTIFY в рамках текущей транзакции сессии.
+    Postgres доставит его всем слушателям только после commit (и не доставит при rollback).
+    """
+    await db.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": channel, "payload": payload},
+    )
+
+
+def _dispatch(channel: str, payload: str | None) -> None:
+    for handler in _handlers.get(channel, []):
+        try:
+            handler(payload)
+        except Exception as e:
+            print(f"Error handling notification on {channel}: {e}")
+
+
+def _listener_dsn() -> str:
+    url = make_url(settings.DATABASE_URL).set(drivername="postgresql")
+    return url.render_as_string(hide_password=False)
+
+
+async def _listen_forever() -> None:
+    while True:
+        connection = None
+        try:
+            connection = await asyncpg.connect(_listener_dsn())
+            closed = asyncio.Event()
+            connection.add_termination_listener(lambda _: closed.set())
+
+            for channel in list(_handlers):
+                await connection.add_listener(
+                    channel,
+                    lambda _conn, _pid, channel, payload: _dispatch(channel, payload),
+                )
+                # Пока соединения не было, уведомления терялись
+                _dispatch(channel, None)
+
+            await closed.wait()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Notification listener error: {e}")
+        finally:
+            if connection is not None and not connection.is_closed():
+                await connection.close()
+
+        await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+
+
+def start_listener() -> None:
+    global _listener_task
+    if _listener_task is None:
+        _listener_task = asyncio.create_task(_listen_forever())
+
+
+async def stop_listener() -> None:
+    global _listener_task
+    if _listener_task is not None:
+        _listener_task.cancel()
+        try:
+            await _listener_task
+        except asyncio.CancelledError:
+            pass
+        _listener_task = None
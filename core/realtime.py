@@ -0,0 +1,131 @@
+import asyncio
+import json
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import AsyncIterator, Iterator
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core import metrics, pubsub
+from core.config import settings
+
+# Push-уведомления об изменениях календарей (SSE /calendars/{id}/stream).
+# Обработчики записи вызывают notify_change() в своей транзакции; после commit Postgres
+# рассылает NOTIFY всем воркерам, включая свой, и каждый раздаёт сообщение локальным
+# подписчикам календаря. Других путей доставки нет, поэтому порядок везде один.
+#
+# У каждого подписчика ограниченная очередь. Если клиент не успевает её разбирать,
+# накопленное выбрасывается и вместо него уходит одно сообщение resync: клиент
+# дочитывает пропущенное через /calendars/{id}/changes.
+
+CHANGES_CHANNEL = "calendar_changes"
+
+RESYNC = {"type": "resync"}
+
+
+class Subscription:
+    def __init__(self, calendar_id: int, user_id: int):
+        self.calendar_id = calendar_id
+        self.user_id = user_id
+        self.queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=settings.REALTIME_QUEUE_SIZE)
+
+    def deliver(self, message: dict) -> None:
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+            metrics.increment("realtime.overflow")
+
+    def is_final(self, message: dict) -> bool:
+        """После этого сообщения подписку надо закрыть: календаря или доступа к нему больше нет."""
+        if message.get("type") == "calendar" and message.get("action") == "deleted":
+            return True
+        return (
+            message.get("type") == "member"
+            and message.get("action") == "removed"
+            and message.get("id") == self.user_id
+        )
+
+
+_subscribers: dict[int, set[Subscription]] = defaultdict(set)
+
+
+@contextmanager
+def subscribe(calendar_id: int, user_id: int) -> Iterator[Subscription]:
+    subscription = Subscription(calendar_id, user_id)
+    _subscribers[calendar_id].add(subscription)
+    metrics.increment("realtime.subscribers")
+    try:
+        yield subscription
+    finally:
+        metrics.increment("realtime.subscribers", -1)
+        subscribers = _subscribers.get(calendar_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del _subscribers[calendar_id]
+
+
+async def notify_change(
+    db: AsyncSession,
+    calendar_id: int,
+    type: str,
+    action: str,
+    id: int | None = None,
+    event_id: int | None = None,
+) -> None:
+    """
+    Публикует изменение календаря. Вызывать в транзакции записи: сообщение уйдёт после commit.
+    type: event | content | member | calendar; action: created | updated | deleted | added | removed,
+    а также batch — много изменений сразу, без подробностей.
+    """
+    message = {"calendar_id": calendar_id, "type": type, "action": action}
+    if id is not None:
+        message["id"] = id
+    if event_id is not None:
+        message["event_id"] = event_id
+    await pubsub.publish(db, CHANGES_CHANNEL, json.dumps(message, separators=(",", ":")))
+
+
+def _on_change_notify(payload: str | None) -> None:
+    if payload is None:
+        # Слушатель переподключился, часть сообщений могла потеряться
+        for subscribers in _subscribers.values():
+            for subscription in subscribers:
+                subscription.deliver(RESYNC)
+        return
+
+    message = json.loads(payload)
+    calendar_id = message.pop("calendar_id")
+    for subscription in list(_subscribers.get(calendar_id, ())):
+        subscription.deliver(message)
+
+
+pubsub.subscribe(CHANGES_CHANNEL, _on_change_notify)
+
+
+def _sse(message: dict) -> bytes:
+    return b"event: %s\ndata: %s\n\n" % (
+        message["type"].encode(),
+        json.dumps(message, ensure_ascii=False, separators=(",", ":")).encode(),
+    )
+
+
+async def stream_events(subscription: Subscription) -> AsyncIterator[bytes]:
+    """Поток text/event-stream; комментарий-пинг раз в REALTIME_HEARTBEAT_SECONDS держит соединение."""
+    yield b"retry: 5000\n\n"
+    while True:
+        try:
+            message = await asyncio.wait_for(
+                subscription.queue.get(),
+                timeout=settings.REALTIME_HEARTBEAT_SECONDS,
+            )
+        except asyncio.TimeoutError:
+            yield b": ping\n\n"
+            continue
+
+        yield _sse(message)
+        if subscription.is_final(message):
+            return
@@ -0,0 +1,302 @@
+import calendar
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Iterator
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+# Повторяющиеся события: подмножество RRULE (RFC 5545) —
+# FREQ=DAILY|WEEKLY|MONTHLY, INTERVAL, COUNT или UNTIL, BYDAY (только для WEEKLY).
+# Экземпляры не хранятся: генератор сразу перескакивает к запрошенному окну
+# арифметикой по номеру периода и выдаёт только попадающие в него начала.
+# Шаг считается по настенному времени в часовом поясе серии, поэтому встреча
+# «по понедельникам в 10:00» остаётся в 10:00 и после перехода на летнее время.
+
+FREQUENCIES = ("DAILY", "WEEKLY", "MONTHLY")
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+
+MAX_COUNT = 10_000
+MAX_INTERVAL = 1_000
+# Дальше UNTIL не имеет смысла, а у 9999 года арифметика дат упирается в datetime.max
+MAX_UNTIL_YEAR = 9000
+
+
+@dataclass(frozen=True)
+class RecurrenceRule:
+    freq: str
+    interval: int = 1
+    count: int | None = None
+    until: datetime | None = None
+    # Дни недели (0 — понедельник), только для WEEKLY
+    byday: tuple[int, ...] = ()
+
+
+def _positive_int(value: str, name: str, maximum: int | None = None) -> int:
+    if not value.isdigit() or int(value) < 1:
+        raise ValueError(f"{name} должен быть положительным целым числом")
+    if maximum is not None and int(value) > maximum:
+        raise ValueError(f"{name} не может быть больше {maximum}")
+    return int(value)
+
+
+def _parse_until(value: str) -> datetime:
+    try:
+        if "T" in value:
+            until = datetime.strptime(value.rstrip("Z"), "%Y%m%dT%H%M%S").replace(tzinfo=timezone.utc)
+        else:
+            until = datetime.strptime(value, "%Y%m%d").replace(tzinfo=timezone.utc)
+    except ValueError:
+        raise ValueError("UNTIL должен быть в формате YYYYMMDD или YYYYMMDDTHHMMSSZ") from None
+    if until.year > MAX_UNTIL_YEAR:
+        raise ValueError(f"UNTIL не может быть позже {MAX_UNTIL_YEAR} года")
+    if "T" not in value:
+        # Дата без времени включает весь день
+        until += timedelta(days=1) - timedelta(microseconds=1)
+    return until
+
+
+def parse_rrule(text: str) -> RecurrenceRule:
+    """Разбирает строку RRULE; ValueError с понятным сообщением, если она не поддерживается."""
+    parts = {}
+    for item in text.strip().removeprefix("RRULE:").split(";"):
+        if not item:
+            continue
+        key, sep, value = item.partition("=")
+        if not sep:
+            raise ValueError(f"Некорректный фрагмент RRULE: {item}")
+        parts[key.strip().upper()] = value.strip().upper()
+
+    unknown = set(parts) - {"FREQ", "INTERVAL", "COUNT", "UNTIL", "BYDAY"}
+    if unknown:
+        raise ValueError(f"Неподдерживаемые параметры RRULE: {', '.join(sorted(unknown))}")
+
+    freq = parts.get("FREQ")
+    if freq not in FREQUENCIES:
+        raise ValueError("FREQ должен быть DAILY, WEEKLY или MONTHLY")
+
+    interval = _positive_int(parts.get("INTERVAL", "1"), "INTERVAL", MAX_INTERVAL)
+    count = _positive_int(parts["COUNT"], "COUNT", MAX_COUNT) if "COUNT" in parts else None
+    until = _parse_until(parts["UNTIL"]) if "UNTIL" in parts else None
+    if count and until:
+        raise ValueError("COUNT и UNTIL нельзя указывать вместе")
+
+    byday = ()
+    if "BYDAY" in parts:
+        if freq != "WEEKLY":
+            raise ValueError("BYDAY поддерживается только для FREQ=WEEKLY")
+        try:
+            byday = tuple(sorted({WEEKDAYS.index(day) for day in parts["BYDAY"].split(",")}))
+        except ValueError:
+            raise ValueError("BYDAY — список из MO, TU, WE, TH, FR, SA, SU") from None
+
+    return RecurrenceRule(freq, interval, count, until, byday)
+
+
+def get_zone(name: str | None):
+    if not name:
+        return timezone.utc
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Неизвестный часовой пояс: {name}") from None
+
+
+def as_aware(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _months_between(start: datetime, end: datetime) -> int:
+    return (end.year - start.year) * 12 + end.month - start.month
+
+
+def _daily(rule, local_start, window_start):
+    step = timedelta(days=rule.interval)
+    # Разность в одном поясе — по настенному времени, запас в один шаг на переход часов
+    first = max(0, (window_start - local_start) // step - 1) if window_start else 0
+    index = first
+    while True:
+        yield index, local_start + step * index
+        index += 1
+
+
+def _weekly(rule, local_start, window_start):
+    days = rule.byday or (local_start.weekday(),)
+    week0 = local_start - timedelta(days=local_start.weekday())
+    step = timedelta(weeks=rule.interval)
+    in_first_week = sum(1 for day in days if day >= local_start.weekday())
+
+    period = max(0, (window_start - week0) // step - 1) if window_start else 0
+    index = 0 if period == 0 else in_first_week + (period - 1) * len(days)
+    while True:
+        week_start = week0 + step * period
+        for day in days:
+            start = week_start + timedelta(days=day)
+            if start < local_start:
+                continue
+            yield index, start
+            index += 1
+        period += 1
+
+
+def _monthly(rule, local_start, window_start):
+    # Месяцы без такого числа (31-е, 30 февраля) пропускаются и в COUNT не идут
+    def month_of(period):
+        year, month = divmod(local_start.month - 1 + rule.interval * period, 12)
+        return local_start.year + year, month + 1
+
+    def valid(period):
+        year, month = month_of(period)
+        return local_start.day <= calendar.monthrange(year, month)[1]
+
+    period = 0
+    if window_start:
+        period = max(0, _months_between(local_start, window_start) // rule.interval - 1)
+
+    index = period
+    if rule.count and local_start.day > 28:
+        index = sum(1 for p in range(period) if valid(p))
+
+    while True:
+        year, month = month_of(period)
+        if valid(period):
+            yield index, local_start.replace(year=year, month=month)
+            index += 1
+        else:
+            # Пустой период: отдаём только его начало, чтобы вызывающий мог остановиться
+            yield None, local_start.replace(year=year, month=month, day=1)
+        period += 1
+
+
+_GENERATORS = {"DAILY": _daily, "WEEKLY": _weekly, "MONTHLY": _monthly}
+
+
+def occurrences(
+    rule: RecurrenceRule,
+    dtstart: datetime,
+    window_start: datetime | None = None,
+    window_end: datetime | None = None,
+    tz: str | None = None,
+) -> Iterator[datetime]:
+    """
+    Начала экземпляров серии в [window_start, window_end), по возрастанию, в UTC.
+    Без window_end генератор ограничен только COUNT/UNTIL (или бесконечен).
+    """
+    zone = get_zone(tz)
+    local_start = as_aware(dtstart).astimezone(zone)
+    window_start = as_aware(window_start) if window_start else None
+    window_end = as_aware(window_end) if window_end else None
+    local_window_start = window_start.astimezone(zone) if window_start else None
+
+    for index, start in _GENERATORS[rule.freq](rule, local_start, local_window_start):
+        if window_end is not None and start >= window_end:
+            return
+        if index is None:
+            continue
+        if rule.count is not None and index >= rule.count:
+            return
+        if rule.until is not None and start > rule.until:
+            return
+        if window_start is not None and start < window_start:
+            continue
+        yield start.astimezone(timezone.utc)
+
+
+def occurrence_windows(
+    rule: RecurrenceRule,
+    start: datetime,
+    end: datetime,
+    window_start: datetime,
+    window_end: datetime,
+    tz: str | None = None,
+    exdates: Iterable[datetime] = (),
+) -> Iterator[tuple[datetime, datetime]]:
+    """
+    (начало, конец) экземпляров, пересекающихся с [window_start, window_end), кроме EXDATE.
+    Семантика пересечения та же, что у models.event.events_overlapping.
+    """
+    window_start, window_end = as_aware(window_start), as_aware(window_end)
+    duration = max(end - start, timedelta(0))
+    excluded = {as_aware(value) for value in exdates}
+
+    for occurrence in occurrences(rule, start, window_start - duration, window_end, tz):
+        occurrence_end = occurrence + duration
+        if occurrence in excluded or occurrence_end <= window_start:
+            continue
+        yield occurrence, occurrence_end
+
+
+# Примерная длина периода правила — шаг поиска последнего экземпляра до UNTIL
+_PERIODS = {"DAILY": timedelta(days=1), "WEEKLY": timedelta(weeks=1), "MONTHLY": timedelta(days=31)}
+
+
+def _last_by_count(rule: RecurrenceRule, local_start: datetime) -> datetime:
+    """Начало COUNT-го экземпляра (в поясе серии) арифметикой, как его выдали бы генераторы."""
+    last = rule.count - 1
+    if rule.freq == "DAILY":
+        return local_start + timedelta(days=rule.interval) * last
+
+    if rule.freq == "WEEKLY":
+        days = rule.byday or (local_start.weekday(),)
+        week0 = local_start - timedelta(days=local_start.weekday())
+        first_week = [day for day in days if day >= local_start.weekday()]
+        if last < len(first_week):
+            return week0 + timedelta(days=first_week[last])
+        last -= len(first_week)
+        period = 1 + last // len(days)
+        return week0 + timedelta(weeks=rule.interval) * period + timedelta(days=days[last % len(days)])
+
+    # MONTHLY: месяцы без такого числа не считаются — их пропуски можно только перебрать
+    period = last
+    if local_start.day > 28:
+        found, period = 0, -1
+        while found <= last:
+            period += 1
+            year, month = divmod(local_start.month - 1 + rule.interval * period, 12)
+            if local_start.day <= calendar.monthrange(local_start.year + year, month + 1)[1]:
+                found += 1
+    year, month = divmod(local_start.month - 1 + rule.interval * period, 12)
+    return local_start.replace(year=local_start.year + year, month=month + 1)
+
+
+def _last_by_until(rule: RecurrenceRule, start: datetime, tz: str | None) -> datetime | None:
+    """Последний экземпляр не позже UNTIL: окно перед UNTIL, расширяемое вдвое, пока пусто."""
+    start = as_aware(start)
+    span = _PERIODS[rule.freq] * rule.interval
+    while True:
+        window_start = start if span >= rule.until - start else rule.until - span
+        last = None
+        for last in occurrences(rule, start, window_start, rule.until + timedelta(microseconds=1), tz):
+            pass
+        if last is not None or window_start == start:
+            return last
+        span *= 2
+
+
+def series_end(rule: RecurrenceRule, start: datetime, end: datetime, tz: str | None = None) -> datetime | None:
+    """
+    Конец последнего экземпляра конечной серии, None для бесконечной.
+    Без перебора всех экземпляров: по COUNT — арифметикой, по UNTIL — в окне перед ним.
+    ValueError, если серия заканчивается позже MAX_UNTIL_YEAR.
+    """
+    if rule.count is None and rule.until is None:
+        return None
+
+    try:
+        if rule.count is not None:
+            last = _last_by_count(rule, as_aware(start).astimezone(get_zone(tz))).astimezone(timezone.utc)
+        else:
+            last = _last_by_until(rule, start, tz)
+        series_last = last + (end - start) if last is not None else end
+    except (OverflowError, ValueError):
+        # INTERVAL и COUNT по отдельности в пределах, но вместе уводят за datetime.max
+        series_last = None
+    if series_last is None or series_last.year > MAX_UNTIL_YEAR:
+        raise ValueError(f"Серия не может заканчиваться позже {MAX_UNTIL_YEAR} года: уменьшите INTERVAL или COUNT")
+    return series_last
+
+
+def is_occurrence(rule: RecurrenceRule, start: datetime, when: datetime, tz: str | None = None) -> bool:
+    when = as_aware(when)
+    return any(
+        occurrence == when
+        for occurrence in occurrences(rule, start, when, when + timedelta(microseconds=1), tz)
+    )
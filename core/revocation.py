@@ -0,0 +1,125 @@
+import asyncio
+import time
+from datetime import timedelta
+
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core import pubsub
+from core.config import settings
+from models.user import DeletedUser, User
+
+# Отзыв stateless access-токенов. В токене лежит поколение пользователя (gen);
+# любое изменение, влияющее на claims, увеличивает users.token_generation,
+# и все ранее выданные токены этого пользователя перестают приниматься.
+# В памяти держим только пользователей с ненулевым поколением, таблица
+# перечитывается не чаще раза в TOKEN_REVOCATION_REFRESH_SECONDS, а между
+# перечитываниями изменения приходят через NOTIFY.
+# Удалённых пользователей в users уже нет — они записываются в deleted_users и
+# читаются вместе с поколениями, поэтому их видит и воркер, пропустивший NOTIFY
+# (запущенный позже или переподключавший LISTEN).
+
+REVOCATION_CHANNEL = "token_revocations"
+
+# Сколько помнить удалённых пользователей: дольше любого access-токена
+DELETED_USER_RETENTION_SECONDS = 24 * 60 * 60
+
+_generations: dict[int, int] = {}
+_deleted_users: set[int] = set()
+_loaded_at: float | None = None
+_lock = asyncio.Lock()
+
+
+def _is_stale() -> bool:
+    return (
+        _loaded_at is None
+        or time.monotonic() - _loaded_at > settings.TOKEN_REVOCATION_REFRESH_SECONDS
+    )
+
+
+async def ensure_fresh(db: AsyncSession) -> None:
+    global _generations, _deleted_users, _loaded_at
+
+    if not _is_stale():
+        return
+
+    async with _lock:
+        if not _is_stale():
+            return
+
+        result = await db.execute(
+            select(User.id, User.token_generation).where(User.token_generation > 0)
+        )
+        _generations = dict(result.all())
+        deleted = await db.scalars(
+            select(DeletedUser.user_id).where(
+                DeletedUser.deleted_at
+                > func.now() - timedelta(seconds=DELETED_USER_RETENTION_SECONDS)
+            )
+        )
+        _deleted_users = set(deleted.all())
+        _loaded_at = time.monotonic()
+
+
+def is_revoked(user_id: int, generation: int) -> bool:
+    if user_id in _deleted_users:
+        return True
+    return generation < _generations.get(user_id, 0)
+
+
+def _apply(user_id: int, generation: int | None) -> None:
+    if generation is None:
+        _deleted_users.add(user_id)
+    elif generation > _generations.get(user_id, 0):
+        _generations[user_id] = generation
+
+
+async def revoke_access_tokens(
+    db: AsyncSession,
+    user_id: int,
+    deleted: bool = False,
+) -> None:
+    """
+    Отзывает все выданные пользователю stateless access-токены.
+    Вызывать в транзакции, которая меняет пользователя (или удаляет его, deleted=True —
+    тогда он записывается в deleted_users).
+    Применяется только после commit, через NOTIFY — и в этом воркере тоже: при откате
+    транзакции токены, которые БД считает действующими, не должны отклоняться.
+    В обычном режиме токенов ничего не делает.
+    """
+    if not settings.STATELESS_ACCESS_TOKENS:
+        return
+
+    generation = None
+    if deleted:
+        await db.execute(
+            insert(DeletedUser).values(user_id=user_id).on_conflict_do_nothing()
+        )
+    else:
+        generation = await db.scalar(
+            update(User)
+            .where(User.id == user_id)
+            .values(token_generation=User.token_generation + 1)
+            .returning(User.token_generation)
+        )
+
+    await pubsub.publish(
+        db,
+        REVOCATION_CHANNEL,
+        f"{user_id}:{'deleted' if generation is None else generation}",
+    )
+
+
+def _on_revocation_notify(payload: str | None) -> None:
+    global _loaded_at
+
+    if payload is None:
+        _loaded_at = None
+        return
+
+    user_id, generation = payload.split(":")
+    _apply(int(user_id), None if generation == "deleted" else int(generation))
+
+
+pubsub.subscribe(REVOCATION_CHANNEL, _on_revocation_notify)
@@ -0,0 +1,130 @@
+from fastapi import HTTPException, status
+from sqlalchemy import func, literal, select, tuple_, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.event import Event, SEARCH_CONFIG
+from models.event_content import EventContent
+from schemas.event import EventOut, EventSearchHit, EventSearchPage
+
+# Полнотекстовый поиск по событиям: название (вес A), описание (B) и текстовые
+# блоки контента. Векторы — генерируемые колонки search_vector с GIN-индексами,
+# Postgres пересчитывает их при каждой записи строки, отдельной индексации нет.
+#
+# Событие находится по собственному вектору или по любому своему блоку; его ранг —
+# лучший из найденных. Страницы — keyset по (rank, id) по убыванию: курсор
+# "<rank>:<id>" последней строки, без OFFSET. Подсветка (ts_headline, дорогая)
+# считается только для строк страницы.
+
+# Совпадение только в блоке контента весит меньше, чем в названии/описании события
+CONTENT_RANK_WEIGHT = 0.5
+
+HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=30, MinWords=10"
+
+
+def _query(q: str):
+    # websearch_to_tsquery понимает «кавычки», or и -минус и не падает на произвольном вводе
+    return func.websearch_to_tsquery(SEARCH_CONFIG, q)
+
+
+def parse_cursor(cursor: str | None) -> tuple[float, int] | None:
+    if not cursor:
+        return None
+    try:
+        rank, event_id = cursor.split(":")
+        return float(rank), int(event_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Некорректный курсор поиска") from None
+
+
+def _headline(column, tsquery):
+    return func.ts_headline(SEARCH_CONFIG, column, tsquery, HEADLINE_OPTIONS)
+
+
+async def search_events(
+    db: AsyncSession,
+    scope,
+    q: str,
+    limit: int,
+    cursor: str | None = None,
+) -> EventSearchPage:
+    """
+    Страница результатов по условию scope на Event (календарь, членство).
+    Пустой запрос (одни стоп-слова) — пустая страница.
+    """
+    tsquery = _query(q)
+
+    by_event = (
+        select(Event.id.label("event_id"), func.ts_rank(Event.search_vector, tsquery).label("rank"))
+        .where(scope, Event.search_vector.op("@@")(tsquery))
+    )
+    by_content = (
+        select(
+            EventContent.event_id,
+            func.ts_rank(EventContent.search_vector, tsquery) * literal(CONTENT_RANK_WEIGHT),
+        )
+        .join(Event, Event.id == EventContent.event_id)
+        .where(scope, EventContent.search_vector.op("@@")(tsquery))
+    )
+    matches = union_all(by_event, by_content).subquery("matches")
+
+    rank = func.max(matches.c.rank).label("rank")
+    page = (
+        select(matches.c.event_id, rank)
+        .group_by(matches.c.event_id)
+        .order_by(rank.desc(), matches.c.event_id.desc())
+        .limit(limit + 1)
+    )
+    after = parse_cursor(cursor)
+    if after is not None:
+        page = page.having(tuple_(func.max(matches.c.rank), matches.c.event_id) < tuple_(*after))
+
+    rows = (await db.execute(page)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if not rows:
+        return EventSearchPage(items=[], next_cursor=None)
+
+    ids = [row.event_id for row in rows]
+    events = await db.execute(
+        select(
+            Event,
+            _headline(Event.title, tsquery).label("title_headline"),
+            _headline(func.coalesce(Event.description, ""), tsquery).label("description_headline"),
+        ).where(Event.id.in_(ids))
+    )
+    by_id = {row.Event.id: row for row in events.all()}
+
+    # Лучший найденный блок каждого события страницы
+    blocks = await db.execute(
+        select(
+            EventContent.event_id,
+            EventContent.id,
+            _headline(EventContent.text, tsquery).label("headline"),
+        )
+        .where(EventContent.event_id.in_(ids), EventContent.search_vector.op("@@")(tsquery))
+        .order_by(EventContent.event_id, func.ts_rank(EventContent.search_vector, tsquery).desc())
+        .distinct(EventContent.event_id)
+    )
+    best_block = {row.event_id: row for row in blocks.all()}
+
+    items = []
+    for event_id, event_rank in rows:
+        row = by_id.get(event_id)
+        if row is None:
+            # Удалено между запросами
+            continue
+        block = best_block.get(event_id)
+        items.append(EventSearchHit(
+            event=EventOut.model_validate(row.Event),
+            rank=event_rank,
+            title_headline=row.title_headline,
+            description_headline=row.description_headline or None,
+            content_id=block.id if block else None,
+            content_headline=block.headline if block else None,
+        ))
+
+    last_id, last_rank = rows[-1]
+    return EventSearchPage(
+        items=items,
+        next_cursor=f"{last_rank!r}:{last_id}" if has_more else None,
+    )
@@ -1,6 +1,13 @@
+import asyncio
 import bcrypt
+import hashlib
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from fastapi import HTTPException, status
 from jose import jwt
+from core import metrics
 from core.config import settings
 
 def get_password_hash(password: str) -> str:
@@ -18,6 +25,71 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     except Exception:
         return False
 
+# bcrypt отпускает GIL, поэтому хватает потоков. Пул ограничен, чтобы всплеск логинов
+# не занимал все ядра, а _hash_pending — глубина очереди для admission control.
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash",
+)
+_hash_pending = 0
+
+
+async def _run_in_hash_pool(func, *args):
+    global _hash_pending
+
+    if _hash_pending >= settings.PASSWORD_HASH_QUEUE_LIMIT:
+        metrics.increment("password_hash.rejected")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Сервер перегружен, попробуйте позже",
+            headers={"Retry-After": "1"},
+        )
+
+    def job():
+        started = time.perf_counter()
+        return func(*args), started, time.perf_counter()
+
+    _hash_pending += 1
+    enqueued = time.perf_counter()
+    try:
+        result, started, finished = await asyncio.get_running_loop().run_in_executor(_hash_executor, job)
+    finally:
+        _hash_pending -= 1
+
+    metrics.timing("password_hash.queue_wait").observe(started - enqueued)
+    metrics.timing("password_hash.hash_time").observe(finished - started)
+    return result
+
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash в отдельном пуле, не блокирует event loop."""
+    return await _run_in_hash_pool(get_password_hash, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password в отдельном пуле, не блокирует event loop."""
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+def token_digest(token: str) -> str:
+    """SHA-256 от токена: фиксированной длины, безопасно хранить и использовать как ключ."""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+def access_token_claims(user) -> dict:
+    """
+    Claims access-токена. В stateless-режиме кроме sub кладём всё, что нужно для
+    UserSnapshot, и поколение токенов пользователя для отзыва.
+    """
+    claims = {"sub": user.username}
+    if settings.STATELESS_ACCESS_TOKENS:
+        claims.update({
+            "uid": user.id,
+            "role": user.role.value,
+            "corr": user.is_items_corrector,
+            "name": user.display_name,
+            "tg": user.telegram_id,
+            "gen": user.token_generation,
+        })
+    return claims
+
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
@@ -27,4 +99,5 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
 
 def create_refresh_token(data: dict):
     expires_delta = timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
-    return create_access_token(data, expires_delta)
\ No newline at end of file
+    # jti делает токены уникальными даже при выдаче в одну и ту же секунду
+    return create_access_token({**data, "jti": secrets.token_urlsafe(8)}, expires_delta)
\ No newline at end of file
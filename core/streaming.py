@@ -0,0 +1,97 @@
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Hashable, Iterable, Sequence
+
+from fastapi import Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from core.projection import Projection
+
+# Потоковая отдача больших выборок: строки читаются из серверного курсора
+# (AsyncSession.stream_scalars) и сериализуются по одной, без списка в памяти.
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _dump(schema: type[BaseModel] | Projection, row: Any) -> bytes:
+    if isinstance(schema, Projection):
+        return schema.dump(row)
+    return schema.model_validate(row).model_dump_json().encode()
+
+
+def ndjson_requested(
+    request: Request,
+    stream: bool = Query(False, description="Отдать результат потоком NDJSON"),
+) -> bool:
+    """Потоковый режим: заголовок Accept: application/x-ndjson или ?stream=true."""
+    return stream or NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+async def stream_ndjson(
+    rows: AsyncIterable[Any],
+    schema: type[BaseModel] | Projection,
+) -> AsyncIterator[bytes]:
+    async for row in rows:
+        yield _dump(schema, row) + b"\n"
+
+
+def ndjson_response(
+    rows: AsyncIterable[Any],
+    schema: type[BaseModel] | Projection,
+    headers: dict[str, str] | None = None,
+) -> StreamingResponse:
+    return StreamingResponse(
+        stream_ndjson(rows, schema),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers=headers,
+    )
+
+
+async def merge_sorted(
+    rows: AsyncIterable[Any],
+    extra: Sequence[Any],
+    key: Callable[[Any], Any],
+) -> AsyncIterator[Any]:
+    """Сливает поток строк, отсортированный по key, с таким же отсортированным списком."""
+    pending = iter(extra)
+    item = next(pending, None)
+    async for row in rows:
+        while item is not None and key(item) <= key(row):
+            yield item
+            item = next(pending, None)
+        yield row
+    while item is not None:
+        yield item
+        item = next(pending, None)
+
+
+async def stream_grouped_json(
+    rows: AsyncIterable[Any],
+    key: Callable[[Any], Hashable],
+    schema: type[BaseModel] | Projection,
+    expected_keys: Iterable[Hashable] = (),
+) -> AsyncIterator[bytes]:
+    """
+    JSON-объект {key: [row, ...]} из строк, уже отсортированных по key.
+    Ключи из expected_keys, для которых строк не нашлось, отдаются пустыми списками.
+    """
+    current = None
+    seen = set()
+
+    async for row in rows:
+        row_key = key(row)
+        if row_key != current:
+            opening = b"],\"" if seen else b"{\""
+            separator = opening + str(row_key).encode() + b'":['
+            seen.add(row_key)
+            current = row_key
+        else:
+            separator = b","
+        yield separator + _dump(schema, row)
+
+    tail = b"]" if seen else b"{"
+    for missing in expected_keys:
+        if missing not in seen:
+            tail += b'%s"%s":[]' % (b"," if seen else b"", str(missing).encode())
+            seen.add(missing)
+    yield tail + b"}"
@@ -0,0 +1,67 @@
+from typing import Any, TypeVar
+
+from fastapi import HTTPException, status
+from sqlalchemy import exists, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Запись одним запросом к БД: INSERT/UPDATE ... RETURNING сразу возвращает строку
+# целиком, вместе со значениями по умолчанию и onupdate (updated_at, change_seq),
+# без SELECT перед изменением и refresh после commit. Сессии создаются
+# с expire_on_commit=False, так что возвращённый объект можно отдавать и после commit.
+#
+# Оптимистическая блокировка: у версионируемых моделей (mapper version_id_col)
+# каждое изменение увеличивает version. Клиент присылает версию, которую видел;
+# если строку успели изменить, UPDATE не находит её по версии и ответ — 409.
+# Те же правила действуют и для изменений через unit of work.
+
+M = TypeVar("M")
+
+CONFLICT_DETAIL = "Запись изменена другим запросом, загрузите её заново"
+
+
+def version_column(model):
+    return model.__mapper__.version_id_col
+
+
+async def insert_returning(db: AsyncSession, model: type[M], **values: Any) -> M:
+    """INSERT ... RETURNING: новый объект со всеми серверными значениями, в сессии."""
+    return await db.scalar(insert(model).values(**values).returning(model))
+
+
+async def update_returning(
+    db: AsyncSession,
+    model: type[M],
+    where: list,
+    values: dict[str, Any],
+    expected_version: int | None = None,
+    not_found: str = "Запись не найдена",
+) -> M:
+    """
+    UPDATE ... WHERE <where> [AND version = expected_version] ... RETURNING.
+    Строки нет — 404 с текстом not_found; есть, но версия другая — 409.
+    Объект из той же сессии, если он там уже был, обновляется полученными значениями.
+    """
+    version = version_column(model)
+    stmt = update(model).where(*where)
+    if version is not None:
+        values = {**values, version.key: version + 1}
+        if expected_version is not None:
+            stmt = stmt.where(version == expected_version)
+
+    row = await db.scalar(
+        stmt.values(values).returning(model),
+        execution_options={"synchronize_session": False, "populate_existing": True},
+    )
+    if row is not None:
+        return row
+
+    # Второй запрос — только на неудачном пути, чтобы отличить 409 от 404
+    if expected_version is not None and await db.scalar(select(exists().where(*where))):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=CONFLICT_DETAIL)
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=not_found)
+
+
+def check_version(current: int, expected: int | None) -> None:
+    """Для обработчиков, которые всё равно читают строку до изменения."""
+    if expected is not None and expected != current:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=CONFLICT_DETAIL)
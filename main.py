@@ -1,6 +1,9 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from core.config import settings
+from core import metrics
+from core.deps import allow_admin
 from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
 import os
@@ -12,6 +15,9 @@ from api.events import router as event_router, standalone_router as standalone_e
 from api.event_content import router as event_content_router
 from api.correction_orders import router as correction_orders_router
 from api.bot_api import router as bot_router
+from api.changes import router as changes_router
+from api.freebusy import router as freebusy_router
+from api.ical import router as ical_router
 
 from ui.start import print_start_message, print_end_message
 
@@ -19,17 +25,23 @@ from ui.start import print_start_message, print_end_message
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     from core.database import init_db
-    from models import calendar, calendar_user, user, event, event_content, refresh_session, correction_order
+    from models import calendar, calendar_user, user, event, event_content, refresh_session, correction_order, change_feed
+    from core import pubsub, maintenance
     await init_db()
+    pubsub.start_listener()
+    maintenance.start()
     # Создаём папку uploads если не существует
     os.makedirs("uploads", exist_ok=True)
     print_start_message()
     yield
+    await maintenance.stop()
+    await pubsub.stop_listener()
     print_end_message()
     
 
 # App
-app = FastAPI(lifespan=lifespan)
+# Ответы сериализуются через response_model (pydantic-core) и orjson
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # Include router
 app.include_router(user_router)
@@ -38,6 +50,9 @@ app.include_router(calendar_router)
 app.include_router(event_router)
 app.include_router(standalone_event_router)
 app.include_router(event_content_router)
+app.include_router(changes_router)
+app.include_router(freebusy_router)
+app.include_router(ical_router)
 app.include_router(correction_orders_router)
 app.include_router(bot_router)
 
@@ -58,3 +73,8 @@ app.add_middleware(
 @app.get('/ping')
 async def main_page():
     return {'message': 'pong'}
+
+
+@app.get('/metrics', dependencies=[Depends(allow_admin)])
+async def get_metrics():
+    return metrics.snapshot()
@@ -1,7 +1,7 @@
 from core.database import Base
 from typing import List
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, Text
+from sqlalchemy import BigInteger, String, Text
 
 class Calendar(Base):
     __tablename__ = "calendars"
@@ -11,6 +11,9 @@ class Calendar(Base):
     description: Mapped[str | None] = mapped_column(Text)
     type: Mapped[str | None] = mapped_column(String(50))
 
+    # Растёт при любой записи в календарь, см. core/calendar_versions.py
+    version: Mapped[int] = mapped_column(BigInteger, default=1, server_default="1", nullable=False)
+
     events = relationship("Event", back_populates="calendar")
     
     # ВОТ ЭТОГО НЕ ХВАТАЛО:
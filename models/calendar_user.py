@@ -1,9 +1,13 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import ForeignKey, String
+from sqlalchemy import ForeignKey, String, Index
 from core.database import Base
 
 class CalendarUser(Base):
     __tablename__ = "calendar_users"
+    __table_args__ = (
+        # Каждая проверка прав ищет именно эту пару
+        Index("uq_calendar_users_calendar_user", "calendar_id", "user_id", unique=True),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
 
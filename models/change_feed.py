@@ -0,0 +1,54 @@
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import BigInteger, DateTime, Index, Sequence, String, func
+from core.database import Base
+import datetime
+
+# Общий счётчик изменений для ленты /calendars/{id}/changes: его следующее значение
+# получает каждая вставка и каждое обновление событий и блоков контента, а также
+# каждая запись об удалении. Курсор клиента — последнее увиденное значение.
+calendar_change_seq = Sequence("calendar_change_seq", metadata=Base.metadata)
+
+
+def change_seq_column() -> Mapped[int]:
+    return mapped_column(
+        BigInteger,
+        server_default=calendar_change_seq.next_value(),
+        onupdate=calendar_change_seq.next_value(),
+        nullable=False,
+    )
+
+
+class Tombstone(Base):
+    """Запись об удалённом событии или блоке контента, пока её не заберут клиенты."""
+    __tablename__ = "calendar_tombstones"
+    __table_args__ = (
+        Index("ix_calendar_tombstones_calendar_seq", "calendar_id", "change_seq"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+
+    # Без внешнего ключа: календаря уже может не быть
+    calendar_id: Mapped[int] = mapped_column(nullable=False)
+
+    # "event" или "content"
+    kind: Mapped[str] = mapped_column(String(10), nullable=False)
+    entity_id: Mapped[int] = mapped_column(nullable=False)
+    event_id: Mapped[int | None] = mapped_column(nullable=True)
+
+    change_seq: Mapped[int] = mapped_column(
+        BigInteger, server_default=calendar_change_seq.next_value(), nullable=False
+    )
+    deleted_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False, index=True
+    )
+
+
+class ChangeFeedHorizon(Base):
+    """
+    Единственная строка (id=1): максимальный change_seq среди уже удалённых записей
+    об удалении. Курсор меньше этого значения не может гарантировать полноту ленты.
+    """
+    __tablename__ = "change_feed_horizon"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    change_seq: Mapped[int] = mapped_column(BigInteger, nullable=False)
@@ -1,5 +1,5 @@
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import Text, JSON, DateTime, BigInteger, Boolean
+from sqlalchemy import Text, JSON, DateTime, BigInteger, Boolean, Integer
 from core.database import Base
 import datetime
 
@@ -47,3 +47,8 @@ class CorrectionOrder(Base):
     # Ответ администратора (корректора) при подтверждении
     reply_text: Mapped[str | None] = mapped_column(Text, nullable=True)
     reply_photo_urls: Mapped[list] = mapped_column(JSON, default=list, nullable=False)
+
+    # Версия строки для оптимистической блокировки (core/writes.py)
+    version: Mapped[int] = mapped_column(Integer, default=1, server_default="1", nullable=False)
+
+    __mapper_args__ = {"version_id_col": version}
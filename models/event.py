@@ -1,8 +1,15 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import ForeignKey, String, DateTime, Text
+from sqlalchemy import ForeignKey, String, DateTime, Text, Integer, Index, Computed, and_, or_, func, literal_column
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR
 from core.database import Base
+from models.change_feed import change_seq_column
 import datetime
 
+# Конфигурация полнотекстового поиска (core/search.py). В 'russian' латинские слова
+# идут через английский стеммер. Меняется только вместе с пересозданием колонок search_vector
+SEARCH_CONFIG = "russian"
+
+
 class Event(Base):
     __tablename__ = "events"
 
@@ -21,6 +28,37 @@ class Event(Base):
         DateTime(timezone=True),
         default=datetime.datetime.utcnow
     )
+    updated_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
+    change_seq: Mapped[int] = change_seq_column()
+    # Версия строки для оптимистической блокировки (core/writes.py)
+    version: Mapped[int] = mapped_column(Integer, default=1, server_default="1", nullable=False)
+
+    # Повторение (core/recurrence.py). У серии хранится только первый экземпляр и правило;
+    # recurrence_until — конец последнего экземпляра, NULL для бесконечной серии
+    rrule: Mapped[str | None] = mapped_column(String(255))
+    exdates: Mapped[list[datetime.datetime] | None] = mapped_column(ARRAY(DateTime(timezone=True)))
+    timezone: Mapped[str | None] = mapped_column(String(64))
+    recurrence_until: Mapped[datetime.datetime | None] = mapped_column(DateTime(timezone=True))
+
+    # Изменённый экземпляр серии: ссылка на серию и исходное начало экземпляра
+    recurrence_id: Mapped[int | None] = mapped_column(ForeignKey("events.id", ondelete="CASCADE"))
+    recurrence_start: Mapped[datetime.datetime | None] = mapped_column(DateTime(timezone=True))
+
+    # Поисковый вектор: Postgres пересчитывает его сам при каждой записи строки.
+    # deferred — чтобы не попадал в обычные SELECT и RETURNING
+    search_vector: Mapped[str | None] = mapped_column(
+        TSVECTOR,
+        Computed(
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'B')",
+            persisted=True,
+        ),
+        deferred=True,
+    )
 
     calendar = relationship("Calendar", back_populates="events")
     contents = relationship(
@@ -29,3 +67,58 @@ class Event(Base):
         order_by="EventContent.order",
         cascade="all, delete-orphan",
     )
+
+    __mapper_args__ = {"version_id_col": version}
+
+
+def event_period(start, end):
+    """
+    Интервал события как tstzrange — по этому выражению построен GiST-индекс ix_events_period.
+    Границы '[]' и GREATEST нужны, чтобы события нулевой длины (и с end < start)
+    не превращались в пустой диапазон или ошибку. Выражение должно совпадать с индексом
+    буквально, поэтому границы — литерал, а не bind-параметр.
+    """
+    return func.tstzrange(start, func.greatest(end, start), literal_column("'[]'"))
+
+
+def events_overlapping(from_date, to_date):
+    """
+    Условие «событие пересекается с [from_date, to_date)» для одиночных событий
+    и изменённых экземпляров; серии разворачиваются отдельно (series_overlapping).
+    Оператор && отбирает кандидатов по GiST-индексу, точные сравнения
+    сохраняют прежнюю семантику на границах интервала.
+    """
+    return and_(
+        event_period(Event.start, Event.end).op("&&")(event_period(from_date, to_date)),
+        Event.start < to_date,
+        Event.end > from_date,
+        Event.rrule.is_(None),
+    )
+
+
+def series_overlapping(from_date, to_date):
+    """Серии, у которых могут быть экземпляры в [from_date, to_date)."""
+    return and_(
+        Event.rrule.is_not(None),
+        Event.start < to_date,
+        or_(Event.recurrence_until.is_(None), Event.recurrence_until > from_date),
+    )
+
+
+# Выборка событий календаря по времени (месяц); id — для keyset-страниц агенды по (start, id)
+Index("ix_events_calendar_start_id", Event.calendar_id, Event.start, Event.id)
+# Пересечение интервалов (range-запросы, занятость, конфликты)
+Index("ix_events_period", event_period(Event.start, Event.end), postgresql_using="gist")
+# Лента изменений календаря (/calendars/{id}/changes)
+Index("ix_events_calendar_change_seq", Event.calendar_id, Event.change_seq)
+# Серии календаря — их немного, частичный индекс
+Index(
+    "ix_events_calendar_series",
+    Event.calendar_id,
+    Event.start,
+    postgresql_where=Event.rrule.is_not(None),
+)
+# Полнотекстовый поиск по названию и описанию
+Index("ix_events_search", Event.search_vector, postgresql_using="gin")
+# Один изменённый экземпляр на каждое начало в серии
+Index("uq_events_recurrence", Event.recurrence_id, Event.recurrence_start, unique=True)
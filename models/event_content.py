@@ -1,6 +1,10 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import ForeignKey, String, Text, Integer
+from sqlalchemy import ForeignKey, String, Text, Integer, DateTime, Computed, Index, func
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from core.database import Base
+from models.change_feed import change_seq_column
+from models.event import SEARCH_CONFIG
+import datetime
 
 
 class EventContent(Base):
@@ -22,4 +26,27 @@ class EventContent(Base):
     # e.g. /uploads/event_<uuid>.jpg
     file_url: Mapped[str | None] = mapped_column(String(512), nullable=True)
 
+    updated_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
+    change_seq: Mapped[int] = change_seq_column()
+    # Поисковый вектор текстовых блоков, пересчитывается Postgres при каждой записи
+    search_vector: Mapped[str | None] = mapped_column(
+        TSVECTOR,
+        Computed(
+            f"CASE WHEN type = 'text' THEN to_tsvector('{SEARCH_CONFIG}', coalesce(text, '')) END",
+            persisted=True,
+        ),
+        deferred=True,
+    )
+    # Версия строки для оптимистической блокировки (core/writes.py)
+    version: Mapped[int] = mapped_column(Integer, default=1, server_default="1", nullable=False)
+
     event = relationship("Event", back_populates="contents")
+
+    __mapper_args__ = {"version_id_col": version}
+
+
+Index("ix_event_contents_search", EventContent.search_vector, postgresql_using="gin")
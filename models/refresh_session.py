@@ -1,11 +1,17 @@
 from datetime import datetime, timezone
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import ForeignKey, Text, DateTime
+from sqlalchemy import ForeignKey, Text, DateTime, String, Index
 from core.database import Base
 
 
 class RefreshSession(Base):
     __tablename__ = "refresh_sessions"
+    __table_args__ = (
+        Index("ix_refresh_sessions_token_hash", "token_hash", unique=True),
+        Index("ix_refresh_sessions_previous_token_hash", "previous_token_hash"),
+        Index("ix_refresh_sessions_expires_at", "expires_at"),
+        Index("ix_refresh_sessions_user_created", "user_id", "created_at"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
 
@@ -14,12 +20,17 @@ class RefreshSession(Base):
         nullable=False
     )
 
-    refresh_token: Mapped[str] = mapped_column(
-        Text,
-        unique=True,
+    # SHA-256 (hex) от refresh-токена: сам токен в базе не храним
+    token_hash: Mapped[str] = mapped_column(
+        String(64),
         nullable=False
     )
 
+    # Хеш предыдущего токена и время ротации — для окна параллельных refresh
+    # и обнаружения повторного использования старого токена
+    previous_token_hash: Mapped[str | None] = mapped_column(String(64))
+    rotated_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+
     user_agent: Mapped[str | None] = mapped_column(Text)
     ip_address: Mapped[str | None] = mapped_column(Text)
 
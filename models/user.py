@@ -1,6 +1,6 @@
 from datetime import datetime
 from typing import List
-from sqlalchemy import Enum as SQLAlchemyEnum, Text, Boolean, BigInteger, DateTime
+from sqlalchemy import Enum as SQLAlchemyEnum, Text, Boolean, BigInteger, DateTime, Integer, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from core.database import Base
 from schemas.auth import GlobalRole
@@ -17,11 +17,14 @@ class User(Base):
     refresh_token: Mapped[str | None] = mapped_column(Text, nullable=True)
     is_items_corrector: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
 
+    # Поколение access-токенов: увеличение отзывает все ранее выданные stateless-токены
+    token_generation: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+
     # Telegram & Profile
     display_name: Mapped[str | None] = mapped_column(nullable=True)
     telegram_id: Mapped[int | None] = mapped_column(BigInteger, unique=True, nullable=True)
     telegram_connect_token: Mapped[str | None] = mapped_column(nullable=True)
-    telegram_connect_token_expires_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    telegram_connect_token_expires_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True, index=True)
 
 
     calendar_links: Mapped[List["CalendarUser"]] = relationship(back_populates="user")
@@ -30,4 +33,17 @@ class User(Base):
         "RefreshSession",
         back_populates="user",
         cascade="all, delete-orphan"
-    )
\ No newline at end of file
+    )
+
+class DeletedUser(Base):
+    """
+    Удалённый пользователь, пока могут быть живы выданные ему stateless access-токены
+    (core/revocation.py). Старые записи удаляет обслуживание.
+    """
+    __tablename__ = "deleted_users"
+
+    # Без внешнего ключа: строки в users уже нет
+    user_id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    deleted_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False, index=True
+    )
@@ -15,6 +15,11 @@ class CalendarUpdate(BaseModel):
     description: Optional[str] = None
     type: Optional[str] = None
 
+class CalendarSummary(CalendarBase):
+    model_config = {"from_attributes": True}
+
+    id: int
+
 class ParticipantPublic(BaseModel):
     model_config = {"from_attributes": True}
     
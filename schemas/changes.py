@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Literal
+
+from schemas.event import EventOut
+from schemas.event_content import EventContentOut
+
+
+class TombstoneOut(BaseModel):
+    kind: Literal["event", "content"]
+    id: int
+    event_id: int | None = None
+    deleted_at: datetime
+
+
+class CalendarChanges(BaseModel):
+    events: list[EventOut] = []
+    contents: list[EventContentOut] = []
+    deleted: list[TombstoneOut] = []
+    # Передать в следующий запрос как since
+    cursor: int
+    has_more: bool
@@ -41,5 +41,13 @@ class CorrectionOrderOut(BaseModel):
     user_message_id: Optional[int]
     reply_text: Optional[str] = None
     reply_photo_urls: list[str] = []
+    version: int | None = None
 
     model_config = {"from_attributes": True}
+
+
+class CorrectionOrderPage(BaseModel):
+    items: list[CorrectionOrderOut]
+    total: int
+    skip: int
+    limit: int
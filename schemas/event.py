@@ -1,22 +1,204 @@
-from pydantic import BaseModel, Field
-from datetime import datetime
+from pydantic import BaseModel, Field, field_validator, model_validator
+from datetime import date, datetime
+from typing import Annotated, Literal
+from schemas.calendar import CalendarSummary
+from schemas.event_content import EventContentOut
+from core.recurrence import parse_rrule, get_zone, series_end
 
 class EventsRangeQuery(BaseModel):
+    # Собирается зависимостью core.deps.events_range, она же проверяет границы
     from_date: datetime
     to_date: datetime
 
 
-class EventCreate(BaseModel):
+class RecurrenceFields(BaseModel):
+    # Подмножество RRULE, например "FREQ=WEEKLY;BYDAY=MO,WE;COUNT=10"
+    rrule: str | None = Field(default=None, max_length=255)
+    exdates: list[datetime] | None = None
+    # IANA-пояс, в котором повторяется серия (по умолчанию UTC)
+    timezone: str | None = Field(default=None, max_length=64)
+
+    @field_validator("rrule")
+    @classmethod
+    def check_rrule(cls, value):
+        if value:
+            parse_rrule(value)
+        return value or None
+
+    @field_validator("timezone")
+    @classmethod
+    def check_timezone(cls, value):
+        if value:
+            get_zone(value)
+        return value or None
+
+
+class EventCreate(RecurrenceFields):
     title: str = Field(..., min_length=1, max_length=50)
     description: str | None = Field(default=None, max_length=4096)
     
     start: datetime
     end: datetime
 
+    @model_validator(mode="after")
+    def check_series_end(self):
+        # INTERVAL × COUNT может увести конец серии за допустимые даты — это 422, а не 500
+        if self.rrule:
+            series_end(parse_rrule(self.rrule), self.start, self.end, self.timezone)
+        return self
 
-class EventUpdate(BaseModel):
+
+class EventUpdate(RecurrenceFields):
     title: str | None = None
     description: str | None = None
     start: datetime | None = None
     end: datetime | None = None
+    # Версия, которую видел клиент: если событие успели изменить — 409
+    version: int | None = None
+
+
+class OccurrenceUpdate(BaseModel):
+    title: str | None = None
+    description: str | None = None
+    start: datetime | None = None
+    end: datetime | None = None
+
+
+class EventOut(BaseModel):
+    id: int
+    calendar_id: int
+    title: str
+    description: str | None = None
+    start: datetime
+    end: datetime
+    created_by: int | None = None
+    created_at: datetime | None = None
+    updated_at: datetime | None = None
+    version: int | None = None
+
+    rrule: str | None = None
+    exdates: list[datetime] | None = None
+    timezone: str | None = None
+    # Для экземпляров серии: id серии и исходное начало экземпляра
+    recurrence_id: int | None = None
+    recurrence_start: datetime | None = None
+
+    model_config = {"from_attributes": True}
+
+
+class EventWithCalendarOut(EventOut):
+    calendar: CalendarSummary | None = None
+
+
+class EventConflict(BaseModel):
+    # Пересекающееся событие (для экземпляра серии — id серии и время экземпляра)
+    id: int
+    calendar_id: int
+    title: str
+    start: datetime
+    end: datetime
+
+    model_config = {"from_attributes": True}
+
+
+class EventSearchHit(BaseModel):
+    event: EventOut
+    rank: float
+    # Фрагменты с найденными словами в <mark>...</mark>
+    title_headline: str
+    description_headline: str | None = None
+    # Лучший найденный текстовый блок события
+    content_id: int | None = None
+    content_headline: str | None = None
+
+
+class EventAgendaPage(BaseModel):
+    items: list[EventOut]
+    # Передать в after для следующей страницы; None — страниц больше нет
+    next_cursor: str | None = None
+
+
+class EventSearchPage(BaseModel):
+    items: list[EventSearchHit]
+    # Передать в cursor для следующей страницы; None — страниц больше нет
+    next_cursor: str | None = None
+
+
+class HistogramBucket(BaseModel):
+    # Первый день корзины в часовом поясе запроса
+    bucket: date
+    start: datetime
+    end: datetime
+    count: int
+    # Сумма длительностей событий в корзине (пересечения не сливаются)
+    busy_minutes: int
+
+
+class EventDetailOut(EventWithCalendarOut):
+    # Блоки контента по порядку (GET /events/{id}?include=content)
+    contents: list[EventContentOut] = []
+
+
+# --- Batch ---
+
+EVENT_BATCH_LIMIT = 500
+
+
+class EventBatchCreate(BaseModel):
+    op: Literal["create"]
+    data: EventCreate
+
+
+class EventBatchUpdate(BaseModel):
+    op: Literal["update"]
+    id: int
+    data: EventUpdate
+
+
+class EventBatchDelete(BaseModel):
+    op: Literal["delete"]
+    id: int
+
+
+EventBatchOperation = Annotated[
+    EventBatchCreate | EventBatchUpdate | EventBatchDelete,
+    Field(discriminator="op"),
+]
+
+
+class EventBatchRequest(BaseModel):
+    operations: list[EventBatchOperation] = Field(..., min_length=1, max_length=EVENT_BATCH_LIMIT)
+
+
+class EventBatchItemResult(BaseModel):
+    index: int
+    op: str
+    # Код, который вернул бы одиночный запрос: 201, 200, 204, 400, 404, 409
+    status: int
+    id: int | None = None
+    event: EventOut | None = None
+    detail: str | None = None
+    # Пересечения по времени (conflicts=warn)
+    conflicts: list[EventConflict] | None = None
+
+
+class EventBatchResult(BaseModel):
+    results: list[EventBatchItemResult]
+
+
+class EventImportError(BaseModel):
+    # Номер строки файла, где начинается VEVENT (или ошибочной строки)
+    line: int
+    uid: str | None = None
+    detail: str
+
 
+class EventImportResult(BaseModel):
+    imported: int
+    # Отменённые события (STATUS:CANCELLED) и отменённые экземпляры серий
+    skipped: int
+    failed: int
+    # Не больше ICS_IMPORT_MAX_ERRORS первых ошибок
+    errors: list[EventImportError]
+    elapsed_ms: float = 0
+    events_per_second: float = 0
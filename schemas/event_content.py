@@ -1,4 +1,5 @@
 from pydantic import BaseModel
+from datetime import datetime
 
 
 class EventContentOut(BaseModel):
@@ -8,6 +9,8 @@ class EventContentOut(BaseModel):
     type: str
     text: str | None = None
     file_url: str | None = None
+    updated_at: datetime | None = None
+    version: int | None = None
 
     model_config = {"from_attributes": True}
 
@@ -20,3 +23,5 @@ class EventContentCreateText(BaseModel):
 class EventContentPatch(BaseModel):
     text: str | None = None
     order: int | None = None
+    # Версия, которую видел клиент: если блок успели изменить — 409
+    version: int | None = None
@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+from datetime import datetime
+
+
+class BusyBlock(BaseModel):
+    start: datetime
+    end: datetime
+
+
+class FreeBusyOut(BaseModel):
+    from_date: datetime
+    to_date: datetime
+    # user_id -> занятые промежутки по возрастанию, без пересечений, обрезанные по окну
+    busy: dict[int, list[BusyBlock]]
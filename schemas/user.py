@@ -12,6 +12,14 @@ class UserPublic(BaseModel):
 
     model_config = {"from_attributes": True}
 
+
+class UserSnapshot(UserPublic):
+    """
+    Отсоединённый read-only снимок текущего пользователя.
+    Хранится в кэше авторизации, поэтому не содержит хеша пароля и не привязан к сессии.
+    """
+    model_config = {"from_attributes": True, "frozen": True}
+
 class ProfileUpdate(BaseModel):
     display_name: str | None = Field(None, max_length=50)
     username: str | None = Field(
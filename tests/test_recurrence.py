@@ -0,0 +1,33 @@
+import datetime
+
+import pytest
+from pydantic import ValidationError
+
+from core.recurrence import parse_rrule, series_end
+from schemas.event import EventCreate
+
+START = datetime.datetime(2030, 1, 1, 10, tzinfo=datetime.timezone.utc)
+END = START + datetime.timedelta(hours=1)
+
+
+# INTERVAL и COUNT по отдельности в пределах, вместе — за допустимыми датами
+@pytest.mark.parametrize("rrule", [
+    "FREQ=DAILY;INTERVAL=1000;COUNT=3000",
+    "FREQ=WEEKLY;INTERVAL=1000;COUNT=10000",
+    "FREQ=MONTHLY;INTERVAL=100;COUNT=900",
+])
+def test_series_end_out_of_range(rrule):
+    with pytest.raises(ValueError, match="позже"):
+        series_end(parse_rrule(rrule), START, END)
+    with pytest.raises(ValidationError):
+        EventCreate(title="Серия", start=START, end=END, rrule=rrule)
+
+
+@pytest.mark.parametrize("rrule, last", [
+    ("FREQ=DAILY;INTERVAL=2;COUNT=3", datetime.datetime(2030, 1, 5, 10)),
+    ("FREQ=WEEKLY;BYDAY=TU,TH;COUNT=3", datetime.datetime(2030, 1, 8, 10)),
+    ("FREQ=MONTHLY;COUNT=3", datetime.datetime(2030, 3, 1, 10)),
+])
+def test_series_end(rrule, last):
+    expected = last.replace(tzinfo=datetime.timezone.utc) + (END - START)
+    assert series_end(parse_rrule(rrule), START, END) == expected